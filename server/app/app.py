@@ -10,6 +10,7 @@ from config.config import Config, TestConfig
 from firebase_admin import credentials, initialize_app
 from dotenv import load_dotenv
 from app.core import limiter
+from app.commands import build_vector_indexes_command, migrate_embeddings_command
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from flask_session import Session
@@ -71,6 +72,9 @@ def create_app(config=None):
 
     init_celery(app)
 
+    app.cli.add_command(migrate_embeddings_command)
+    app.cli.add_command(build_vector_indexes_command)
+
     genai.configure(api_key=Config.GOOGLE_API_KEY)
 
     try:
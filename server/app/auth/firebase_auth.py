@@ -47,7 +47,7 @@ def firebase_token_required(func):
             )
 
         try:
-            auth.verify_id_token(id_token)
+            request_obj.current_user = auth.verify_id_token(id_token)
         except auth.InvalidIdTokenError:
             return (
                 jsonify({"error": "Invalid authorization token"}),
@@ -57,3 +57,20 @@ def firebase_token_required(func):
         return func(*args, **kwargs)
 
     return decorated_function
+
+
+def verify_payload_token(id_token):
+    """
+    Verify a Firebase ID token sent outside of the Authorization header.
+
+    Socket.IO events carry no per-event headers, so clients send their ID token
+    in the event payload instead.
+
+    :param id_token: The ID token from the payload, if any.
+    :return: The decoded token, or None if no token was sent.
+    :raises auth.InvalidIdTokenError: If the token is invalid.
+    """
+    if not id_token:
+        return None
+
+    return auth.verify_id_token(id_token)
@@ -3,3 +3,4 @@ Module containing the celery and tasks for the application.
 """
 
 from .celery import celery_instance
+from .worker_lifecycle import get_worker_resources, get_worker_connection_counts
@@ -18,6 +18,7 @@ celery_instance = Celery(
         "app.celery.tasks.post_tasks",
         "app.celery.tasks.recording_tasks",
         "app.celery.tasks.assignment_tasks",
+        "app.celery.tasks.chat_tasks",
     ],
     broker_use_ssl={"ssl_cert_reqs": ssl.CERT_NONE},
     redis_backend_use_ssl={"ssl_cert_reqs": ssl.CERT_NONE},
@@ -10,8 +10,17 @@ Tasks:
     process_uploaded_file: Asynchronously processes an uploaded file.
 """
 
-from .post_tasks import process_uploaded_file
-from .recording_tasks import process_image_files, process_recording_webhook
+from .post_tasks import (
+    process_uploaded_file,
+    extract_pdf_page_range,
+    process_extracted_pdf_pages,
+)
+from .recording_tasks import (
+    process_image_files,
+    process_frame_batch,
+    process_recording_video,
+    process_recording_webhook,
+)
 from .assignment_tasks import (
     process_assignment_generation,
     process_assignment_changes,
@@ -20,3 +29,4 @@ from .assignment_tasks import (
     process_automatic_grading_and_feedback,
     process_plagiarism_checker,
 )
+from .chat_tasks import compact_conversation
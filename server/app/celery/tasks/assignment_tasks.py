@@ -22,14 +22,12 @@ from typing import List
 import uuid
 from collections import defaultdict
 from app.celery.celery import celery_instance
+from app.celery.worker_lifecycle import get_worker_resources
 from app.models.assignment import Assignment
 from app.models.hub import Hub, Assignment as EmbeddedAssignment
 from app.models.user import User, Assignment as UserEmbeddedAssignment
 from bson import ObjectId
 from config.config import Config
-from dotenv import load_dotenv
-from mongoengine import connect
-import requests
 
 
 def generate_response_llama(
@@ -64,8 +62,6 @@ def generate_response_llama(
         requirements or performance considerations.
     """
     try:
-        load_dotenv()
-
         llama_data = {
             "temperature": 0.8,
             "messages": [
@@ -85,7 +81,7 @@ def generate_response_llama(
             "Content-Type": "application/json",
         }
 
-        response = requests.post(
+        response = get_worker_resources().http_session.post(
             llama_url,
             headers=llama_headers,
             json=llama_data,
@@ -808,15 +804,6 @@ def process_create_assignment_using_ai(
     """
     try:
         redis_client = Config.REDIS_CLIENT
-        load_dotenv()
-        connect(
-            db=os.getenv("MONGO_DB"),
-            host=os.getenv("MONGO_URI"),
-            username=os.getenv("MONGO_USERNAME"),
-            password=os.getenv("MONGO_PASSWORD"),
-            alias="default",
-        )
-
         automatic_grading_enabled = (
             False if automatic_grading_enabled is None else automatic_grading_enabled
         )
@@ -879,7 +866,7 @@ def process_create_assignment_using_ai(
                 "max_marks": maximum_marks_list,
             }
 
-            response = requests.post(
+            response = get_worker_resources().http_session.post(
                 "https://eduhub-ai-predict-assignment-difficulty.onrender.com/predict",
                 json=request_data,
             )
@@ -978,15 +965,6 @@ def process_create_assignment_manually(
     """
     try:
         redis_client = Config.REDIS_CLIENT
-        load_dotenv()
-        connect(
-            db=os.getenv("MONGO_DB"),
-            host=os.getenv("MONGO_URI"),
-            username=os.getenv("MONGO_USERNAME"),
-            password=os.getenv("MONGO_PASSWORD"),
-            alias="default",
-        )
-
         automatic_grading_enabled = (
             False if automatic_grading_enabled is None else automatic_grading_enabled
         )
@@ -1039,7 +1017,7 @@ def process_create_assignment_manually(
             "max_marks": maximum_marks_list,
         }
 
-        response = requests.post(
+        response = get_worker_resources().http_session.post(
             "https://eduhub-ai-predict-assignment-difficulty.onrender.com/predict",
             json=request_data,
         )
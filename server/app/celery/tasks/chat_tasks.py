@@ -0,0 +1,58 @@
+"""
+Module for compacting the conversation memory of the chat endpoints.
+
+Functions:
+    - summarize_conversation: Fold conversation turns into a rolling summary.
+    - compact_conversation: Compact the old turns of a conversation into its summary.
+"""
+
+from app.celery.celery import celery_instance
+from app.chat.conversation_memory import ConversationMemory
+from config.config import Config
+import google.generativeai as genai
+
+
+def summarize_conversation(summary: str, turns: str) -> str:
+    """
+    Fold conversation turns into a rolling summary with the generative model.
+
+    Args:
+        summary (str): The summary of the earlier turns, empty for the first compaction.
+        turns (str): The formatted turns to fold into the summary.
+
+    Returns:
+        str: The new summary.
+    """
+    prompt = f"""
+    Instruction: Update the summary of a conversation between a student and a model about
+    a study material with the new turns below. Keep the questions asked, the facts and
+    explanations given and anything the student said about themselves. Answer with the
+    summary only, in at most 200 words.
+
+    Summary: {summary or "No summary yet."}
+
+    New Turns: {turns}
+    """
+
+    return genai.GenerativeModel("gemini-pro").generate_content(prompt).text.strip()
+
+
+@celery_instance.task
+def compact_conversation(scope: str, user: str) -> None:
+    """
+    Compact the old turns of a conversation into its rolling summary.
+
+    Args:
+        scope (str): The attachment or room the conversation is about.
+        user (str): The user having the conversation.
+
+    Returns:
+        None
+    """
+    try:
+        ConversationMemory(Config.REDIS_CLIENT, scope, user).compact(
+            summarize_conversation
+        )
+
+    except Exception as error:
+        print(f"error: {error}")
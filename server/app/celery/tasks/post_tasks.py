@@ -3,85 +3,293 @@ Module for processing uploaded files asynchronously and extracting text embeddin
 
 This module defines a Celery task `process_uploaded_file` that
 asynchronously processes uploaded files, extracts text content,
-and generates text embeddings. It also provides utility functions
-for decoding base64 encoded strings to ObjectId and extracting text
-from PDF files.
+and generates text embeddings. Text is streamed page by page (or
+slide by slide, paragraph by paragraph) through the ingestion
+pipeline, so embeddings are inserted in batches while the rest of
+the document is still being parsed.
 
 Tasks:
     process_uploaded_file: Asynchronously processes an uploaded file,
     extracts text content, and generates text embeddings.
+    extract_pdf_page_range: Extracts the text of a page range of a large PDF.
+    process_extracted_pdf_pages: Chord callback ingesting the extracted pages.
 
 Utilities:
-    extract_text_from_pdf: Extracts text content from a PDF file.
-    extract_text_embedding: Generates text embeddings from text content.
+    extract_text_from_pdf: Yields the text content of each page of a PDF file.
+    extract_text_from_pdf_in_parallel: Extracts a large PDF with a process pool.
+    in_daemonic_process: Tells whether this process may not start a process pool.
+    page_range_key: Returns the object store key of the text of a page range.
+    extract_text_from_ppt: Yields the text content of each slide of a PPT file.
+    extract_text_from_docx: Yields the text content of each paragraph of a DOCX file.
+    get_text_extractor: Returns the extractor for a MIME type.
+    ingest_attachment_text: Chunks, embeds and stores the text of an attachment.
+    reingest_attachment_text: Re-ingests a replaced attachment by chunk diffing.
 
 """
 
+import json
 import mimetypes
 import io
-import os
-import math
+import multiprocessing
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import chain
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from uuid import UUID
 
 import fitz
+from billiard import process as billiard_process
 from app.celery.celery import celery_instance
+from celery import chord
+from celery.exceptions import Ignore
 from celery.signals import task_success, task_failure
-import google.generativeai as genai
+from app.embeddings import vector_fields
+from app.ingestion import (
+    ChunkDiff,
+    chunk_content_hash,
+    diff_chunks,
+    ingest_chunks,
+    get_chunker,
+    mark_content_status,
+)
 from app.models.embedding import Embedding
+from app.storage import get_object_store
+from app.vector_search import remove_documents
 from config.config import Config
-from mongoengine import connect
-from dotenv import load_dotenv
+from pymongo import UpdateOne
 from pptx import Presentation
 from docx import Document
 
 
-def extract_text_from_pdf(file_data: bytes) -> str:
+def as_document_source(file_data: Union[bytes, str]) -> Union[io.BytesIO, str]:
     """
-    Extract text content from a PDF file.
+    Wrap file bytes in a stream, passing local file paths through unchanged.
 
     Args:
-        file_data (bytes): The binary data of the PDF file.
+        file_data (Union[bytes, str]): The binary data of a file, or its local path.
 
     Returns:
-        str: The extracted text content from the PDF.
+        Union[io.BytesIO, str]: A value accepted by python-pptx and python-docx.
+    """
+    if isinstance(file_data, str):
+        return file_data
+    return io.BytesIO(file_data)
+
+
+@contextmanager
+def open_uploaded_file(
+    file_data: Optional[bytes], file_key: Optional[str]
+) -> Iterator[Union[bytes, str]]:
+    """
+    Resolve the content of an uploaded file passed either inline or by claim check.
+
+    Args:
+        file_data (bytes, optional): The binary data of the file, when it was sent
+            through the broker.
+        file_key (str, optional): The object store key of the file, used when
+            `file_data` is None.
+
+    Yields:
+        Union[bytes, str]: The file bytes, or the path of a local file streamed
+        from the object store.
+    """
+    if file_data is not None:
+        yield file_data
+        return
+
+    with get_object_store().local_path(file_key) as file_path:
+        yield file_path
+
+
+def open_pdf(file_data: Union[bytes, str]) -> fitz.Document:
+    """
+    Open a PDF document from its bytes or from the path of a local file.
+
+    Args:
+        file_data (Union[bytes, str]): The binary data of the PDF file, or its path.
+
+    Returns:
+        fitz.Document: The opened PyMuPDF document.
+    """
+    if isinstance(file_data, str):
+        return fitz.open(file_data)
+    return fitz.open(stream=io.BytesIO(file_data), filetype="pdf")
+
+
+def iter_page_ranges(
+    page_count: int, pages_per_range: int
+) -> Iterator[Tuple[int, int]]:
+    """
+    Split the pages of a document into consecutive half-open page ranges.
+
+    Args:
+        page_count (int): The number of pages of the document.
+        pages_per_range (int): The maximum number of pages per range.
+
+    Yields:
+        Tuple[int, int]: The start (inclusive) and end (exclusive) page numbers.
+    """
+    for start in range(0, page_count, pages_per_range):
+        yield start, min(start + pages_per_range, page_count)
+
+
+def extract_text_from_pdf_pages(
+    file_data: Union[bytes, str], start: int, end: int
+) -> List[str]:
+    """
+    Extract the text content of a range of pages of a PDF file.
+
+    Args:
+        file_data (Union[bytes, str]): The binary data of the PDF file, or its path.
+        start (int): The first page number of the range (inclusive).
+        end (int): The last page number of the range (exclusive).
+
+    Returns:
+        List[str]: The text content of each page of the range, in page order.
+    """
+    with open_pdf(file_data) as pdf_document:
+        return [
+            pdf_document.load_page(page_number).get_text()
+            for page_number in range(start, end)
+        ]
+
+
+@contextmanager
+def spill_to_local_file(file_data: Union[bytes, str]) -> Iterator[str]:
+    """
+    Make PDF bytes available as a local file, passing local paths through unchanged.
+
+    Args:
+        file_data (Union[bytes, str]): The binary data of the PDF file, or its path.
+
+    Yields:
+        str: The path of a local file holding the PDF.
+    """
+    if isinstance(file_data, str):
+        yield file_data
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as temp_file:
+        temp_file.write(file_data)
+        temp_file.flush()
+        yield temp_file.name
+
+
+def in_daemonic_process() -> bool:
+    """
+    Tell whether this process is daemonic, such as a prefork Celery worker child.
+
+    Daemonic processes are not allowed to have children, so they cannot start a
+    process pool.
+
+    Returns:
+        bool: True if this process may not start child processes.
+    """
+    return bool(
+        multiprocessing.current_process().daemon
+        or billiard_process.current_process().daemon
+    )
+
+
+def extract_text_from_pdf_in_parallel(
+    file_data: Union[bytes, str], page_count: int
+) -> Iterator[str]:
+    """
+    Extract text content from a large PDF file with a local process pool.
+
+    The pages are split into ranges of `PDF_PAGES_PER_RANGE` pages which are
+    extracted by `PDF_PARALLEL_WORKERS` processes. A bounded number of ranges is in
+    flight at once, and pages are yielded in page order as ranges complete.
+
+    Args:
+        file_data (Union[bytes, str]): The binary data of the PDF file, or its path.
+        page_count (int): The number of pages of the PDF.
+
+    Yields:
+        str: The text content of each page of the PDF, in page order.
+    """
+    max_workers = Config.PDF_PARALLEL_WORKERS
+
+    with spill_to_local_file(file_data) as file_path:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = deque()
+
+            for start, end in iter_page_ranges(page_count, Config.PDF_PAGES_PER_RANGE):
+                if len(in_flight) >= 2 * max_workers:
+                    yield from in_flight.popleft().result()
+
+                in_flight.append(
+                    executor.submit(extract_text_from_pdf_pages, file_path, start, end)
+                )
+
+            while in_flight:
+                yield from in_flight.popleft().result()
+
+
+def extract_text_from_pdf(file_data: Union[bytes, str]) -> Iterator[str]:
+    """
+    Extract text content from a PDF file, one page at a time.
+
+    PDFs with at least `PDF_PARALLEL_PAGE_THRESHOLD` pages are extracted in page
+    ranges by a local process pool when `PDF_PARALLEL_MODE` is "process", unless
+    this process is daemonic, as the children of the prefork pool are, in which
+    case they are extracted serially.
+
+    Args:
+        file_data (Union[bytes, str]): The binary data of the PDF file, or the path
+            of a local file holding it.
+
+    Yields:
+        str: The text content of each page of the PDF, in page order.
 
     Raises:
         Exception: If an error occurs during PDF processing.
 
     """
-    text = ""
     try:
         # Open the PDF file
-        pdf_document = fitz.open(stream=io.BytesIO(file_data), filetype="pdf")
+        with open_pdf(file_data) as pdf_document:
+            page_count = len(pdf_document)
+
+            if (
+                Config.PDF_PARALLEL_MODE != "process"
+                or page_count < Config.PDF_PARALLEL_PAGE_THRESHOLD
+                or in_daemonic_process()
+            ):
+                # Iterate through each page in the PDF
+                for page_number in range(page_count):
+                    page = pdf_document.load_page(page_number)
 
-        # Iterate through each page in the PDF
-        for page_number in range(len(pdf_document)):
-            page = pdf_document.load_page(page_number)
+                    # Extract text from the page
+                    yield page.get_text()
 
-            # Extract text from the page
-            text += page.get_text()
+                return
 
-        return text
+        yield from extract_text_from_pdf_in_parallel(file_data, page_count)
 
     except Exception as error:
         print(f"Error: {error}")
         raise
 
 
-def extract_text_from_ppt(file_data: bytes) -> str:
+def extract_text_from_ppt(file_data: Union[bytes, str]) -> Iterator[str]:
     """
-    Extract text from a PowerPoint (PPT) file given its byte data.
+    Extract text from a PowerPoint (PPT) file given its byte data, one slide at a time.
 
     This function reads a PowerPoint (PPT) file from the provided byte data and
     extracts all available text content from each slide. It iterates through each
     slide in the presentation, examining each shape on the slide. If a shape contains
-    text, the text content is extracted and concatenated into a single string.
+    text, the text content is extracted, and the text of each slide is yielded as
+    soon as the slide has been read.
 
     Args:
-        file_data (bytes): Byte data representing the PowerPoint (PPT) file.
+        file_data (Union[bytes, str]): Byte data representing the PowerPoint (PPT)
+            file, or the path of a local file holding it.
 
-    Returns:
-        str: The extracted text content from the PowerPoint (PPT) file.
+    Yields:
+        str: The extracted text content of each slide, one line per shape.
 
     Raises:
         Exception: If an error occurs during the extraction process.
@@ -98,37 +306,34 @@ def extract_text_from_ppt(file_data: bytes) -> str:
           with details about the error.
     """
     try:
-        ppt_stream = io.BytesIO(file_data)
-        presentation = Presentation(ppt_stream)
-
-        extracted_text = ""
+        presentation = Presentation(as_document_source(file_data))
 
         for slide in presentation.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    extracted_text += shape.text + "\n"
-
-        return extracted_text
+            yield "".join(
+                shape.text + "\n" for shape in slide.shapes if hasattr(shape, "text")
+            )
 
     except Exception as error:
         print(f"Error: {error}")
         raise
 
 
-def extract_text_from_docx(file_data: bytes) -> str:
+def extract_text_from_docx(file_data: Union[bytes, str]) -> Iterator[str]:
     """
-    Extract text from a Word document (docx file) given its byte data.
+    Extract text from a Word document (docx file) given its byte data, one paragraph
+    at a time.
 
     This function reads a Word document (docx file) from the provided byte data and
     extracts all available text content. It iterates through each paragraph in the
-    document and extracts the text content from each paragraph. The extracted text
+    document and yields the text content of each paragraph. The extracted text
     includes content from paragraphs, headings, titles, and lists.
 
     Args:
-        file_data (bytes): Byte data representing the Word document (docx file).
+        file_data (Union[bytes, str]): Byte data representing the Word document
+            (docx file), or the path of a local file holding it.
 
-    Returns:
-        str: The extracted text content from the Word document (docx file).
+    Yields:
+        str: The text content of each paragraph, followed by a newline character.
 
     Raises:
         Exception: If an error occurs during the extraction process.
@@ -139,70 +344,255 @@ def extract_text_from_docx(file_data: bytes) -> str:
         - The provided byte data should represent a valid Word document file (.docx).
         - The extracted text includes content from paragraphs, headings, titles, and
           lists present in the document.
-        - Each paragraph in the document is separated by a newline character ('\n') in
-          the extracted text.
+        - Each paragraph in the document is followed by a newline character ('\n').
         - If an error occurs during the extraction process, an exception is raised with
           details about the error.
     """
     try:
-        docx_stream = io.BytesIO(file_data)
-        doc = Document(docx_stream)
-
-        extracted_text = ""
+        doc = Document(as_document_source(file_data))
 
         for paragraph in doc.paragraphs:
-            extracted_text += paragraph.text + "\n"
-
-        return extracted_text
+            yield paragraph.text + "\n"
 
     except Exception as error:
         print(f"Error: {error}")
         raise
 
 
-def extract_text_embedding(chunk: str) -> list:
+def get_text_extractor(
+    file_type: str,
+) -> Callable[[Union[bytes, str]], Iterator[str]]:
     """
-    Generate text embeddings for a text chunk using a pre-trained model.
+    Return the streaming text extractor for a MIME type.
 
     Args:
-        chunk (str): The text chunk for which embeddings are to be generated.
+        file_type (str): The MIME type of the uploaded file.
 
     Returns:
-        list: A list of embedding vectors representing the text chunk.
+        Callable[[Union[bytes, str]], Iterator[str]]: The extractor yielding text
+        segments.
 
     Raises:
-        Exception: If an error occurs during the embedding generation process.
+        ValueError: If the file type is not supported.
+    """
+    if file_type == "application/pdf":
+        return extract_text_from_pdf
+    if (
+        file_type
+        == "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+    ):
+        return extract_text_from_ppt
+    if (
+        file_type
+        == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    ):
+        return extract_text_from_docx
+
+    raise ValueError(
+        "Invalid file format. Only PDF, PPT, and DOCX formats are supported."
+    )
+
+
+def ingest_attachment_text(
+    segments: Iterable[str],
+    hub_id: str,
+    post_id: UUID,
+    attachment_id: str,
+    paged: bool = False,
+) -> int:
+    """
+    Chunk, embed and store the text of an attachment as Embedding documents.
 
+    The number of embeddings of the attachment is stored in Redis after every
+    inserted batch.
+
+    Args:
+        segments (Iterable[str]): The text segments of the attachment, in order.
+        hub_id (str): The ID of the hub to which the attachment belongs.
+        post_id (UUID): The UUID of the post to which the attachment belongs.
+        attachment_id (str): The content id of the attachment.
+        paged (bool): Whether the segments are PDF pages, whose repeated headers and
+            footers are dropped.
+
+    Returns:
+        int: The number of Embedding documents inserted.
     """
-    try:
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=chunk,
-            task_type="semantic_similarity",
+    attachment_number_of_embeddings_key = (
+        f"attachment_id_{attachment_id}_number_of_embeddings"
+    )
+
+    redis_client = Config.REDIS_CLIENT
+
+    def make_embedding(batch_no: int, chunk: str, embedding: list) -> Embedding:
+        return Embedding(
+            hub_id=hub_id,
+            post_id=post_id,
+            attachment_id=attachment_id,
+            batch_no=batch_no,
+            text_content=chunk,
+            content_hash=chunk_content_hash(chunk),
+            **vector_fields(embedding),
         )
-        return result["embedding"]
-    except Exception as error:
-        print(f"Error: {error}")
-        raise
 
+    def record_number_of_embeddings(number_of_embeddings: int) -> None:
+        redis_client.set(attachment_number_of_embeddings_key, number_of_embeddings)
 
-@celery_instance.task(soft_time_limit=60, time_limit=120)
+    return ingest_chunks(
+        chunks=get_chunker(paged=paged)(segments),
+        make_document=make_embedding,
+        document_class=Embedding,
+        on_batch_inserted=record_number_of_embeddings,
+    )
+
+
+def reingest_attachment_text(
+    segments: Iterable[str],
+    hub_id: str,
+    post_id: UUID,
+    attachment_id: str,
+    paged: bool = False,
+) -> ChunkDiff:
+    """
+    Incrementally re-ingest the text of a replaced attachment.
+
+    The new extraction is diffed against the content hashes of the stored chunks:
+    only new or changed chunks are embedded, kept chunks are renumbered when they
+    moved, and orphaned Embedding documents are deleted. New documents are
+    inserted before anything is deleted, so a crash never leaves the attachment
+    without embeddings.
+
+    Args:
+        segments (Iterable[str]): The text segments of the new version, in order.
+        hub_id (str): The ID of the hub to which the attachment belongs.
+        post_id (UUID): The UUID of the post to which the attachment belongs.
+        attachment_id (str): The content id of the attachment.
+        paged (bool): Whether the segments are PDF pages, whose repeated headers and
+            footers are dropped.
+
+    Returns:
+        ChunkDiff: The diff that was applied.
+    """
+    existing = [
+        (
+            document["_id"],
+            document.get("content_hash")
+            or chunk_content_hash(document["text_content"]),
+            document["batch_no"],
+        )
+        for document in Embedding.objects(attachment_id=attachment_id)
+        .only("id", "content_hash", "text_content", "batch_no")
+        .as_pymongo()
+    ]
+
+    diff = diff_chunks(existing, get_chunker(paged=paged)(segments))
+
+    def make_embedding(sequence: int, chunk: str, embedding: list) -> Embedding:
+        batch_no, _, content_hash = diff.new_chunks[sequence - 1]
+        return Embedding(
+            hub_id=hub_id,
+            post_id=post_id,
+            attachment_id=attachment_id,
+            batch_no=batch_no,
+            text_content=chunk,
+            content_hash=content_hash,
+            **vector_fields(embedding),
+        )
+
+    ingest_chunks(
+        chunks=(chunk for _, chunk, _ in diff.new_chunks),
+        make_document=make_embedding,
+        document_class=Embedding,
+    )
+
+    collection = Embedding._get_collection()  # pylint: disable=protected-access
+
+    if diff.moved:
+        collection.bulk_write(
+            [
+                UpdateOne({"_id": document_id}, {"$set": {"batch_no": batch_no}})
+                for document_id, batch_no in diff.moved
+            ],
+            ordered=False,
+        )
+
+    if diff.orphaned_ids:
+        collection.delete_many({"_id": {"$in": diff.orphaned_ids}})
+        remove_documents(Embedding, attachment_id, diff.orphaned_ids)
+
+    redis_client = Config.REDIS_CLIENT
+    redis_client.set(f"attachment_id_{attachment_id}_number_of_embeddings", diff.total)
+
+    print(
+        f"Re-ingested attachment {attachment_id}: {len(diff.new_chunks)} embedded, "
+        f"{len(diff.moved)} moved, {len(diff.orphaned_ids)} deleted"
+    )
+
+    return diff
+
+
+def pdf_page_range_chord(
+    file_key: str, page_count: int, hub_id: str, post_id: UUID, attachment_id: str
+) -> chord:
+    """
+    Build the Celery chord of page-range subtasks extracting a large PDF.
+
+    Each header task extracts `PDF_PAGES_PER_RANGE` pages of the PDF stored under
+    `file_key` and stores their text in the object store, so that only object keys
+    go through the result backend; the callback reads the page texts in range order
+    and ingests them.
+
+    Args:
+        file_key (str): The object store key of the PDF file.
+        page_count (int): The number of pages of the PDF.
+        hub_id (str): The ID of the hub to which the file belongs.
+        post_id (UUID): The UUID of the post to which the file belongs.
+        attachment_id (str): The content id of the attachment.
+
+    Returns:
+        chord: The chord, to be run in place of `process_uploaded_file`.
+    """
+    header = [
+        extract_pdf_page_range.s(file_key, start, end)
+        for start, end in iter_page_ranges(page_count, Config.PDF_PAGES_PER_RANGE)
+    ]
+    return chord(header, process_extracted_pdf_pages.s(hub_id, post_id, attachment_id))
+
+
+@celery_instance.task(bind=True, soft_time_limit=60, time_limit=120)
 def process_uploaded_file(
-    file_data: bytes,
+    self,
+    file_data: Optional[bytes],
     filename: str,
     hub_id: str,
     post_id: UUID,
     attachment_id: str,
+    file_key: Optional[str] = None,
+    incremental: bool = False,
 ) -> None:
     """
     Asynchronously process an uploaded file, extract text content,
     generate text embeddings, and save them to MongoDB.
 
+    The text is streamed through the ingestion pipeline: chunks are embedded in
+    concurrent batches as pages are parsed and inserted in fixed-size batches,
+    and the number of embeddings stored in Redis is updated after every batch.
+
+    In claim-check mode `file_data` is None and only `file_key` is sent through
+    the broker; the file is then streamed from the object store to a local file.
+    Large PDFs are split into page ranges according to `PDF_PARALLEL_MODE`: a
+    local process pool ("process") or a chord of page-range subtasks ("chord",
+    claim-check uploads only). The chord replaces this task, so the completion of
+    the upload is reported by the chord callback, once the pages are ingested.
+
     Args:
-        file_data (bytes): The binary data of the uploaded file.
+        file_data (bytes, optional): The binary data of the uploaded file.
         filename (str): The name of the uploaded file.
         hub_id (str): The ID of the hub to which the file belongs.
         post_id (UUID): The UUID of the post to which the file belongs.
+        attachment_id (str): The content id of the attachment.
+        file_key (str, optional): The object store key of the uploaded file.
+        incremental (bool): Whether the file replaces an already ingested version of
+            the attachment, in which case only new or changed chunks are embedded.
 
     Returns:
         None
@@ -212,71 +602,137 @@ def process_uploaded_file(
 
     """
     try:
-        load_dotenv()
-        connect(
-            db=os.getenv("MONGO_DB"),
-            host=os.getenv("MONGO_URI"),
-            username=os.getenv("MONGO_USERNAME"),
-            password=os.getenv("MONGO_PASSWORD"),
-            alias="default",
-        )
-        print("Connected to MongoDB successfully!")
-
         file_type = mimetypes.guess_type(filename)[0]
-        extracted_text = ""
-
-        if file_type == "application/pdf":
-            extracted_text = extract_text_from_pdf(file_data)
-        elif (
-            file_type
-            == "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-        ):
-            extracted_text = extract_text_from_ppt(file_data)
-        elif (
-            file_type
-            == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        ):
-            extracted_text = extract_text_from_docx(file_data)
-        else:
-            raise ValueError(
-                "Invalid file format. Only PDF, PPT, and DOCX formats are supported."
+        extract_text = get_text_extractor(file_type)
+
+        with open_uploaded_file(file_data, file_key) as file_source:
+            if incremental:
+                reingest_attachment_text(
+                    extract_text(file_source),
+                    hub_id,
+                    post_id,
+                    attachment_id,
+                    paged=file_type == "application/pdf",
+                )
+                mark_content_status(attachment_id, "ready")
+                return
+
+            if (
+                file_type == "application/pdf"
+                and Config.PDF_PARALLEL_MODE == "chord"
+                and file_key is not None
+            ):
+                with open_pdf(file_source) as pdf_document:
+                    page_count = len(pdf_document)
+
+                if page_count >= Config.PDF_PARALLEL_PAGE_THRESHOLD:
+                    raise self.replace(
+                        pdf_page_range_chord(
+                            file_key, page_count, hub_id, post_id, attachment_id
+                        )
+                    )
+
+            ingest_attachment_text(
+                extract_text(file_source),
+                hub_id,
+                post_id,
+                attachment_id,
+                paged=file_type == "application/pdf",
             )
+            mark_content_status(attachment_id, "ready")
 
-        embedding_docs = []
-
-        num_chunks = len(extracted_text)
-        counter = 0
-
-        for i in range(0, num_chunks, 1000):
-            chunk = extracted_text[i : i + 1000]
-            embedding = extract_text_embedding(chunk)
-            counter += 1
-            embedding_doc = Embedding(
-                hub_id=hub_id,
-                post_id=post_id,
-                attachment_id=attachment_id,
-                batch_no=counter,
-                text_content=chunk,
-                embeddings=embedding,
-            )
-            embedding_docs.append(embedding_doc)
+    except Ignore:
+        raise
 
-        Embedding.objects.insert(embedding_docs, load_bulk=False)
-        attachment_number_of_embeddings_key = (
-            f"attachment_id_{attachment_id}_number_of_embeddings"
-        )
+    except Exception as error:
+        print(f"error: {error}")
+        mark_content_status(attachment_id, "failed")
 
-        redis_client = Config.REDIS_CLIENT
 
-        redis_client.set(
-            attachment_number_of_embeddings_key, math.ceil(num_chunks / 1000)
+def page_range_key(file_key: str, start: int, end: int) -> str:
+    """
+    Return the object store key of the extracted text of a page range of a PDF.
+    """
+    return f"{file_key}.pages-{start}-{end}.json"
+
+
+@celery_instance.task(soft_time_limit=60, time_limit=120)
+def extract_pdf_page_range(file_key: str, start: int, end: int) -> str:
+    """
+    Extract the text content of a range of pages of a PDF stored in the object store.
+
+    The page texts are stored in the object store as a JSON list, under
+    `page_range_key`, rather than returned through the result backend.
+
+    Args:
+        file_key (str): The object store key of the PDF file.
+        start (int): The first page number of the range (inclusive).
+        end (int): The last page number of the range (exclusive).
+
+    Returns:
+        str: The object store key of the text content of each page of the range.
+    """
+    object_store = get_object_store()
+
+    with object_store.local_path(file_key) as file_path:
+        pages = extract_text_from_pdf_pages(file_path, start, end)
+
+    pages_key = page_range_key(file_key, start, end)
+    object_store.put(
+        pages_key, io.BytesIO(json.dumps(pages).encode("utf-8")), "application/json"
+    )
+    return pages_key
+
+
+@celery_instance.task(soft_time_limit=60, time_limit=120)
+def process_extracted_pdf_pages(
+    page_range_keys: List[str], hub_id: str, post_id: UUID, attachment_id: str
+) -> None:
+    """
+    Chord callback ingesting the page texts extracted by `extract_pdf_page_range`.
+
+    The callback runs under the task ID of the `process_uploaded_file` task it
+    replaces, so its success is published to the clients waiting for the upload.
+
+    The page texts are read from the object store one range at a time, and deleted
+    once the attachment is ingested.
+
+    Args:
+        page_range_keys (List[str]): The object store keys of the page texts of
+            each range, in range order.
+        hub_id (str): The ID of the hub to which the file belongs.
+        post_id (UUID): The UUID of the post to which the file belongs.
+        attachment_id (str): The content id of the attachment.
+
+    Returns:
+        None
+    """
+    object_store = get_object_store()
+
+    try:
+        ingest_attachment_text(
+            chain.from_iterable(
+                json.loads(object_store.read(pages_key))
+                for pages_key in page_range_keys
+            ),
+            hub_id,
+            post_id,
+            attachment_id,
+            paged=True,
         )
+        mark_content_status(attachment_id, "ready")
 
     except Exception as error:
         print(f"error: {error}")
+        mark_content_status(attachment_id, "failed")
+
+    finally:
+        for pages_key in page_range_keys:
+            object_store.delete(pages_key)
 
 
 @task_success.connect(sender=process_uploaded_file)
+@task_success.connect(sender=process_extracted_pdf_pages)
 def task_success_handler(sender=None, result=None, **kwargs):
     """
     Event handler function triggered when a Celery task succeeds.
@@ -297,6 +753,7 @@ def task_success_handler(sender=None, result=None, **kwargs):
 
 
 @task_failure.connect(sender=process_uploaded_file)
+@task_failure.connect(sender=process_extracted_pdf_pages)
 def task_failure_handler(sender=None, exception=None, traceback=None, **kwargs):
     """
     Event handler function triggered when a Celery task fails.
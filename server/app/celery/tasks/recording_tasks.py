@@ -2,8 +2,8 @@
 Module for processing image files and generating recording embeddings.
 
 This module provides functionalities for processing a list of image files to identify
-and store different frames as recording embeddings. It includes methods for calculating
-frame differences between images, extracting text embeddings from image contexts, and
+and store different frames as recording embeddings. It includes methods for detecting
+scene changes between frames, extracting text embeddings from image contexts, and
 storing the generated embeddings in a MongoDB database.
 
 The module utilizes external services such as image recognition APIs and pre-trained
@@ -12,76 +12,63 @@ Celery for asynchronous task execution, allowing scalable and efficient processi
 of image files in distributed environments.
 
 Functions:
-    - calculate_frame_difference: Calculate the frame difference between two images.
     - bytes_to_base64: Convert bytes of an image to a base64 encoded string.
     - get_image_context: Obtain a detailed textual description of an image using an image
                          recognition API.
-    - extract_text_embedding: Generate text embeddings for a text chunk using a pre-trained
-                              model.
+    - describe_frame: Shrink a single frame and describe it with the vision model.
+    - detect_chrome: Detect the static UI chrome of a recording.
+    - reserve_frame_sequences: Reserve sequence numbers for the frame embeddings of a room.
     - process_image_files: Process a list of image files to identify and store different
                            frames as recording embeddings.
+    - skip_frame_batch: Give up on a batch of frames that keeps failing.
+    - catch_up_frame_session: Advance a session past the batches that were skipped.
+    - process_frame_batch: Process one batch of frames of a live frame ingestion session.
+    - process_recording_video: Extract and store the keyframes of a recording video file.
 
 Note:
-    - The 'calculate_frame_difference' function calculates the frame difference between
-      two images based on their pixel values.
     - The 'get_image_context' function sends an image to an image recognition API and
       retrieves a textual description of the image content.
-    - The 'extract_text_embedding' function generates text embeddings for a given text
-      chunk using a pre-trained model.
     - The 'process_image_files' Celery task analyzes image files to identify frames with
       significant differences and stores their recording embeddings in a MongoDB database.
 """
 
 import os
 import base64
-from typing import List
-import cv2
+import time
+from contextlib import ExitStack
+from functools import partial
+from typing import List, Optional
 
+from celery.exceptions import SoftTimeLimitExceeded
 from app.celery.celery import celery_instance
-from app.models.recording_embedding import RecordingEmbedding
+from app.celery.worker_lifecycle import get_worker_resources
+from app.ingestion import iter_batches
+from app.recordings import (
+    CropBox,
+    EmbeddingLedger,
+    FrameSession,
+    ImageContextCache,
+    TranscriptCheckpoint,
+    content_area,
+    decode_thumbnail,
+    decode_thumbnails,
+    detect_static_chrome,
+    frame_hashes,
+    frame_reservation_id,
+    ingest_frames,
+    ingest_transcript,
+    iter_video_keyframes,
+    prepare_frame,
+    record_payload_sizes,
+    select_keyframes,
+    transcript_id,
+)
+from app.storage import get_object_store
 from config.config import Config
-from dotenv import load_dotenv
-from mongoengine import connect
 import numpy as np
-import requests
-import google.generativeai as genai
-import redis
 import smart_open
 
 
-def calculate_frame_difference(image_bytes1: bytes, image_bytes2: bytes) -> float:
-    """
-    Calculate the frame difference between two images.
-
-    Args:
-        image_bytes1 (bytes): Bytes of the first image.
-        image_bytes2 (bytes): Bytes of the second image.
-
-    Returns:
-        float: Frame difference between the two images. Value ranges from 0.0
-        (same image) to 1.0 (completely different images).
-    """
-    try:
-
-        image1 = cv2.imdecode(np.frombuffer(image_bytes1, np.uint8), cv2.IMREAD_COLOR)
-        image2 = cv2.imdecode(np.frombuffer(image_bytes2, np.uint8), cv2.IMREAD_COLOR)
-
-        gray1 = cv2.cvtColor(image1, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(image2, cv2.COLOR_BGR2GRAY)
-
-        diff = cv2.absdiff(gray1, gray2)
-
-        mean_diff = diff.mean()
-
-        normalized_diff = mean_diff / 255.0
-
-        return normalized_diff
-
-    except Exception as error:
-        print("Error:", error)
-        raise
-
-
 def bytes_to_base64(image_bytes: bytes) -> str:
     """
     Convert bytes of an image to a base64 encoded string.
@@ -151,11 +138,13 @@ def get_image_context(image_base64: str) -> str:
         baseten_api_key = os.environ.get("BASETEN_API_KEY")
         baseten_model_id = os.environ.get("BASETEN_MODEL_ID")
 
-        res = requests.post(
+        res = get_worker_resources().http_session.post(
             f"https://model-{baseten_model_id}.api.baseten.co/production/predict",
             headers={"Authorization": f"Api-Key {baseten_api_key}"},
             json=data,
+            timeout=Config.VISION_TIMEOUT,
         )
+        res.raise_for_status()
 
         response_data = res.json()
 
@@ -166,46 +155,112 @@ def get_image_context(image_base64: str) -> str:
         raise
 
 
-def extract_text_embedding(chunk: str) -> list:
+def describe_frame(image_bytes: bytes, crop: Optional[CropBox] = None) -> str:
     """
-    Generate text embeddings for a text chunk using a pre-trained model.
+    Describe a single frame with the vision model, within `VISION_TIMEOUT`.
+
+    The frame is cropped to the content area, downscaled and re-encoded before it
+    is sent, and its size before and after is counted in `vision_payload_stats`.
 
     Args:
-        chunk (str): The text chunk for which embeddings are to be generated.
+        image_bytes (bytes): The encoded frame.
+        crop (CropBox, optional): The content area of the recording.
 
     Returns:
-        list: A list of embedding vectors representing the text chunk.
+        str: The description of the frame.
+    """
+    payload = prepare_frame(image_bytes, crop)
+    record_payload_sizes(Config.REDIS_CLIENT, len(image_bytes), len(payload))
+
+    return get_image_context(bytes_to_base64(image_bytes=payload))
 
-    Raises:
-        Exception: If an error occurs during the embedding generation process.
 
+def detect_chrome(thumbnails: np.ndarray) -> Optional[CropBox]:
     """
-    try:
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=chunk,
-            task_type="semantic_similarity",
-        )
-        return result["embedding"]
-    except Exception as error:
-        print(f"Error: {error}")
-        raise
+    Detect the static UI chrome of a recording, unless `VISION_CROP_CHROME` is off.
+
+    Args:
+        thumbnails (np.ndarray): The thumbnails of the frames of the recording.
+
+    Returns:
+        CropBox: The content area of the recording, or None.
+    """
+    return detect_static_chrome(thumbnails) if Config.VISION_CROP_CHROME else None
+
+
+def reserve_frame_sequences(
+    room_id: str, count: int, reservation: Optional[str] = None
+) -> int:
+    """
+    Reserve `count` consecutive sequence numbers for the frame embeddings of a room.
+
+    The frame embeddings are stored under chunk IDs derived from their sequence
+    numbers, so a task that runs again, or frames that are uploaded again, must
+    reuse their sequence numbers to store nothing twice. The first sequence number
+    of a reservation is therefore kept in Redis for `FRAME_SEQUENCE_RESERVATION_TTL`
+    seconds and returned again.
+
+    Args:
+        room_id (str): The unique identifier of the room.
+        count (int): The number of sequence numbers to reserve.
+        reservation (str, optional): Identifies the reservation across runs,
+            usually `frame_reservation_id` of the frames.
+
+    Returns:
+        int: The first reserved sequence number.
+    """
+    redis_client = Config.REDIS_CLIENT
+    reservation_key = f"room_id_{room_id}_frame_sequence_reservation:{reservation}"
+
+    if reservation is not None:
+        first_sequence = redis_client.get(reservation_key)
+        if first_sequence is not None:
+            return int(first_sequence)
+
+    first_sequence = (
+        redis_client.incrby(f"room_id_{room_id}_frame_sequence", count) - count + 1
+    )
+
+    if reservation is not None and not redis_client.set(
+        reservation_key,
+        first_sequence,
+        nx=True,
+        ex=Config.FRAME_SEQUENCE_RESERVATION_TTL,
+    ):
+        return int(redis_client.get(reservation_key))
+
+    return first_sequence
 
 
 @celery_instance.task()
-def process_image_files(image_files: List[bytes], room_id: str) -> None:
+def process_image_files(
+    image_files: Optional[List[bytes]],
+    room_id: str,
+    image_keys: Optional[List[str]] = None,
+    timestamps: Optional[List[float]] = None,
+) -> None:
     """
     Process a list of image files to identify and store different frames as recording embeddings.
 
     This Celery task analyzes a list of image files to identify frames with significant differences
     and stores their corresponding recording embeddings in a MongoDB database. Each image frame is
-    compared with its adjacent frame, and if the frame difference exceeds a threshold, the frame
-    is considered different and its recording embedding is calculated and stored.
+    decoded once into a small grayscale thumbnail, and frames are clustered into visually distinct
+    scenes by perceptual hash. Only one representative frame per scene is described by the vision
+    model and stored as a recording embedding; the number of skipped frames is added to
+    `room_id_{room_id}_skipped_frames` in Redis. Recording embeddings are stored and counted
+    through the EmbeddingLedger under sequence numbers reserved for the frames themselves, so
+    a task that runs twice, or frames uploaded twice, are stored and counted once. Representative frames are described
+    concurrently, at most `VISION_MAX_CONCURRENCY` at a time, and their descriptions are
+    embedded and inserted in batches as they arrive.
 
     Args:
-        image_files (List[bytes]): A list of image files as bytes.
+        image_files (List[bytes], optional): A list of image files as bytes.
         room_id (str): The unique identifier of the room associated with the image files.
-        hub_id (str): The unique identifier of the hub associated with the image files.
+        image_keys (List[str], optional): The object store keys of the image files, used
+            when `image_files` is None (claim-check mode). The objects are deleted once
+            the frames have been processed.
+        timestamps (List[float], optional): The offset of each frame from the start of
+            the recording, in seconds, stored as the time of its recording embedding.
 
     Returns:
         None: This task does not return any value.
@@ -217,106 +272,419 @@ def process_image_files(image_files: List[bytes], room_id: str) -> None:
         - The 'image_files' parameter should contain a list of image files as bytes.
         - The 'room_id' parameter specifies the unique identifier of the room associated
         with the images.
-        - The 'hub_id' parameter specifies the unique identifier of the hub associated with
-        the images.
+        - The 'image_keys' parameter replaces 'image_files' when frames are uploaded to
+        the object store instead of being sent through the broker.
         - The 'soft_time_limit' and 'time_limit' parameters specify the soft and hard time
         limits for task execution.
 
     """
     try:
-        load_dotenv()
-        connect(
-            db=os.getenv("MONGO_DB"),
-            host=os.getenv("MONGO_URI"),
-            username=os.getenv("MONGO_USERNAME"),
-            password=os.getenv("MONGO_PASSWORD"),
-            alias="default",
-        )
+        object_store = get_object_store()
 
-        different_image_files = []
-        image_files_length = len(image_files)
-        print(image_files_length)
+        if image_files is None:
+            image_files = [object_store.read(image_key) for image_key in image_keys]
 
-        for i in range(image_files_length - 1):
-            frame_difference = calculate_frame_difference(
-                image_files[i], image_files[i + 1]
-            )
-            print(frame_difference)
+        if not image_files:
+            return
+
+        thumbnails = decode_thumbnails(image_files)
+        keyframes = select_keyframes(thumbnails)
+        skipped_frames = len(image_files) - len(keyframes)
+        print(f"{len(keyframes)} of {len(image_files)} frames selected")
+
+        Config.REDIS_CLIENT.incrby(f"room_id_{room_id}_skipped_frames", skipped_frames)
 
-            if frame_difference > 0.0:
-                different_image_files.append(image_files[i])
+        different_image_files = [image_files[index] for index in keyframes]
 
-        last_image_frame_difference = calculate_frame_difference(
-            image_files[image_files_length - 2], image_files[image_files_length - 1]
+        cache = (
+            ImageContextCache(Config.REDIS_CLIENT)
+            if Config.IMAGE_CONTEXT_CACHE_ENABLED
+            else None
+        )
+        spans = (
+            [(timestamps[index], timestamps[index]) for index in keyframes]
+            if timestamps
+            else None
+        )
+        number_of_recording_embeddings = ingest_frames(
+            different_image_files,
+            thumbnails[keyframes],
+            room_id,
+            partial(describe_frame, crop=detect_chrome(thumbnails)),
+            EmbeddingLedger(Config.REDIS_CLIENT, room_id),
+            cache=cache,
+            spans=spans,
+            first_sequence=reserve_frame_sequences(
+                room_id,
+                len(keyframes),
+                frame_reservation_id(different_image_files, spans),
+            ),
+        )
+        print(
+            f"{number_of_recording_embeddings} recording embeddings stored for {room_id}"
         )
-        print(last_image_frame_difference)
 
-        if last_image_frame_difference > 0.0:
-            different_image_files.append(image_files[image_files_length - 1])
+        for image_key in image_keys or []:
+            object_store.delete(image_key)
 
-        recording_embedding_docs = []
+    except Exception as error:
+        print(f"error: {error}")
 
-        for image in different_image_files:
-            image_base64_string = bytes_to_base64(image_bytes=image)
-            image_context = get_image_context(image_base64=image_base64_string)
-            image_context_embedding = extract_text_embedding(chunk=image_context)
 
-            recording_embedding = RecordingEmbedding(
-                room_id=room_id,
-                text_content=image_context,
-                embeddings=image_context_embedding,
-            )
+def skip_frame_batch(
+    session: FrameSession,
+    sequence: int,
+    image_keys: List[str],
+    final: bool,
+    object_store,
+) -> None:
+    """
+    Give up on a batch of frames that failed `FRAME_BATCH_MAX_FAILURES` times.
 
-            recording_embedding_docs.append(recording_embedding)
+    A batch whose state was not saved yet is marked as processed without changing
+    the scene state, so the batches after it are still processed. The frames of
+    the batch are deleted, and the session is deleted with the final batch.
 
-        RecordingEmbedding.objects.insert(recording_embedding_docs, load_bulk=False)
+    Args:
+        session (FrameSession): The frame ingestion session of the room.
+        sequence (int): The sequence number of the batch.
+        image_keys (List[str]): The object store keys of the frames of the batch.
+        final (bool): Whether this batch closes the session.
+        object_store: The object store holding the frames.
+    """
+    with session.lock():
+        state = session.load_state()
+        batch = session.load_batch(sequence)
 
-        redis_client = Config.REDIS_CLIENT
+        if batch is not None:
+            keyframes, discarded_keys = batch
+            unused_keys = [keyframe.key for keyframe in keyframes] + discarded_keys
+        elif state is None or state.next_batch == sequence:
+            unused_keys = list(image_keys)
+            if state is not None:
+                state.next_batch += 1
+                session.save_state(state)
+        else:
+            unused_keys = []
 
-        recording_number_of_embeddings_key = (
-            f"room_id_{room_id}_number_of_recording_embeddings"
-        )
+        if final and state is not None and state.pending_key is not None:
+            unused_keys.append(state.pending_key)
+
+        session.fail_batch(sequence)
 
-        number_of_recording_embeddings = len(different_image_files)
+    for image_key in unused_keys:
+        object_store.delete(image_key)
 
-        with redis_client.pipeline() as pipe:
-            try:
-                existing_value = pipe.get(recording_number_of_embeddings_key)
-                if existing_value:
-                    pipe.incrby(
-                        recording_number_of_embeddings_key,
-                        number_of_recording_embeddings,
+    if final:
+        session.delete()
+
+    print(f"Frame batch {sequence} of room {session.room_id} skipped")
+
+
+def catch_up_frame_session(
+    session: FrameSession, sequence: int, give_up: bool = False
+) -> bool:
+    """
+    Advance a session past the skipped batches before a batch.
+
+    Args:
+        session (FrameSession): The frame ingestion session of the room.
+        sequence (int): The sequence number of the waiting batch.
+        give_up (bool): Whether to skip the batches the waiting batch is still
+            waiting for, because they did not arrive within `FRAME_BATCH_MAX_WAIT`.
+
+    Returns:
+        bool: True if the batch no longer waits for an earlier batch.
+    """
+    with session.lock():
+        state = session.load_state()
+        if state is None:
+            return True
+
+        next_batch = state.next_batch
+        if give_up:
+            for missing in range(state.next_batch, sequence):
+                session.skip_batch(missing)
+                print(f"Frame batch {missing} of room {session.room_id} skipped")
+
+        while state.next_batch < sequence and session.is_skipped(state.next_batch):
+            state.next_batch += 1
+
+        if state.next_batch != next_batch:
+            session.save_state(state)
+
+        return state.next_batch >= sequence
+
+
+@celery_instance.task(bind=True, max_retries=None)
+def process_frame_batch(
+    self,
+    room_id: str,
+    sequence: int,
+    image_keys: List[str],
+    final: bool = False,
+    timestamps: Optional[List[float]] = None,
+    waiting_since: Optional[float] = None,
+) -> None:
+    """
+    Process one batch of frames appended to the frame ingestion session of a room.
+
+    Batches are applied to the scene state of the session strictly in the order they
+    were received: a batch that arrives before its predecessor has been processed is
+    queued again shortly after, without using up its retries. Batches that were
+    skipped are passed over, and a batch waiting for more than `FRAME_BATCH_MAX_WAIT`
+    seconds skips the batches it is waiting for. Scenes that ended in this batch are
+    described, embedded and stored as recording embeddings, so the recording can be
+    chatted with while the class is still live. The final batch, sent when the session is closed, describes
+    the scene still on screen and deletes the session.
+
+    Keyframes are cropped to the content area estimated from the frames of all the
+    batches of the session, once `VISION_CHROME_MIN_SCENES` scenes were seen.
+
+    A failed batch is retried after `FRAME_BATCH_RETRY_DELAY` seconds. The keyframes
+    of a batch are saved with the scene state, so a retry after the state was saved
+    stores the same keyframes. After `FRAME_BATCH_MAX_FAILURES` failures the batch
+    is skipped, so it does not hold back the batches after it.
+
+    Args:
+        room_id (str): The unique identifier of the room being recorded.
+        sequence (int): The sequence number of the batch within the session.
+        image_keys (List[str]): The object store keys of the frames, in recording order.
+        final (bool): Whether this batch closes the session.
+        timestamps (List[float], optional): The offset of each frame from the start of
+            the session, in seconds.
+        waiting_since (float, optional): The time the batch started waiting for
+            its predecessor.
+
+    Returns:
+        None: This task does not return any value.
+    """
+    session = FrameSession(Config.REDIS_CLIENT, room_id)
+    object_store = get_object_store()
+    algorithm = (
+        "dhash" if Config.FRAME_HASH_ALGORITHM == "off" else Config.FRAME_HASH_ALGORITHM
+    )
+
+    try:
+        frames = {}
+        state = None
+        batch = session.load_batch(sequence)
+
+        if batch is None:
+            if session.is_skipped(sequence):
+                # The batches after it stopped waiting, nothing will use the frames.
+                for image_key in image_keys:
+                    object_store.delete(image_key)
+                return
+
+            status = session.status()
+            if status is not None and sequence > status["batches_processed"]:
+                waiting_since = waiting_since or time.time()
+                if not catch_up_frame_session(
+                    session,
+                    sequence,
+                    give_up=time.time() - waiting_since > Config.FRAME_BATCH_MAX_WAIT,
+                ):
+                    self.apply_async(
+                        args=[room_id, sequence, image_keys, final, timestamps],
+                        kwargs={"waiting_since": waiting_since},
+                        task_id=self.request.id,
+                        countdown=1,
                     )
+                    return
+
+            image_files = [object_store.read(image_key) for image_key in image_keys]
+            thumbnails = decode_thumbnails(image_files)
+            hashes = frame_hashes(thumbnails, algorithm)
+            frames.update(zip(image_keys, zip(image_files, thumbnails)))
+
+            with session.lock():
+                state = session.load_state()
+
+                if state is None:
+                    # The session expired or was deleted, nothing will use the frames.
+                    batch = [], list(image_keys)
+                elif sequence < state.next_batch:
+                    # An earlier delivery of the batch already processed it.
+                    batch = [], []
                 else:
-                    pipe.set(
-                        recording_number_of_embeddings_key,
-                        number_of_recording_embeddings,
+                    keyframes, discarded_keys = state.advance(
+                        image_keys, hashes, timestamps=timestamps
                     )
+                    if final:
+                        flushed_keyframes, flushed_discarded_keys = state.flush()
+                        keyframes += flushed_keyframes
+                        discarded_keys += flushed_discarded_keys
+                    state.observe(thumbnails)
+                    state.next_batch += 1
+                    session.save_state(state, sequence, keyframes, discarded_keys)
+                    batch = keyframes, discarded_keys
+
+        keyframes, discarded_keys = batch
+        keyframe_keys = [keyframe.key for keyframe in keyframes]
+        for image_key in keyframe_keys:
+            if image_key not in frames:
+                image = object_store.read(image_key)
+                frames[image_key] = (image, decode_thumbnail(image))
+
+        if keyframe_keys:
+            if state is None:
+                state = session.load_state()
+            # The chrome is estimated from all the frames of the session so far.
+            crop = (
+                state.chrome()
+                if state is not None and Config.VISION_CROP_CHROME
+                else None
+            )
+            cache = (
+                ImageContextCache(Config.REDIS_CLIENT)
+                if Config.IMAGE_CONTEXT_CACHE_ENABLED
+                else None
+            )
+            images = [frames[image_key][0] for image_key in keyframe_keys]
+            spans = [(keyframe.start_time, keyframe.end_time) for keyframe in keyframes]
+            ingest_frames(
+                images,
+                np.stack([frames[image_key][1] for image_key in keyframe_keys]),
+                room_id,
+                partial(describe_frame, crop=crop),
+                EmbeddingLedger(Config.REDIS_CLIENT, room_id),
+                cache=cache,
+                spans=spans,
+                first_sequence=reserve_frame_sequences(
+                    room_id, len(keyframes), frame_reservation_id(images, spans)
+                ),
+            )
+
+        if discarded_keys:
+            Config.REDIS_CLIENT.incrby(
+                f"room_id_{room_id}_skipped_frames", len(discarded_keys)
+            )
+
+        for image_key in keyframe_keys + discarded_keys:
+            object_store.delete(image_key)
 
-                pipe.execute()
-            except redis.exceptions.RedisError as error:
-                print(f"Error updating recording embeddings count: {error}")
-            else:
-                print(f"Recording embeddings count updated for room_id: {room_id}")
+        session.finish_batch(sequence)
+        if final:
+            session.delete()
+
+        print(
+            f"Frame batch {sequence} of room {room_id}: "
+            f"{len(keyframe_keys)} keyframes, {len(discarded_keys)} skipped"
+        )
 
     except Exception as error:
         print(f"error: {error}")
 
+        if session.count_failure(sequence) < Config.FRAME_BATCH_MAX_FAILURES:
+            raise self.retry(countdown=Config.FRAME_BATCH_RETRY_DELAY)
+
+        skip_frame_batch(session, sequence, image_keys, final, object_store)
 
-@celery_instance.task(soft_time_limit=60, time_limit=120)
-def process_recording_webhook(transcript_txt_presigned_url: str, room_id: str) -> None:
+
+@celery_instance.task()
+def process_recording_video(
+    room_id: str,
+    video_key: Optional[str] = None,
+    video_path: Optional[str] = None,
+) -> None:
+    """
+    Extract the keyframes of a recording video and store them as recording embeddings.
+
+    Frames are sampled from the video at `VIDEO_SAMPLE_FPS` and scene changes are
+    detected on the stream, so only one frame per slide is described. Keyframes are
+    described, embedded and inserted in batches of `EMBEDDING_BATCH_SIZE` as they are
+    found, and only the current batch is held in memory. Keyframe extraction is
+    deterministic, so the sequence numbers of each batch are reserved for its keyframes,
+    and a task that runs twice, or a video uploaded twice, stores and counts them once.
+
+    The range of each thumbnail pixel is accumulated over the keyframes found so far,
+    and the frames are cropped to the content area once `VISION_CHROME_MIN_SCENES`
+    keyframes were seen, as in live frame sessions.
+
+    Args:
+        room_id (str): The unique identifier of the room the recording belongs to.
+        video_key (str, optional): The object store key of the video file.
+        video_path (str, optional): The local path of the video file, used when
+            `video_key` is None.
+
+    Returns:
+        None: This task does not return any value.
+    """
+    try:
+        object_store = get_object_store()
+        cache = (
+            ImageContextCache(Config.REDIS_CLIENT)
+            if Config.IMAGE_CONTEXT_CACHE_ENABLED
+            else None
+        )
+
+        with ExitStack() as stack:
+            if video_key is not None:
+                video_path = stack.enter_context(object_store.local_path(video_key))
+
+            ledger = EmbeddingLedger(Config.REDIS_CLIENT, room_id)
+            pixel_min = pixel_max = None
+            scenes = 0
+
+            for batch in iter_batches(
+                iter_video_keyframes(video_path), Config.EMBEDDING_BATCH_SIZE
+            ):
+                thumbnails = np.stack([thumbnail for _, _, _, thumbnail in batch])
+                crop = None
+                if Config.VISION_CROP_CHROME:
+                    if pixel_min is None:
+                        pixel_min, pixel_max = thumbnails.min(0), thumbnails.max(0)
+                    else:
+                        pixel_min = np.minimum(pixel_min, thumbnails.min(0))
+                        pixel_max = np.maximum(pixel_max, thumbnails.max(0))
+                    scenes += len(batch)
+                    if scenes >= Config.VISION_CHROME_MIN_SCENES:
+                        crop = content_area(pixel_min, pixel_max)
+
+                images = [image for _, _, image, _ in batch]
+                spans = [(start_time, end_time) for start_time, end_time, _, _ in batch]
+                number_of_recording_embeddings = ingest_frames(
+                    images,
+                    thumbnails,
+                    room_id,
+                    partial(describe_frame, crop=crop),
+                    ledger,
+                    cache=cache,
+                    spans=spans,
+                    first_sequence=reserve_frame_sequences(
+                        room_id, len(batch), frame_reservation_id(images, spans)
+                    ),
+                )
+                print(
+                    f"{number_of_recording_embeddings} keyframes stored for {room_id}"
+                )
+
+    except Exception as error:
+        print(f"error: {error}")
+
+
+@celery_instance.task(bind=True, soft_time_limit=60, time_limit=120, max_retries=20)
+def process_recording_webhook(
+    self,
+    transcript_txt_presigned_url: str,
+    room_id: str,
+    recording_id: Optional[str] = None,
+) -> None:
     """
     Process transcript text data from a webhook and store embeddings in the database.
 
-    This Celery task retrieves transcript text data from a presigned URL provided by a webhook.
-    The transcript text is divided into chunks, and embeddings are generated for each chunk.
-    These embeddings are then stored as RecordingEmbedding documents in the database, associated
-    with the corresponding room ID. Additionally, the count of recording embeddings for the
-    specified room ID is updated in Redis for tracking purposes.
+    This Celery task streams transcript text data from a presigned URL provided by a webhook.
+    The transcript is divided into chunks as it is read, the chunks are embedded in concurrent
+    batches, and the embeddings are stored as RecordingEmbedding documents batch by batch,
+    associated with the corresponding room ID. The count of recording embeddings for the
+    specified room ID is increased in Redis after every batch.
 
     Args:
         transcript_txt_presigned_url (str): The presigned URL containing the transcript text data.
         room_id (str): The unique identifier of the room associated with the transcript text.
+        recording_id (str, optional): The ID of the recording the transcript belongs to.
+            Without it, the transcript is identified by its URL.
 
     Returns:
         None: This task does not return any value.
@@ -325,69 +693,29 @@ def process_recording_webhook(transcript_txt_presigned_url: str, room_id: str) -
         Exception: An error occurred during the processing or storage of the transcript text data.
 
     Notes:
-        - The transcript text is retrieved from the presigned URL using the smart_open library.
-        - The text content is divided into chunks, each containing up to 1000 characters,
-        for embedding generation.
-        - Embeddings are generated for each chunk using the extract_text_embedding function.
-        - The RecordingEmbedding documents, containing text content and corresponding embeddings,
-        are inserted
-          into the database using a bulk insertion operation.
-        - The count of recording embeddings for the specified room ID is updated in Redis for
-        monitoring purposes.
+        - The transcript text is streamed from the presigned URL using the smart_open library.
+        - The text content is divided into sentence-aligned, token-budgeted chunks by the
+        configured chunker for embedding generation.
+        - The number of chunks stored is checkpointed per transcript after every batch. When the
+        soft time limit is reached the task is retried and continues after the last stored
+        chunk, and a transcript that was fully ingested is not ingested again.
 
     """
     try:
-        load_dotenv()
-        connect(
-            db=os.getenv("MONGO_DB"),
-            host=os.getenv("MONGO_URI"),
-            username=os.getenv("MONGO_USERNAME"),
-            password=os.getenv("MONGO_PASSWORD"),
-            alias="default",
+        checkpoint = TranscriptCheckpoint(
+            Config.REDIS_CLIENT,
+            room_id,
+            transcript_id(transcript_txt_presigned_url, recording_id),
         )
 
-        text_content = None
-
         with smart_open.open(transcript_txt_presigned_url, "rb") as transcript_file:
-            text_content = transcript_file.read().decode("utf-8")
-
-        embedding_docs = []
-
-        num_chunks = len(text_content)
-        counter = 0
+            inserted = ingest_transcript(transcript_file, room_id, checkpoint)
 
-        for i in range(0, num_chunks, 1000):
-            chunk = text_content[i : i + 1000]
-            embedding = extract_text_embedding(chunk)
-            counter += 1
-            embedding_doc = RecordingEmbedding(
-                room_id=room_id,
-                text_content=chunk,
-                embeddings=embedding,
-            )
-            embedding_docs.append(embedding_doc)
-
-        RecordingEmbedding.objects.insert(embedding_docs, load_bulk=False)
-
-        recording_number_of_embeddings_key = (
-            f"room_id_{room_id}_number_of_recording_embeddings"
-        )
-
-        redis_client = Config.REDIS_CLIENT
-
-        with redis_client.pipeline() as pipe:
-            try:
-                existing_value = pipe.get(recording_number_of_embeddings_key)
-                if existing_value:
-                    pipe.incrby(recording_number_of_embeddings_key, counter)
-                else:
-                    pipe.set(recording_number_of_embeddings_key, counter)
+        print(f"{inserted} transcript embeddings stored for room_id: {room_id}")
 
-                pipe.execute()
-            except redis.exceptions.RedisError as error:
-                print(f"Error updating recording embeddings count: {error}")
-            else:
-                print(f"Recording embeddings count updated for room_id: {room_id}")
+    except SoftTimeLimitExceeded:
+        print(f"Transcript ingestion of room_id {room_id} paused, resuming")
+        raise self.retry(countdown=1)
 
     except Exception as error:
         print(f"error: {error}")
@@ -0,0 +1,319 @@
+"""
+Module managing the clients shared by the tasks of a Celery worker process.
+
+Each worker process opens its MongoDB connection, a pooled Redis client and a
+pooled HTTP session once, when the process starts, instead of every task
+reloading the environment and reconnecting. The clients are created after the
+prefork pool has forked, so no socket is shared between processes, and
+`Config.REDIS_CLIENT` is pointed to the pooled Redis client of the process.
+
+The number of connections each process has opened is published to the Redis
+hash `celery_worker_connections` after every task, keyed by
+`{hostname}:{pid}`, so connection churn can be monitored across workers.
+
+Classes:
+    ConnectionCounter: Thread-safe counters of opened connections.
+    WorkerResources: The clients shared by the tasks of a worker process.
+
+Functions:
+    init_worker_resources: Create the clients of the current process.
+    get_worker_resources: Return the clients of the current process.
+    shutdown_worker_resources: Close the clients of the current process.
+    get_worker_connection_counts: Read the published connection counts.
+"""
+
+import json
+import os
+import socket
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+import redis
+import requests
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from dotenv import load_dotenv
+from mongoengine import connect, disconnect
+from pymongo import monitoring
+from requests.adapters import HTTPAdapter
+from config.config import Config
+
+CONNECTION_COUNTS_KEY = "celery_worker_connections"
+
+
+class ConnectionCounter:
+    """
+    Thread-safe counters of the connections opened by a worker process.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+        Increment the counter `name` by `amount`.
+        """
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Return a copy of the counters.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+
+class MongoConnectionListener(monitoring.ConnectionPoolListener):
+    """
+    PyMongo pool listener counting the MongoDB connections opened and closed.
+    """
+
+    def __init__(self, counter: ConnectionCounter):
+        self.counter = counter
+
+    def connection_created(self, event):
+        self.counter.increment("mongo_opened")
+
+    def connection_closed(self, event):
+        self.counter.increment("mongo_closed")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+class WorkerResources:
+    """
+    The clients shared by the tasks of a worker process.
+
+    Attributes:
+        pid (int): The ID of the process the clients belong to.
+        redis_client (redis.Redis): The Redis client backed by a bounded pool.
+        http_session (requests.Session): The HTTP session with pooled connections.
+        counter (ConnectionCounter): The counters of opened connections.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        http_session: requests.Session,
+        counter: ConnectionCounter,
+    ):
+        self.pid = os.getpid()
+        self.redis_client = redis_client
+        self.http_session = http_session
+        self.counter = counter
+
+    @property
+    def worker_name(self) -> str:
+        """
+        The field under which the counts of this process are published.
+        """
+        return f"{socket.gethostname()}:{self.pid}"
+
+    def connection_counts(self) -> Dict[str, int]:
+        """
+        Return the number of connections opened by this process so far.
+
+        Returns:
+            dict: The MongoDB connections opened and closed, the Redis and HTTP
+            connections opened and the number of tasks run.
+        """
+        counts = self.counter.snapshot()
+        pools = self.http_session.get_adapter("https://").poolmanager.pools
+
+        return {
+            "mongo_opened": counts.get("mongo_opened", 0),
+            "mongo_closed": counts.get("mongo_closed", 0),
+            "redis_opened": counts.get("redis_opened", 0),
+            "http_opened": sum(pools[key].num_connections for key in pools.keys()),
+            "tasks": counts.get("tasks", 0),
+        }
+
+    def record_connection_counts(self) -> None:
+        """
+        Publish the connection counts of this process to Redis.
+        """
+        self.redis_client.hset(
+            CONNECTION_COUNTS_KEY,
+            self.worker_name,
+            json.dumps(self.connection_counts()),
+        )
+
+
+_resources: Optional[WorkerResources] = None
+_resources_lock = threading.Lock()
+
+
+def init_worker_resources() -> WorkerResources:
+    """
+    Create the clients of the current process, once.
+
+    Clients inherited from a parent process through fork are discarded and
+    recreated.
+
+    Returns:
+        WorkerResources: The clients of the current process.
+    """
+    global _resources  # pylint: disable=global-statement
+
+    with _resources_lock:
+        if _resources is not None and _resources.pid == os.getpid():
+            return _resources
+
+        load_dotenv()
+        counter = ConnectionCounter()
+
+        disconnect(alias="default")
+        connect(
+            db=os.getenv("MONGO_DB"),
+            host=os.getenv("MONGO_URI"),
+            username=os.getenv("MONGO_USERNAME"),
+            password=os.getenv("MONGO_PASSWORD"),
+            alias="default",
+            maxPoolSize=Config.WORKER_MONGO_MAX_POOL_SIZE,
+            event_listeners=[MongoConnectionListener(counter)],
+        )
+
+        def on_redis_connect(connection: redis.Connection) -> None:
+            counter.increment("redis_opened")
+            connection.on_connect()
+
+        redis_client = redis.Redis(
+            connection_pool=redis.BlockingConnectionPool.from_url(
+                Config.REDIS_URL,
+                max_connections=Config.WORKER_REDIS_MAX_CONNECTIONS,
+                redis_connect_func=on_redis_connect,
+            )
+        )
+
+        http_session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=Config.WORKER_HTTP_POOL_SIZE,
+            pool_maxsize=Config.WORKER_HTTP_POOL_SIZE,
+        )
+        http_session.mount("https://", adapter)
+        http_session.mount("http://", adapter)
+
+        Config.REDIS_CLIENT = redis_client
+        _resources = WorkerResources(redis_client, http_session, counter)
+
+        print(f"Worker process {_resources.pid} connected to MongoDB and Redis")
+        return _resources
+
+
+def get_worker_resources() -> WorkerResources:
+    """
+    Return the clients of the current process, creating them on first use.
+
+    Worker pools without process init signals (solo, threads) and tasks executed
+    eagerly create the clients on their first task.
+
+    Returns:
+        WorkerResources: The clients of the current process.
+    """
+    if _resources is not None and _resources.pid == os.getpid():
+        return _resources
+    return init_worker_resources()
+
+
+def shutdown_worker_resources() -> None:
+    """
+    Close the clients of the current process and remove its published counts.
+    """
+    global _resources  # pylint: disable=global-statement
+
+    with _resources_lock:
+        if _resources is None or _resources.pid != os.getpid():
+            return
+
+        try:
+            _resources.redis_client.hdel(CONNECTION_COUNTS_KEY, _resources.worker_name)
+        except redis.exceptions.RedisError as error:
+            print(f"Error: {error}")
+
+        _resources.http_session.close()
+        _resources.redis_client.connection_pool.disconnect()
+        disconnect(alias="default")
+        _resources = None
+
+
+def get_worker_connection_counts(redis_client) -> Dict[str, dict]:
+    """
+    Read the connection counts published by every worker process.
+
+    Args:
+        redis_client: The Redis client holding the counts.
+
+    Returns:
+        dict: The connection counts of each process, keyed by `{hostname}:{pid}`.
+    """
+    return {
+        worker.decode("utf-8"): json.loads(counts)
+        for worker, counts in redis_client.hgetall(CONNECTION_COUNTS_KEY).items()
+    }
+
+
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    """
+    Create the clients of a pool process right after it is forked.
+    """
+    init_worker_resources()
+
+
+@task_prerun.connect
+def on_task_prerun(**kwargs):
+    """
+    Make sure the clients of the current process exist before a task runs.
+    """
+    get_worker_resources().counter.increment("tasks")
+
+
+@task_postrun.connect
+def on_task_postrun(**kwargs):
+    """
+    Publish the connection counts of the current process after a task ran.
+    """
+    try:
+        get_worker_resources().record_connection_counts()
+    except redis.exceptions.RedisError as error:
+        print(f"Error: {error}")
+
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(**kwargs):
+    """
+    Close the clients of a pool process when it exits.
+    """
+    shutdown_worker_resources()
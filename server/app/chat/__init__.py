@@ -0,0 +1,18 @@
+"""
+Provides access to the shared utilities of the chat endpoints.
+"""
+
+from .answer_cache import SemanticAnswerCache, answer_cache_stats
+from .conversation_memory import (
+    NO_CONVERSATION,
+    ConversationMemory,
+    conversation_user,
+    delete_conversations,
+)
+from .prompt import build_chat_prompt
+from .material_chat import (
+    AttachmentNotProcessedError,
+    MaterialChat,
+    generate_answer,
+    stream_answer,
+)
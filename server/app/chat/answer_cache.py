@@ -0,0 +1,235 @@
+"""
+Module providing a semantic cache of chat answers per attachment and per room.
+
+Students of a hub ask near-identical questions about the same material, and each
+one used to pay for a vector search and a full generation. The cache stores the
+embedding of every answered query with its answer and the IDs of the chunks it
+was generated from, and returns the cached answer of the most similar query when
+its cosine similarity reaches `ANSWER_CACHE_THRESHOLD`.
+
+Entries are scoped to the corpus they were answered from: the scope key holds
+the number of embeddings of the attachment or room, so adding chunks starts a
+new, empty scope and the previous one expires. A hit is also discarded when one
+of its source chunks was deleted since, for example by a re-upload.
+
+Classes:
+    SemanticAnswerCache: Redis-backed semantic cache of chat answers.
+
+Functions:
+    answer_cache_stats: Return the counters of the answer cache.
+"""
+
+import json
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+from config.config import Config
+
+ANSWER_CACHE_PREFIX = "answer_cache"
+ANSWER_CACHE_STATS_KEY = f"{ANSWER_CACHE_PREFIX}:stats"
+
+
+def answer_cache_stats(redis_client) -> dict:
+    """
+    Return the counters of the answer cache, aggregated across all scopes and workers.
+
+    Args:
+        redis_client: The Redis client holding the cache.
+
+    Returns:
+        dict: The hits, misses, hit rate and seconds of generation saved.
+    """
+    counters = {
+        key.decode("utf-8"): float(value)
+        for key, value in redis_client.hgetall(ANSWER_CACHE_STATS_KEY).items()
+    }
+    hits = int(counters.get("hits", 0))
+    misses = int(counters.get("misses", 0))
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "seconds_saved": counters.get("seconds_saved", 0.0),
+    }
+
+
+class SemanticAnswerCache:
+    """
+    Semantic cache of the chat answers about one attachment or room.
+
+    Entries live in two Redis hashes keyed by entry ID: the query embeddings as
+    packed float32 bytes under `answer_cache:{scope}:vectors`, and the query,
+    answer, source chunk IDs and generation time under `answer_cache:{scope}:answers`.
+
+    Attributes:
+        redis_client: The Redis client holding the cache.
+        document_class (type): The Embedding or RecordingEmbedding model answered from.
+        scope (str): The collection, partition and corpus size the cache is for.
+        threshold (float): The minimum cosine similarity of a hit.
+        ttl (int): The expiry of the scope after its last answer, in seconds.
+        max_entries (int): The maximum number of answers kept per scope.
+    """
+
+    KEY_PREFIX = ANSWER_CACHE_PREFIX
+
+    def __init__(
+        self,
+        redis_client,
+        document_class: type,
+        partition: str,
+        corpus_size: int,
+        threshold: float = Config.ANSWER_CACHE_THRESHOLD,
+        ttl: int = Config.ANSWER_CACHE_TTL,
+        max_entries: int = Config.ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.redis_client = redis_client
+        self.document_class = document_class
+        self.scope = f"{document_class._meta['collection']}:{partition}:{corpus_size}"
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @property
+    def vectors_key(self) -> str:
+        """
+        The Redis hash holding the query embeddings.
+        """
+        return f"{self.KEY_PREFIX}:{self.scope}:vectors"
+
+    @property
+    def answers_key(self) -> str:
+        """
+        The Redis hash holding the answers.
+        """
+        return f"{self.KEY_PREFIX}:{self.scope}:answers"
+
+    @property
+    def stats_key(self) -> str:
+        """
+        The Redis hash holding the counters shared by all scopes.
+        """
+        return ANSWER_CACHE_STATS_KEY
+
+    def get(self, query_embedding: Sequence[float]) -> Optional[str]:
+        """
+        Return the cached answer of the most similar query, if similar enough.
+
+        Args:
+            query_embedding (Sequence[float]): The embedding of the new query.
+
+        Returns:
+            str: The cached answer, or None on a miss.
+        """
+        started = time.perf_counter()
+        answer = None
+        match = self._closest(query_embedding)
+
+        if match is not None:
+            entry = self.redis_client.hget(self.answers_key, match)
+            entry = json.loads(entry) if entry else None
+
+            if entry is not None and self._sources_exist(entry["sources"]):
+                answer = entry["answer"]
+            else:
+                self.redis_client.hdel(self.vectors_key, match)
+                self.redis_client.hdel(self.answers_key, match)
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            if answer is None:
+                pipe.hincrby(self.stats_key, "misses", 1)
+            else:
+                pipe.hincrby(self.stats_key, "hits", 1)
+                pipe.hincrbyfloat(
+                    self.stats_key,
+                    "seconds_saved",
+                    max(entry["seconds"] - (time.perf_counter() - started), 0.0),
+                )
+            pipe.execute()
+
+        return answer
+
+    def set(
+        self,
+        query: str,
+        query_embedding: Sequence[float],
+        answer: str,
+        source_ids: Sequence,
+        seconds: float,
+    ) -> None:
+        """
+        Cache the answer to a query.
+
+        Args:
+            query (str): The query, kept for inspection.
+            query_embedding (Sequence[float]): The embedding of the query.
+            answer (str): The generated answer.
+            source_ids (Sequence): The IDs of the chunks the answer was generated from.
+            seconds (float): The time it took to retrieve and generate the answer.
+        """
+        entry_id = f"{time.time_ns():016x}"
+        entry = {
+            "query": query,
+            "answer": answer,
+            "sources": [str(source_id) for source_id in source_ids],
+            "seconds": seconds,
+        }
+
+        with self.redis_client.pipeline() as pipe:
+            pipe.hset(
+                self.vectors_key,
+                entry_id,
+                np.asarray(query_embedding, np.float32).tobytes(),
+            )
+            pipe.hset(self.answers_key, entry_id, json.dumps(entry))
+            pipe.expire(self.vectors_key, self.ttl)
+            pipe.expire(self.answers_key, self.ttl)
+            pipe.hkeys(self.vectors_key)
+            entry_ids = pipe.execute()[-1]
+
+        if len(entry_ids) > self.max_entries:
+            oldest = sorted(entry_ids)[: len(entry_ids) - self.max_entries]
+            self.redis_client.hdel(self.vectors_key, *oldest)
+            self.redis_client.hdel(self.answers_key, *oldest)
+
+    def stats(self) -> dict:
+        """
+        Return the counters aggregated across all scopes and workers.
+
+        Returns:
+            dict: The hits, misses, hit rate and seconds of generation saved.
+        """
+        return answer_cache_stats(self.redis_client)
+
+    def _closest(self, query_embedding: Sequence[float]) -> Optional[bytes]:
+        """
+        Return the entry ID of the most similar cached query above the threshold.
+        """
+        vectors = self.redis_client.hgetall(self.vectors_key)
+        if not vectors:
+            return None
+
+        entry_ids = list(vectors)
+        matrix = np.stack(
+            [np.frombuffer(vectors[key], np.float32) for key in entry_ids]
+        )
+        query = np.asarray(query_embedding, np.float32)
+
+        similarities = (matrix @ query) / (
+            np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12
+        )
+        best = int(np.argmax(similarities))
+
+        return entry_ids[best] if similarities[best] >= self.threshold else None
+
+    def _sources_exist(self, source_ids: List[str]) -> bool:
+        """
+        Return whether all the source chunks of an answer are still stored.
+        """
+        if not source_ids:
+            return True
+
+        return self.document_class.objects(id__in=source_ids).count() == len(
+            set(source_ids)
+        )
@@ -0,0 +1,200 @@
+"""
+Module providing the per-user conversation memory of the chat endpoints.
+
+Each user's conversation about an attachment or a room is kept in two Redis keys:
+a list of turns, appended to with one RPUSH per answer, and a rolling summary of
+the turns that were compacted. Once the list grows beyond
+`CONVERSATION_MAX_TURNS`, the `compact_conversation` task folds all but the last
+`CONVERSATION_KEEP_TURNS` turns into the summary, so the prompt stays bounded
+without rewriting the whole history on every turn.
+
+Classes:
+    ConversationMemory: The conversation of one user about one attachment or room.
+
+Functions:
+    conversation_user: Return the verified user a chat request belongs to.
+    delete_conversations: Delete the conversations of all users about a scope.
+"""
+
+import json
+from typing import Callable, List, Optional
+
+from flask import request
+from config.config import Config
+
+NO_CONVERSATION = "No previous conversation found!"
+MAX_CONVERSATION_LENGTH = 10000
+COMPACTION_LOCK_TTL = 300
+
+
+def conversation_user(verified_user: Optional[dict] = None) -> Optional[str]:
+    """
+    Return the verified user a chat request belongs to.
+
+    Only a verified Firebase ID token identifies the user, since anything else
+    sent by the client could name another user's conversation.
+
+    Args:
+        verified_user (dict, optional): A decoded Firebase ID token, for requests
+            verified outside of `firebase_token_required` such as Socket.IO events.
+            Defaults to the token verified by `firebase_token_required`.
+
+    Returns:
+        str: The UID of the verified Firebase user, or None when the request was
+            not verified, in which case the conversation must not be remembered.
+    """
+    current_user = verified_user or getattr(request, "current_user", None) or {}
+
+    return current_user.get("uid")
+
+
+def delete_conversations(redis_client, scope: str) -> None:
+    """
+    Delete the conversations of all users about an attachment or room.
+
+    Args:
+        redis_client: The Redis client holding the conversations.
+        scope (str): The attachment or room the conversations are about.
+    """
+    keys = list(
+        redis_client.scan_iter(match=f"{ConversationMemory.KEY_PREFIX}:{scope}:*")
+    )
+    if keys:
+        redis_client.delete(*keys)
+
+
+def format_turns(turns: List[dict]) -> str:
+    """
+    Format turns the way they are shown to the generative model.
+    """
+    return "".join(f"user: {turn['user']}\nmodel: {turn['model']}\n" for turn in turns)
+
+
+class ConversationMemory:
+    """
+    The conversation of one user about one attachment or room.
+
+    Attributes:
+        redis_client: The Redis client holding the conversation.
+        scope (str): The attachment or room the conversation is about.
+        user (str): The user having the conversation.
+        max_turns (int): The number of turns that triggers a compaction.
+        keep_turns (int): The number of recent turns kept verbatim by a compaction.
+        ttl (int): The expiry of the conversation after its last turn, in seconds.
+    """
+
+    KEY_PREFIX = "conversation"
+
+    def __init__(
+        self,
+        redis_client,
+        scope: str,
+        user: str,
+        max_turns: int = Config.CONVERSATION_MAX_TURNS,
+        keep_turns: int = Config.CONVERSATION_KEEP_TURNS,
+        ttl: int = Config.CONVERSATION_TTL,
+    ):
+        self.redis_client = redis_client
+        self.scope = scope
+        self.user = user
+        self.max_turns = max_turns
+        self.keep_turns = keep_turns
+        self.ttl = ttl
+
+    @property
+    def turns_key(self) -> str:
+        """
+        The Redis list holding the turns not compacted yet, oldest first.
+        """
+        return f"{self.KEY_PREFIX}:{self.scope}:{self.user}:turns"
+
+    @property
+    def summary_key(self) -> str:
+        """
+        The Redis key holding the summary of the compacted turns.
+        """
+        return f"{self.KEY_PREFIX}:{self.scope}:{self.user}:summary"
+
+    @property
+    def compaction_key(self) -> str:
+        """
+        The Redis key held while a compaction of the conversation is pending.
+        """
+        return f"{self.KEY_PREFIX}:{self.scope}:{self.user}:compacting"
+
+    def render(self) -> str:
+        """
+        Return the conversation as shown to the generative model.
+
+        Returns:
+            str: The summary followed by the recent turns, at most
+                `MAX_CONVERSATION_LENGTH` characters.
+        """
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(self.summary_key)
+            pipe.lrange(self.turns_key, 0, -1)
+            summary, turns = pipe.execute()
+
+        conversation = ""
+        if summary:
+            conversation += (
+                f"Summary of the earlier conversation: {summary.decode('utf-8')}\n"
+            )
+        conversation += format_turns([json.loads(turn) for turn in turns])
+
+        return conversation[-MAX_CONVERSATION_LENGTH:] or NO_CONVERSATION
+
+    def append(self, query: str, answer: str) -> None:
+        """
+        Append a turn, and schedule a compaction once there are too many turns.
+
+        Args:
+            query (str): The user's question.
+            answer (str): The answer given to the user.
+        """
+        with self.redis_client.pipeline() as pipe:
+            pipe.rpush(self.turns_key, json.dumps({"user": query, "model": answer}))
+            pipe.expire(self.turns_key, self.ttl)
+            pipe.expire(self.summary_key, self.ttl)
+            number_of_turns = pipe.execute()[0]
+
+        if number_of_turns > self.max_turns and self.redis_client.set(
+            self.compaction_key, 1, nx=True, ex=COMPACTION_LOCK_TTL
+        ):
+            # pylint: disable=import-outside-toplevel
+            from app.celery.tasks.chat_tasks import compact_conversation
+
+            compact_conversation.delay(self.scope, self.user)
+
+    def compact(self, summarize: Callable[[str, str], str]) -> None:
+        """
+        Fold all but the last `keep_turns` turns into the summary.
+
+        Turns appended while the summary is generated are kept, since the list
+        is only trimmed from its head.
+
+        Args:
+            summarize (Callable[[str, str], str]): Returns the new summary from
+                the previous summary and the formatted turns to fold into it.
+        """
+        try:
+            number_of_turns = self.redis_client.llen(self.turns_key)
+            count = number_of_turns - self.keep_turns
+            if count <= 0:
+                return
+
+            turns = self.redis_client.lrange(self.turns_key, 0, count - 1)
+            summary = self.redis_client.get(self.summary_key)
+            summary = summary.decode("utf-8") if summary else ""
+
+            new_summary = summarize(
+                summary, format_turns([json.loads(turn) for turn in turns])
+            )
+
+            with self.redis_client.pipeline() as pipe:
+                pipe.set(self.summary_key, new_summary, ex=self.ttl)
+                pipe.ltrim(self.turns_key, count, -1)
+                pipe.execute()
+
+        finally:
+            self.redis_client.delete(self.compaction_key)
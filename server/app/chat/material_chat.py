@@ -0,0 +1,190 @@
+"""
+Module providing the retrieval and conversation memory of chat with material.
+
+The blocking `chat-with-material` route and the streaming `chat-with-material`
+Socket.IO event answer a question the same way: a cached answer is reused when
+a similar question was answered before, otherwise the chunks of the attachment
+closest to the question are retrieved and the generative model is prompted.
+Only the way the answer is generated and delivered differs.
+
+Classes:
+    AttachmentNotProcessedError: Raised for an attachment without embeddings yet.
+    MaterialChat: One question about an attachment.
+
+Functions:
+    generate_answer: Generate the answer to a prompt in one response.
+    stream_answer: Generate the answer to a prompt, yielding text as it arrives.
+"""
+
+import math
+import time
+from typing import Iterator, Optional
+
+import google.generativeai as genai
+from app.chat.answer_cache import SemanticAnswerCache
+from app.chat.conversation_memory import NO_CONVERSATION, ConversationMemory
+from app.chat.prompt import build_chat_prompt
+from app.embeddings import extract_text_embedding
+from app.ingestion import resolve_content_id
+from app.models.embedding import Embedding
+from app.vector_search import select_vector_search_backend
+from config.config import Config
+
+CHAT_MODEL = "gemini-pro"
+
+
+class AttachmentNotProcessedError(Exception):
+    """
+    Raised when a question is asked about an attachment not processed yet.
+    """
+
+
+def generate_answer(prompt: str) -> str:
+    """
+    Generate the answer to a prompt in one response.
+
+    Args:
+        prompt (str): The prompt built by `MaterialChat.build_prompt`.
+
+    Returns:
+        str: The generated answer.
+    """
+    return genai.GenerativeModel(CHAT_MODEL).generate_content(prompt).text
+
+
+def stream_answer(prompt: str, label: str = "chat") -> Iterator[str]:
+    """
+    Generate the answer to a prompt, yielding its text as the model produces it.
+
+    The time to the first token, the latency the user perceives, is logged.
+
+    Args:
+        prompt (str): The prompt built by `MaterialChat.build_prompt`.
+        label (str): The name of the conversation in the log.
+
+    Yields:
+        str: The successive parts of the answer.
+    """
+    started = time.perf_counter()
+    first_token = True
+
+    for chunk in genai.GenerativeModel(CHAT_MODEL).generate_content(
+        prompt, stream=True
+    ):
+        if not chunk.parts:
+            continue
+
+        if first_token:
+            first_token = False
+            print(f"{label}: time to first token {time.perf_counter() - started:.3f}s")
+
+        yield chunk.text
+
+
+class MaterialChat:
+    """
+    One question about an attachment, with its retrieval and conversation memory.
+
+    Attributes:
+        redis_client: The Redis client holding the counters and conversations.
+        attachment_id (str): The ID of the attachment asked about.
+        query (str): The question.
+        query_embeddings (list): The embedding of the question.
+        content_id (str): The content ID the embeddings of the attachment are under.
+        number_of_embeddings (int): The number of chunks of the attachment.
+        memory (ConversationMemory): The user's conversation about the attachment,
+            or None when the user is not verified.
+        answer_cache (SemanticAnswerCache): The answer cache, or None when disabled.
+    """
+
+    def __init__(
+        self, redis_client, attachment_id: str, query: str, user: Optional[str]
+    ):
+        self.redis_client = redis_client
+        self.attachment_id = str(attachment_id)
+        self.query = query
+        self.query_embeddings = extract_text_embedding(query)
+        self.content_id = resolve_content_id(self.attachment_id, redis_client)
+
+        number_of_embeddings = redis_client.get(
+            f"attachment_id_{self.content_id}_number_of_embeddings"
+        )
+        if number_of_embeddings is None:
+            raise AttachmentNotProcessedError(
+                "The attachment has not been processed yet"
+            )
+        self.number_of_embeddings = int(number_of_embeddings.decode("utf-8"))
+        self.memory = (
+            ConversationMemory(
+                redis_client, f"attachment_id_{self.attachment_id}", user
+            )
+            if user
+            else None
+        )
+
+        self.answer_cache = (
+            SemanticAnswerCache(
+                redis_client, Embedding, self.content_id, self.number_of_embeddings
+            )
+            if Config.ANSWER_CACHE_ENABLED
+            else None
+        )
+        self._source_ids = None
+        self._started = None
+
+    def cached_answer(self) -> Optional[str]:
+        """
+        Return the cached answer of a similar question, if any.
+
+        Returns:
+            str: The cached answer, or None on a miss.
+        """
+        if self.answer_cache is None:
+            return None
+        return self.answer_cache.get(self.query_embeddings)
+
+    def build_prompt(self) -> str:
+        """
+        Retrieve the chunks closest to the question and build the prompt.
+
+        Returns:
+            str: The prompt to generate the answer from.
+        """
+        self._started = time.perf_counter()
+        results = select_vector_search_backend(self.number_of_embeddings).search(
+            Embedding,
+            self.content_id,
+            self.query_embeddings,
+            limit=math.ceil(math.sqrt(self.number_of_embeddings)),
+            num_candidates=self.number_of_embeddings,
+            fields=("_id", "text_content"),
+        )
+        self._source_ids = [result["_id"] for result in results]
+        retrieved_context = "".join(result["text_content"] for result in results)
+
+        previous_conversation = (
+            self.memory.render() if self.memory is not None else NO_CONVERSATION
+        )
+
+        return build_chat_prompt(self.query, retrieved_context, previous_conversation)
+
+    def remember(self, answer: str) -> None:
+        """
+        Append the question and its answer to the conversation of a verified user,
+        and cache the answer when it was generated from a prompt built by
+        `build_prompt`.
+
+        Args:
+            answer (str): The answer given to the user.
+        """
+        if self.memory is not None:
+            self.memory.append(self.query, answer)
+
+        if self.answer_cache is not None and self._source_ids is not None:
+            self.answer_cache.set(
+                self.query,
+                self.query_embeddings,
+                answer,
+                self._source_ids,
+                time.perf_counter() - self._started,
+            )
@@ -0,0 +1,41 @@
+"""
+Module providing the prompt of the chat endpoints.
+
+Functions:
+    build_chat_prompt: Build the generation prompt of a chat question.
+"""
+
+MAX_PROMPT_LENGTH = 25000
+
+
+def build_chat_prompt(
+    query: str, retrieved_context: str, previous_conversation: str
+) -> str:
+    """
+    Build the prompt asking the generative model to answer a chat question.
+
+    Args:
+        query (str): The user's question.
+        retrieved_context (str): The chunks retrieved by the vector search.
+        previous_conversation (str): The conversation so far.
+
+    Returns:
+        str: The prompt, truncated to `MAX_PROMPT_LENGTH` characters.
+    """
+    prompt = f"""
+    Instruction: Please provide an informative response to the following question with the help of your knowledge, the Retrieved Context and the Previous Conversation in Markdown format.
+
+    Question: {query}
+
+    Retrieved Context: {retrieved_context}
+
+    Previous Conversation: {previous_conversation}
+
+    Note: If the model is unable to generate an answer based on the retrieved context or previous conversation, please follow these instructions:
+
+    1. Notify the user that the generated answer is based on the model's own knowledge.
+    2. Provide an answer using the model's own knowledge.
+    3. If possible, prompt something related to the topic to continue the conversation.
+    """
+
+    return prompt[:MAX_PROMPT_LENGTH]
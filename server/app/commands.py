@@ -0,0 +1,143 @@
+"""
+Flask CLI commands for maintenance tasks.
+
+Commands:
+    migrate-embeddings: Convert stored embedding vectors to the compact binary form.
+    build-vector-indexes: Rebuild the local HNSW indexes from MongoDB.
+
+Usage:
+    flask --app run migrate-embeddings --format float32
+    flask --app run build-vector-indexes
+"""
+
+from itertools import groupby
+
+import click
+import numpy as np
+from pymongo import UpdateOne
+from app.embeddings.vector_codec import DTYPES, encode_vector
+from app.models.embedding import Embedding
+from app.models.recording_embedding import RecordingEmbedding
+from app.vector_search import LocalVectorSearch
+from app.vector_search.backend import search_index
+
+
+def migrate_collection_embeddings(
+    document_class: type, vector_format: str, batch_size: int, keep_list: bool
+) -> int:
+    """
+    Convert the list-of-floats vectors of a collection to compact binary vectors.
+
+    Args:
+        document_class (type): The Embedding or RecordingEmbedding model.
+        vector_format (str): Either "float32" or "int8".
+        batch_size (int): The number of documents updated per bulk write.
+        keep_list (bool): Keep the original `embeddings` arrays, for example while
+            the Atlas index on `compact_embeddings` is being built.
+
+    Returns:
+        int: The number of converted documents.
+    """
+    collection = document_class._get_collection()  # pylint: disable=protected-access
+    cursor = collection.find(
+        {"embeddings.0": {"$exists": True}}, {"embeddings": 1}
+    ).batch_size(batch_size)
+
+    converted = 0
+    operations = []
+
+    for document in cursor:
+        update = {
+            "$set": {
+                "compact_embeddings": encode_vector(
+                    document["embeddings"], vector_format
+                )
+            }
+        }
+        if not keep_list:
+            update["$unset"] = {"embeddings": ""}
+
+        operations.append(UpdateOne({"_id": document["_id"]}, update))
+
+        if len(operations) == batch_size:
+            converted += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+
+    if operations:
+        converted += collection.bulk_write(operations, ordered=False).modified_count
+
+    return converted
+
+
+@click.command("migrate-embeddings")
+@click.option(
+    "--format",
+    "vector_format",
+    type=click.Choice(sorted(DTYPES)),
+    default="float32",
+    show_default=True,
+    help="The compact vector format to convert to.",
+)
+@click.option("--batch-size", default=500, show_default=True)
+@click.option(
+    "--keep-list",
+    is_flag=True,
+    help="Keep the original embeddings arrays next to the compact vectors.",
+)
+def migrate_embeddings_command(vector_format: str, batch_size: int, keep_list: bool):
+    """
+    Convert Embedding and RecordingEmbedding vectors to compact binary vectors.
+    """
+    for document_class in (Embedding, RecordingEmbedding):
+        converted = migrate_collection_embeddings(
+            document_class, vector_format, batch_size, keep_list
+        )
+        click.echo(f"{document_class.__name__}: converted {converted} documents")
+
+
+def build_collection_indexes(document_class: type, backend: LocalVectorSearch) -> int:
+    """
+    Rebuild the local HNSW index of every partition of a collection.
+
+    Args:
+        document_class (type): The Embedding or RecordingEmbedding model.
+        backend (LocalVectorSearch): The local vector search backend.
+
+    Returns:
+        int: The number of indexes built.
+    """
+    _, partition_field = search_index(document_class)
+    documents = document_class.objects.only(
+        partition_field, "embeddings", "compact_embeddings"
+    ).order_by(partition_field)
+
+    built = 0
+
+    for partition, partition_documents in groupby(
+        documents, key=lambda document: getattr(document, partition_field)
+    ):
+        partition_documents = list(partition_documents)
+        backend.rebuild(
+            document_class,
+            partition,
+            [document.id for document in partition_documents],
+            np.stack([document.get_vector() for document in partition_documents]),
+        )
+        built += 1
+
+    return built
+
+
+@click.command("build-vector-indexes")
+def build_vector_indexes_command():
+    """
+    Rebuild the local HNSW indexes of Embedding and RecordingEmbedding from MongoDB.
+
+    Indexes are otherwise updated as documents are inserted; rebuilding also drops
+    the vectors of deleted documents.
+    """
+    backend = LocalVectorSearch()
+
+    for document_class in (Embedding, RecordingEmbedding):
+        built = build_collection_indexes(document_class, backend)
+        click.echo(f"{document_class.__name__}: built {built} indexes")
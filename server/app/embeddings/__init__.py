@@ -0,0 +1,18 @@
+"""
+Provides access to the shared text embedding utilities.
+"""
+
+from .embedding_cache import EmbeddingCache
+from .embedding_client import (
+    EmbeddingClient,
+    get_embedding_client,
+    extract_text_embedding,
+    extract_text_embeddings,
+)
+from .vector_codec import (
+    VectorField,
+    encode_vector,
+    decode_vector,
+    vector_fields,
+    vector_search_path,
+)
@@ -0,0 +1,241 @@
+"""
+Module providing a content-addressed cache for text embeddings.
+
+Embeddings are keyed by a SHA-256 hash of the model name, the task type and the
+chunk text, so identical chunks uploaded to different hubs are embedded only once.
+Entries live in Redis under an LRU size budget, with an optional in-process LRU
+tier in front of it. Hit and miss counters are kept in Redis so the savings can
+be monitored across workers.
+
+Classes:
+    EmbeddingCache: Two-tier (in-process and Redis) embedding cache.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from config.config import Config
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache backed by Redis.
+
+    Each cached vector is stored as packed float32 bytes under
+    `embedding_cache:entry:{hash}`. A sorted set scored by last access time tracks
+    recency, and the least recently used entries are evicted once the number of
+    entries exceeds `max_entries`.
+
+    Attributes:
+        redis_client: The Redis client used for the shared tier.
+        max_entries (int): The maximum number of entries kept in Redis.
+        ttl (int): The expiry of each Redis entry, in seconds.
+        local_max_entries (int): The size of the in-process tier, 0 to disable it.
+    """
+
+    KEY_PREFIX = "embedding_cache"
+
+    def __init__(
+        self,
+        redis_client,
+        max_entries: int = Config.EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl: int = Config.EMBEDDING_CACHE_TTL,
+        local_max_entries: int = Config.EMBEDDING_CACHE_LOCAL_MAX_ENTRIES,
+    ):
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.local_max_entries = local_max_entries
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def lru_key(self) -> str:
+        """
+        The Redis sorted set tracking the last access time of each entry.
+        """
+        return f"{self.KEY_PREFIX}:lru"
+
+    @property
+    def stats_key(self) -> str:
+        """
+        The Redis hash holding the hit and miss counters.
+        """
+        return f"{self.KEY_PREFIX}:stats"
+
+    def entry_key(self, content_hash: str) -> str:
+        """
+        Return the Redis key holding the vector of `content_hash`.
+        """
+        return f"{self.KEY_PREFIX}:entry:{content_hash}"
+
+    @staticmethod
+    def make_hash(model: str, task_type: str, text: str) -> str:
+        """
+        Compute the content hash identifying an embedding.
+
+        Args:
+            model (str): The name of the embedding model.
+            task_type (str): The task type passed to the embedding model.
+            text (str): The embedded text.
+
+        Returns:
+            str: The hex SHA-256 digest of the model, task type and text.
+        """
+        digest = hashlib.sha256()
+        for part in (model, task_type, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get_many(self, content_hashes: List[str]) -> List[Optional[list]]:
+        """
+        Look up the embeddings of several content hashes.
+
+        Args:
+            content_hashes (List[str]): The content hashes to look up.
+
+        Returns:
+            List[Optional[list]]: The cached vectors, or None for each miss.
+        """
+        results = [self._get_local(content_hash) for content_hash in content_hashes]
+        local_hits = sum(1 for result in results if result is not None)
+        remote_hashes = [
+            content_hash
+            for content_hash, result in zip(content_hashes, results)
+            if result is None
+        ]
+
+        remote_hits = 0
+        if remote_hashes:
+            values = self.redis_client.mget(
+                [self.entry_key(content_hash) for content_hash in remote_hashes]
+            )
+            found = {}
+            for content_hash, value in zip(remote_hashes, values):
+                if value is not None:
+                    found[content_hash] = np.frombuffer(value, np.float32).tolist()
+
+            remote_hits = len(found)
+            results = [
+                result if result is not None else found.get(content_hash)
+                for content_hash, result in zip(content_hashes, results)
+            ]
+
+            if found:
+                now = time.time()
+                with self.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.zadd(self.lru_key, {key: now for key in found})
+                    for content_hash in found:
+                        pipe.expire(self.entry_key(content_hash), self.ttl)
+                    pipe.execute()
+
+                for content_hash, vector in found.items():
+                    self._set_local(content_hash, vector)
+
+        misses = len(content_hashes) - local_hits - remote_hits
+        self._record(local_hits=local_hits, hits=remote_hits, misses=misses)
+
+        return results
+
+    def set_many(self, embeddings: Dict[str, list]) -> None:
+        """
+        Store several embeddings and evict the least recently used entries.
+
+        Args:
+            embeddings (Dict[str, list]): The vectors to cache, keyed by content hash.
+        """
+        if not embeddings:
+            return
+
+        now = time.time()
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for content_hash, vector in embeddings.items():
+                pipe.set(
+                    self.entry_key(content_hash),
+                    np.asarray(vector, dtype=np.float32).tobytes(),
+                    ex=self.ttl,
+                )
+            pipe.zadd(self.lru_key, {key: now for key in embeddings})
+            pipe.zcard(self.lru_key)
+            number_of_entries = pipe.execute()[-1]
+
+        overflow = number_of_entries - self.max_entries
+        if overflow > 0:
+            evicted = [
+                member.decode("utf-8") if isinstance(member, bytes) else member
+                for member, _ in self.redis_client.zpopmin(self.lru_key, overflow)
+            ]
+            if evicted:
+                self.redis_client.delete(
+                    *[self.entry_key(content_hash) for content_hash in evicted]
+                )
+
+        for content_hash, vector in embeddings.items():
+            self._set_local(content_hash, vector)
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters aggregated across all processes.
+
+        Returns:
+            dict: The hits, local hits, misses, hit rate and number of entries.
+        """
+        counters = {
+            key.decode("utf-8"): int(value)
+            for key, value in self.redis_client.hgetall(self.stats_key).items()
+        }
+        hits = counters.get("hits", 0) + counters.get("local_hits", 0)
+        lookups = hits + counters.get("misses", 0)
+
+        return {
+            "hits": counters.get("hits", 0),
+            "local_hits": counters.get("local_hits", 0),
+            "misses": counters.get("misses", 0),
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": self.redis_client.zcard(self.lru_key),
+        }
+
+    def _record(self, local_hits: int, hits: int, misses: int) -> None:
+        """
+        Increment the shared hit and miss counters.
+        """
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            if local_hits:
+                pipe.hincrby(self.stats_key, "local_hits", local_hits)
+            if hits:
+                pipe.hincrby(self.stats_key, "hits", hits)
+            if misses:
+                pipe.hincrby(self.stats_key, "misses", misses)
+            pipe.execute()
+
+    def _get_local(self, content_hash: str) -> Optional[list]:
+        """
+        Look up a vector in the in-process tier.
+        """
+        if not self.local_max_entries:
+            return None
+
+        with self._lock:
+            vector = self._local.get(content_hash)
+            if vector is not None:
+                self._local.move_to_end(content_hash)
+            return vector
+
+    def _set_local(self, content_hash: str, vector: list) -> None:
+        """
+        Store a vector in the in-process tier, evicting the oldest entry if full.
+        """
+        if not self.local_max_entries:
+            return
+
+        with self._lock:
+            self._local[content_hash] = vector
+            self._local.move_to_end(content_hash)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
@@ -0,0 +1,265 @@
+"""
+Module providing a batched, concurrent client for generating text embeddings.
+
+Every ingestion path in the application (uploaded files, recording frames and
+transcripts) as well as the chat endpoints embed text with the same Gemini
+embedding model. This module groups chunks into batch requests, keeps a bounded
+number of batches in flight and retries failed batches, so large documents no
+longer pay one sequential round trip per chunk. When an EmbeddingCache is
+attached, chunks that were embedded before are served from the cache and only
+the misses are sent to the model.
+
+Classes:
+    EmbeddingClient: Embeds text chunks in concurrent batches with retries.
+
+Functions:
+    get_embedding_client: Return the process-wide EmbeddingClient.
+    extract_text_embedding: Generate the embedding of a single text chunk.
+    extract_text_embeddings: Generate the embeddings of a list of text chunks.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import google.generativeai as genai
+from app.embeddings.embedding_cache import EmbeddingCache
+from config.config import Config
+
+
+class EmbeddingClient:
+    """
+    Client that embeds text chunks in batches with bounded concurrency.
+
+    Chunks are grouped into batches of at most `batch_size` texts, and each batch is
+    sent as a single `genai.embed_content` request. At most `max_concurrency` batches
+    are in flight at any time, and a failed batch is retried up to `max_retries`
+    times with exponential backoff before the error is propagated.
+
+    Attributes:
+        model (str): The name of the embedding model.
+        task_type (str): The task type passed to the embedding model.
+        batch_size (int): The maximum number of chunks sent in one request.
+        max_concurrency (int): The maximum number of batches in flight.
+        max_retries (int): The number of retries for a failed batch.
+        retry_backoff (float): The initial delay in seconds between retries.
+        cache (EmbeddingCache, optional): The cache consulted before each request.
+    """
+
+    def __init__(
+        self,
+        model: str = Config.EMBEDDING_MODEL,
+        task_type: str = "semantic_similarity",
+        batch_size: int = Config.EMBEDDING_BATCH_SIZE,
+        max_concurrency: int = Config.EMBEDDING_MAX_CONCURRENCY,
+        max_retries: int = Config.EMBEDDING_MAX_RETRIES,
+        retry_backoff: float = 1.0,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.model = model
+        self.task_type = task_type
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.cache = cache
+
+    def embed_query(self, text: str) -> list:
+        """
+        Generate the embedding of a single text.
+
+        Args:
+            text (str): The text for which the embedding is to be generated.
+
+        Returns:
+            list: The embedding vector of the text.
+        """
+        return self._embed_batch([text])[0]
+
+    def embed_documents(self, chunks: List[str]) -> List[list]:
+        """
+        Generate the embeddings of a list of text chunks.
+
+        Args:
+            chunks (List[str]): The text chunks to embed.
+
+        Returns:
+            List[list]: The embedding vectors, in the same order as `chunks`.
+        """
+        return [embedding for _, embedding in self.embed_stream(chunks)]
+
+    def embed_stream(self, chunks: Iterable[str]) -> Iterator[Tuple[str, list]]:
+        """
+        Lazily embed an iterable of text chunks.
+
+        Chunks are consumed from `chunks` only as fast as batches can be submitted,
+        so the producer keeps running while earlier batches are being embedded.
+        Results are yielded in input order.
+
+        Args:
+            chunks (Iterable[str]): The text chunks to embed.
+
+        Yields:
+            Tuple[str, list]: Each chunk together with its embedding vector.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            in_flight = deque()
+
+            for batch in self._iter_batches(chunks):
+                if len(in_flight) >= self.max_concurrency:
+                    yield from self._collect(in_flight.popleft())
+
+                in_flight.append((batch, executor.submit(self._embed_batch, batch)))
+
+            while in_flight:
+                yield from self._collect(in_flight.popleft())
+
+    def _iter_batches(self, chunks: Iterable[str]) -> Iterator[List[str]]:
+        """
+        Group an iterable of chunks into lists of at most `batch_size` chunks.
+        """
+        batch = []
+
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _collect(submitted: tuple) -> Iterator[Tuple[str, list]]:
+        """
+        Wait for a submitted batch and pair each chunk with its embedding.
+        """
+        batch, future = submitted
+        yield from zip(batch, future.result())
+
+    def _embed_batch(self, batch: List[str]) -> List[list]:
+        """
+        Embed a batch of chunks, serving cached chunks from the cache.
+
+        Args:
+            batch (List[str]): The chunks to embed.
+
+        Returns:
+            List[list]: The embedding vectors of the chunks.
+        """
+        if self.cache is None:
+            return self._request_embeddings(batch)
+
+        content_hashes = [
+            EmbeddingCache.make_hash(self.model, self.task_type, chunk)
+            for chunk in batch
+        ]
+        embeddings = self.cache.get_many(content_hashes)
+        missing = [index for index, vector in enumerate(embeddings) if vector is None]
+
+        if missing:
+            fetched = self._request_embeddings([batch[index] for index in missing])
+            for index, vector in zip(missing, fetched):
+                embeddings[index] = vector
+            self.cache.set_many(
+                {content_hashes[index]: embeddings[index] for index in missing}
+            )
+
+        return embeddings
+
+    def _request_embeddings(self, batch: List[str]) -> List[list]:
+        """
+        Embed a batch of chunks in a single request, retrying on failure.
+
+        Args:
+            batch (List[str]): The chunks to embed.
+
+        Returns:
+            List[list]: The embedding vectors of the chunks.
+
+        Raises:
+            Exception: If the request still fails after all retries.
+        """
+        attempt = 0
+
+        while True:
+            try:
+                result = genai.embed_content(
+                    model=self.model,
+                    content=batch,
+                    task_type=self.task_type,
+                )
+                return result["embedding"]
+            except Exception as error:
+                if attempt >= self.max_retries:
+                    print(f"Error: {error}")
+                    raise
+
+                delay = self.retry_backoff * (2**attempt)
+                print(f"Embedding batch failed ({error}), retrying in {delay}s")
+                time.sleep(delay)
+                attempt += 1
+
+
+_embedding_client: Optional[EmbeddingClient] = None
+
+
+def get_embedding_client() -> EmbeddingClient:
+    """
+    Return the process-wide EmbeddingClient, creating it on first use.
+
+    The client is backed by an EmbeddingCache on `Config.REDIS_CLIENT` unless
+    `Config.EMBEDDING_CACHE_ENABLED` is turned off.
+
+    Returns:
+        EmbeddingClient: The shared embedding client configured from Config.
+    """
+    global _embedding_client  # pylint: disable=global-statement
+
+    if _embedding_client is None:
+        cache = (
+            EmbeddingCache(Config.REDIS_CLIENT)
+            if Config.EMBEDDING_CACHE_ENABLED
+            else None
+        )
+        _embedding_client = EmbeddingClient(cache=cache)
+
+    return _embedding_client
+
+
+def extract_text_embedding(chunk: str) -> list:
+    """
+    Generate text embeddings for a text chunk using a pre-trained model.
+
+    Args:
+        chunk (str): The text chunk for which embeddings are to be generated.
+
+    Returns:
+        list: A list of embedding vectors representing the text chunk.
+
+    Raises:
+        Exception: If an error occurs during the embedding generation process.
+    """
+    return get_embedding_client().embed_query(chunk)
+
+
+def extract_text_embeddings(chunks: List[str]) -> List[list]:
+    """
+    Generate text embeddings for a list of text chunks in concurrent batches.
+
+    Args:
+        chunks (List[str]): The text chunks for which embeddings are to be generated.
+
+    Returns:
+        List[list]: The embedding vectors, in the same order as `chunks`.
+
+    Raises:
+        Exception: If an error occurs during the embedding generation process.
+    """
+    return get_embedding_client().embed_documents(chunks)
@@ -0,0 +1,142 @@
+"""
+Module providing the compact binary representation of embedding vectors.
+
+By default embedding vectors are stored as BSON arrays of doubles and decoded into
+Python lists of floats on every read. When `EMBEDDING_STORAGE_FORMAT` is set to
+"float32" or "int8", vectors are instead stored as BSON binary vectors (BinData
+subtype 9): a dtype byte, a padding byte and the packed values. This is the
+layout Atlas Vector Search indexes natively, and NumPy can decode it without
+copying.
+
+The "int8" format scales each component by 127. Gemini embeddings are unit
+normalized, so every component lies in [-1, 1] and cosine similarity is
+preserved up to quantization error.
+
+Classes:
+    VectorField: MongoEngine field storing a packed binary vector.
+
+Functions:
+    encode_vector: Pack a vector into a BSON binary vector.
+    decode_vector: Unpack a BSON binary vector into a NumPy array.
+    vector_fields: Return the document fields holding a vector.
+    vector_search_path: Return the field searched by $vectorSearch.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+from bson.binary import Binary
+from mongoengine import BinaryField
+from config.config import Config
+
+VECTOR_SUBTYPE = 9
+
+INT8_SCALE = 127.0
+
+DTYPES = {
+    "float32": (0x27, np.dtype("<f4")),
+    "int8": (0x03, np.dtype("i1")),
+}
+
+FORMATS_BY_DTYPE_BYTE = {
+    dtype_byte: vector_format for vector_format, (dtype_byte, _) in DTYPES.items()
+}
+
+
+def encode_vector(vector: Sequence[float], vector_format: str = "float32") -> Binary:
+    """
+    Pack a vector into a BSON binary vector.
+
+    Args:
+        vector (Sequence[float]): The embedding vector.
+        vector_format (str): Either "float32" or "int8".
+
+    Returns:
+        Binary: The packed vector with BSON binary subtype 9.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if vector_format not in DTYPES:
+        raise ValueError(f"Unsupported vector format: {vector_format}")
+
+    dtype_byte, dtype = DTYPES[vector_format]
+    values = np.asarray(vector, dtype=np.float32)
+
+    if vector_format == "int8":
+        values = np.round(np.clip(values, -1.0, 1.0) * INT8_SCALE)
+
+    header = bytes((dtype_byte, 0))
+    return Binary(header + values.astype(dtype).tobytes(), VECTOR_SUBTYPE)
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    """
+    Unpack a BSON binary vector into a NumPy array.
+
+    float32 vectors are returned as a read-only view over `data` without copying;
+    int8 vectors are dequantized into a new float32 array.
+
+    Args:
+        data (bytes): The packed vector produced by `encode_vector`.
+
+    Returns:
+        np.ndarray: The vector as a float32 array.
+
+    Raises:
+        ValueError: If the dtype byte is not supported.
+    """
+    vector_format = FORMATS_BY_DTYPE_BYTE.get(data[0])
+    if vector_format is None:
+        raise ValueError(f"Unsupported vector dtype: {data[0]:#x}")
+
+    values = np.frombuffer(data, dtype=DTYPES[vector_format][1], offset=2)
+
+    if vector_format == "int8":
+        return values.astype(np.float32) / INT8_SCALE
+    return values
+
+
+class VectorField(BinaryField):
+    """
+    Binary field storing a packed vector with BSON binary subtype 9.
+
+    MongoEngine's BinaryField re-wraps values with the generic binary subtype,
+    which would hide the vector subtype from Atlas Vector Search.
+    """
+
+    def to_mongo(self, value):
+        if isinstance(value, Binary):
+            return value
+        return Binary(value, VECTOR_SUBTYPE)
+
+
+def vector_fields(vector: Sequence[float], vector_format: Optional[str] = None) -> dict:
+    """
+    Return the document fields holding a vector in the configured storage format.
+
+    Args:
+        vector (Sequence[float]): The embedding vector.
+        vector_format (str, optional): "list", "float32" or "int8". Defaults to
+            `Config.EMBEDDING_STORAGE_FORMAT`.
+
+    Returns:
+        dict: Either {"embeddings": [...]} or {"compact_embeddings": Binary(...)}.
+    """
+    vector_format = vector_format or Config.EMBEDDING_STORAGE_FORMAT
+
+    if vector_format == "list":
+        return {"embeddings": list(vector)}
+    return {"compact_embeddings": encode_vector(vector, vector_format)}
+
+
+def vector_search_path() -> str:
+    """
+    Return the field that $vectorSearch runs on for the configured storage format.
+
+    Returns:
+        str: "embeddings" for the list format, otherwise "compact_embeddings".
+    """
+    if Config.EMBEDDING_STORAGE_FORMAT == "list":
+        return "embeddings"
+    return "compact_embeddings"
@@ -0,0 +1,17 @@
+"""
+Provides access to the document ingestion pipeline.
+"""
+
+from .pipeline import iter_fixed_size_chunks, iter_batches, ingest_chunks
+from .chunking import StructuredChunker, get_chunker
+from .incremental import ChunkDiff, chunk_content_hash, diff_chunks
+from .deduplication import (
+    hash_file_stream,
+    content_id_key,
+    acquire_attachment_content,
+    claim_content_ingestion,
+    mark_content_status,
+    replace_sole_attachment_content,
+    release_attachment_content,
+    resolve_content_id,
+)
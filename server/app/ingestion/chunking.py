@@ -0,0 +1,343 @@
+"""
+Module providing the chunkers that cut extracted text into embeddable chunks.
+
+A chunker is any callable taking the text segments of a document (pages, slides,
+paragraphs or a whole transcript) and yielding chunks of text. The chunker used
+by ingestion is selected with `Config.CHUNKER`:
+
+- "structured" (default): StructuredChunker packs whole sentences into chunks of
+  at most `CHUNK_MAX_TOKENS` tokens, starts a new chunk at headings, repeats up
+  to `CHUNK_OVERLAP_TOKENS` tokens of trailing sentences at the start of the
+  next chunk, and drops chunks that are near-duplicates of an earlier chunk of
+  the same document. For paged documents (PDFs), header and footer lines
+  repeated on at least `edge_repeats` pages are only kept on their first page.
+- "fixed": the original 1000-character slicing of `iter_fixed_size_chunks`.
+
+Tokens are counted with tiktoken. Gemini uses its own tokenizer, so the budget
+is an approximation that keeps chunks well within the embedding model's limit.
+
+Classes:
+    StructuredChunker: Sentence- and heading-aware, token-budgeted chunker.
+
+Functions:
+    get_chunker: Return the chunker configured for ingestion.
+"""
+
+import re
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.ingestion.pipeline import iter_fixed_size_chunks
+from config.config import Config
+
+Chunker = Callable[[Iterable[str]], Iterator[str]]
+
+SENTENCE_BOUNDARY = re.compile(
+    r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])"
+)
+
+HEADING = re.compile(
+    r"^(#{1,6}\s+\S.*"
+    r"|\d+(\.\d+)*\.?\s+[A-Z].*"
+    r"|(?i:chapter|section|unit|lecture|module|part)\s+[\dIVXLC]+\b.*"
+    r"|[^a-z]*[A-Z]{2,}[^a-z]*)$"
+)
+
+BULLET = re.compile(r"^\s*([-*•‣▪–]|\d+[.)]|[a-z][.)])\s+")
+
+NON_WORD = re.compile(r"[\W_]+")
+
+BARE_PAGE_NUMBER = re.compile(r"\d+(?: (?:of )?\d+)?")
+
+PAGE_NUMBER = re.compile(r"\b(page|slide|p) \d+(?: (?:of )?\d+)?\b")
+
+
+def fingerprint(text: str) -> str:
+    """
+    Normalize text so that near-identical strings compare equal.
+
+    Case, punctuation and whitespace are ignored, and page numbers are masked, so
+    "Page 3 of 10" and "Page 4 of 10" share a fingerprint while "Step 1" and
+    "Step 2" do not. A line holding nothing but a page number has an empty
+    fingerprint.
+    """
+    text = NON_WORD.sub(" ", text.lower()).strip()
+    if BARE_PAGE_NUMBER.fullmatch(text):
+        return ""
+    return PAGE_NUMBER.sub(r"\1 #", text)
+
+
+def is_heading(line: str) -> bool:
+    """
+    Return whether a line looks like a heading rather than body text.
+    """
+    return (
+        len(line) <= 80
+        and not line.endswith((".", ",", ";", ":", "?", "!"))
+        and bool(HEADING.match(line))
+        and not line.isdigit()
+    )
+
+
+class StructuredChunker:
+    """
+    Chunker packing whole sentences into token-budgeted chunks.
+
+    Attributes:
+        max_tokens (int): The maximum number of tokens per chunk.
+        overlap_tokens (int): The maximum number of tokens repeated from the end of
+            a chunk at the start of the next one, 0 to disable overlap.
+        dedupe (bool): Whether to drop repeated headers, footers and chunks.
+        edge_lines (int): The number of lines at the start and end of each segment
+            checked for repeated headers and footers, 0 to keep every line.
+        edge_repeats (int): The number of segments an edge line must appear on to
+            be treated as a header or footer.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = Config.CHUNK_MAX_TOKENS,
+        overlap_tokens: int = Config.CHUNK_OVERLAP_TOKENS,
+        dedupe: bool = Config.CHUNK_DEDUPE,
+        edge_lines: int = 2,
+        edge_repeats: int = 3,
+        encoding=None,
+    ):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be between 0 and max_tokens")
+
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.dedupe = dedupe
+        self.edge_lines = edge_lines
+        self.edge_repeats = edge_repeats
+        self._encoding = encoding
+
+    @property
+    def encoding(self):
+        """
+        The tiktoken encoding used to count tokens, loaded on first use.
+        """
+        if self._encoding is None:
+            import tiktoken  # pylint: disable=import-outside-toplevel
+
+            self._encoding = tiktoken.get_encoding(Config.CHUNK_TOKEN_ENCODING)
+        return self._encoding
+
+    def __call__(self, segments: Iterable[str]) -> Iterator[str]:
+        """
+        Cut the text segments of one document into chunks.
+
+        Args:
+            segments (Iterable[str]): The text segments, in document order.
+
+        Yields:
+            str: The next chunk of text.
+        """
+        seen_chunks = set()
+
+        for chunk in self._pack(self._iter_units(segments)):
+            if self.dedupe:
+                chunk_fingerprint = fingerprint(chunk)
+                if chunk_fingerprint in seen_chunks:
+                    continue
+                if chunk_fingerprint:
+                    seen_chunks.add(chunk_fingerprint)
+            yield chunk
+
+    def _iter_units(self, segments: Iterable[str]) -> Iterator[Tuple[bool, str]]:
+        """
+        Split segments into headings and sentences.
+
+        Yields:
+            Tuple[bool, str]: Whether the unit is a heading, and its text.
+        """
+        for lines in self._iter_lines(segments):
+            paragraph: List[str] = []
+
+            for line in lines + [""]:
+                if line and not is_heading(line) and not BULLET.match(line):
+                    paragraph.append(line)
+                    continue
+
+                if paragraph:
+                    for sentence in SENTENCE_BOUNDARY.split(" ".join(paragraph)):
+                        if sentence.strip():
+                            yield False, sentence.strip()
+                    paragraph = []
+
+                if line and is_heading(line):
+                    yield True, line
+                elif line:
+                    paragraph.append(line)
+
+    def _iter_lines(self, segments: Iterable[str]) -> Iterator[List[str]]:
+        """
+        Yield the stripped lines of each segment, without repeated headers and
+        footers when edge lines are checked.
+
+        Segments are read `edge_repeats - 1` segments ahead, so a header is
+        recognized on the first page it appears on.
+        """
+        pages = (
+            [line.strip() for line in segment.splitlines()] for segment in segments
+        )
+        if not (self.dedupe and self.edge_lines):
+            yield from pages
+            return
+
+        edge_counts: Counter = Counter()
+        kept_edges: set = set()
+        lookahead: deque = deque()
+
+        for lines in pages:
+            edges = self._edge_fingerprints(lines)
+            edge_counts.update(set(edges.values()))
+            lookahead.append((lines, edges))
+
+            if len(lookahead) >= self.edge_repeats:
+                yield self._drop_repeated_edges(
+                    *lookahead.popleft(), edge_counts, kept_edges
+                )
+
+        while lookahead:
+            yield self._drop_repeated_edges(
+                *lookahead.popleft(), edge_counts, kept_edges
+            )
+
+    def _edge_fingerprints(self, lines: List[str]) -> Dict[int, str]:
+        """
+        Return the fingerprint of the short lines at the start and end of a segment.
+        """
+        non_empty = [index for index, line in enumerate(lines) if line]
+        edges = set(non_empty[: self.edge_lines] + non_empty[-self.edge_lines :])
+
+        return {
+            index: fingerprint(lines[index])
+            for index in edges
+            if len(lines[index]) <= 100
+        }
+
+    def _drop_repeated_edges(
+        self,
+        lines: List[str],
+        edges: Dict[int, str],
+        edge_counts: Counter,
+        kept_edges: set,
+    ) -> List[str]:
+        """
+        Remove bare page numbers, and header and footer lines appearing on at least
+        `edge_repeats` segments except on the first segment they appear on.
+        """
+        dropped = set()
+
+        for index, edge_fingerprint in edges.items():
+            if not edge_fingerprint:
+                dropped.add(index)
+            elif edge_counts[edge_fingerprint] >= self.edge_repeats:
+                if edge_fingerprint in kept_edges:
+                    dropped.add(index)
+                kept_edges.add(edge_fingerprint)
+
+        return [line for index, line in enumerate(lines) if index not in dropped]
+
+    def _split_long(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Split a sentence longer than `max_tokens` into token windows.
+        """
+        tokens = self.encoding.encode(text)
+        if len(tokens) <= self.max_tokens:
+            return [(text, len(tokens))]
+
+        return [
+            (
+                self.encoding.decode(tokens[start : start + self.max_tokens]),
+                len(tokens[start : start + self.max_tokens]),
+            )
+            for start in range(0, len(tokens), self.max_tokens)
+        ]
+
+    def _pack(self, units: Iterable[Tuple[bool, str]]) -> Iterator[str]:
+        """
+        Greedily pack units into chunks of at most `max_tokens` tokens.
+        """
+        current: List[Tuple[str, int]] = []
+        current_tokens = 0
+        has_new = False
+        min_tokens_before_heading = self.max_tokens // 4
+
+        def flush(keep_overlap: bool) -> Optional[str]:
+            nonlocal current, current_tokens, has_new
+            chunk = " ".join(text for text, _ in current) if has_new else None
+
+            carried: List[Tuple[str, int]] = []
+            carried_tokens = 0
+            if keep_overlap:
+                for text, tokens in reversed(current):
+                    if carried_tokens + tokens > self.overlap_tokens:
+                        break
+                    carried.insert(0, (text, tokens))
+                    carried_tokens += tokens
+
+            current, current_tokens, has_new = carried, carried_tokens, False
+            return chunk
+
+        for heading, text in units:
+            if heading:
+                if current_tokens >= min_tokens_before_heading:
+                    chunk = flush(keep_overlap=False)
+                    if chunk:
+                        yield chunk
+                pieces = [(text, len(self.encoding.encode(text)))]
+            else:
+                pieces = self._split_long(text)
+
+            for piece, tokens in pieces:
+                if current_tokens + tokens > self.max_tokens:
+                    chunk = flush(keep_overlap=True)
+                    if chunk:
+                        yield chunk
+                    while current and current_tokens + tokens > self.max_tokens:
+                        current_tokens -= current.pop(0)[1]
+
+                current.append((piece, tokens))
+                current_tokens += tokens
+                has_new = True
+
+        chunk = flush(keep_overlap=False)
+        if chunk:
+            yield chunk
+
+
+_chunkers: Dict[Tuple[str, bool], Chunker] = {}
+
+
+def get_chunker(name: Optional[str] = None, paged: bool = False) -> Chunker:
+    """
+    Return the chunker used by ingestion.
+
+    Args:
+        name (str, optional): "structured" or "fixed". Defaults to `Config.CHUNKER`.
+        paged (bool): Whether segments are PDF pages whose repeated headers and
+            footers are dropped. Slides, paragraphs and transcripts are not paged:
+            their short lines are content.
+
+    Returns:
+        Chunker: A callable cutting the text segments of a document into chunks.
+
+    Raises:
+        ValueError: If the chunker name is not supported.
+    """
+    name = name or Config.CHUNKER
+
+    if (name, paged) not in _chunkers:
+        if name == "structured":
+            _chunkers[name, paged] = StructuredChunker(edge_lines=2 if paged else 0)
+        elif name == "fixed":
+            _chunkers[name, paged] = iter_fixed_size_chunks
+        else:
+            raise ValueError(f"Unsupported chunker: {name}")
+
+    return _chunkers[name, paged]
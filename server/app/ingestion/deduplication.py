@@ -0,0 +1,269 @@
+"""
+Module providing content-addressed deduplication of uploaded attachments.
+
+Uploaded files are identified by the SHA-256 hash of their bytes. The first upload
+of a file stores it in the object store and ingests it under a content id; every
+later upload of the same bytes, in any hub, only takes a reference on the
+existing AttachmentContent and reuses its object and Embedding documents.
+Releasing the last reference deletes the object and the embeddings.
+
+Content is "pending" until its ingestion succeeds. An upload finding the
+content "failed", or "pending" for longer than `CONTENT_PENDING_TIMEOUT`, claims
+its ingestion and dispatches it again.
+
+Attachments are mapped to their content id in Redis under
+`attachment_id_{attachment_id}_content_id`. Attachments uploaded before
+deduplication have no AttachmentContent and resolve to their own id, which is
+the id their embeddings are stored under.
+
+Functions:
+    hash_file_stream: Compute the SHA-256 hash of a seekable file stream.
+    content_id_key: Return the Redis key mapping an attachment to its content id.
+    acquire_attachment_content: Take a reference on the content of a file.
+    claim_content_ingestion: Claim the ingestion of content that is not ready.
+    mark_content_status: Record the outcome of the ingestion of content.
+    replace_sole_attachment_content: Swap the file of an unshared content in place.
+    release_attachment_content: Drop a reference and delete unused content.
+    resolve_content_id: Resolve an attachment to the id its embeddings use.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+from typing import BinaryIO, Optional, Tuple
+
+from mongoengine.errors import NotUniqueError
+from mongoengine.queryset.visitor import Q
+from app.models.attachment_content import AttachmentContent
+from app.models.embedding import Embedding
+from app.vector_search import drop_partition
+from config.config import Config
+
+
+def hash_file_stream(stream: BinaryIO, block_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hash of a file stream and rewind it.
+
+    Args:
+        stream (BinaryIO): A seekable file object positioned at its start.
+        block_size (int): The number of bytes read at a time.
+
+    Returns:
+        str: The hex SHA-256 digest of the stream.
+    """
+    digest = hashlib.sha256()
+
+    for block in iter(lambda: stream.read(block_size), b""):
+        digest.update(block)
+
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def content_id_key(attachment_id: str) -> str:
+    """
+    Return the Redis key mapping an attachment to its content id.
+    """
+    return f"attachment_id_{attachment_id}_content_id"
+
+
+def acquire_attachment_content(
+    file_hash: str,
+    attachment_id: str,
+    file_key: str,
+    file_url: str,
+    content_id: Optional[str] = None,
+) -> Tuple[AttachmentContent, bool]:
+    """
+    Take a reference on the content of a file, creating it on first upload.
+
+    The lookup and the reference increment are a single upsert, so concurrent
+    uploads of the same bytes always end up sharing one AttachmentContent: the
+    upsert losing the race on the unique file hash is retried and then matches
+    the content created by the winner.
+
+    Args:
+        file_hash (str): The SHA-256 hash of the file bytes.
+        attachment_id (str): The UUID of the attachment taking the reference.
+        file_key (str): The object store key to use if the content is new.
+        file_url (str): The public URL to use if the content is new.
+        content_id (str, optional): The content id to use if the content is new.
+            Defaults to `attachment_id`.
+
+    Returns:
+        Tuple[AttachmentContent, bool]: The content and whether it was created, in
+        which case the caller must upload the file and ingest it. Content that was
+        not created may still need it, see `claim_content_ingestion`.
+    """
+    content_id = content_id or attachment_id
+
+    def upsert() -> AttachmentContent:
+        return AttachmentContent.objects(file_hash=file_hash).modify(
+            upsert=True,
+            new=True,
+            inc__reference_count=1,
+            add_to_set__attachment_ids=attachment_id,
+            set_on_insert__content_id=content_id,
+            set_on_insert__file_key=file_key,
+            set_on_insert__file_url=file_url,
+            set_on_insert__status="pending",
+            set_on_insert__status_updated_at=datetime.now(),
+        )
+
+    try:
+        content = upsert()
+    except NotUniqueError:
+        content = upsert()
+
+    return content, content.content_id == content_id
+
+
+def claim_content_ingestion(
+    content: AttachmentContent, stale_after: int = Config.CONTENT_PENDING_TIMEOUT
+) -> bool:
+    """
+    Claim the ingestion of content whose upload or ingestion did not succeed.
+
+    Content is claimed when it "failed", or when it has been "pending" for more than
+    `stale_after` seconds, for example because its worker crashed. Claiming resets
+    it to "pending", so concurrent uploads claim it only once.
+
+    Args:
+        content (AttachmentContent): The content returned by `acquire_attachment_content`.
+        stale_after (int): The number of seconds after which pending content is
+            considered abandoned.
+
+    Returns:
+        bool: True if the caller must upload the file again and re-dispatch its
+        ingestion.
+    """
+    if content.status == "ready":
+        return False
+
+    now = datetime.now()
+    claimed = AttachmentContent.objects(
+        Q(id=content.id)
+        & (
+            Q(status="failed")
+            | Q(
+                status="pending",
+                status_updated_at__lt=now - timedelta(seconds=stale_after),
+            )
+        )
+    ).modify(new=True, set__status="pending", set__status_updated_at=now)
+
+    return claimed is not None
+
+
+def mark_content_status(content_id: str, status: str) -> None:
+    """
+    Record whether the ingestion of content succeeded ("ready") or "failed".
+
+    Attachments uploaded before deduplication have no AttachmentContent, in which
+    case nothing is recorded.
+
+    Args:
+        content_id (str): The content id the embeddings are stored under.
+        status (str): "pending", "ready" or "failed".
+    """
+    AttachmentContent.objects(content_id=content_id).update_one(
+        set__status=status, set__status_updated_at=datetime.now()
+    )
+
+
+def replace_sole_attachment_content(
+    attachment_id: str, file_hash: str, file_key: str, file_url: str
+) -> Optional[AttachmentContent]:
+    """
+    Point the content of an attachment to a new file, if no other attachment uses it.
+
+    The content keeps its content id, so the new file can be re-ingested
+    incrementally against the existing embeddings.
+
+    Args:
+        attachment_id (str): The UUID of the attachment being replaced.
+        file_hash (str): The SHA-256 hash of the new file bytes.
+        file_key (str): The object store key of the new file.
+        file_url (str): The public URL of the new file.
+
+    Returns:
+        Optional[AttachmentContent]: The content as it was before the update, or None
+        if the attachment has no content or shares it with other attachments.
+    """
+    return AttachmentContent.objects(
+        attachment_ids=[attachment_id], reference_count=1
+    ).modify(
+        new=False,
+        set__file_hash=file_hash,
+        set__file_key=file_key,
+        set__file_url=file_url,
+        set__status="pending",
+        set__status_updated_at=datetime.now(),
+    )
+
+
+def release_attachment_content(attachment_id: str, redis_client, object_store) -> bool:
+    """
+    Drop the reference of an attachment on its content.
+
+    When the last reference is dropped, the object, the Embedding documents, their
+    vector search indexes and the number of embeddings stored in Redis are deleted. The AttachmentContent is only
+    deleted while its reference count is still zero, so an upload of the same bytes
+    racing with the release keeps the content alive.
+
+    Args:
+        attachment_id (str): The UUID of the attachment.
+        redis_client: The Redis client holding the attachment keys.
+        object_store (ObjectStore): The store holding the file.
+
+    Returns:
+        bool: True if the content was no longer used and has been deleted.
+    """
+    content = AttachmentContent.objects(attachment_ids=attachment_id).modify(
+        new=True,
+        dec__reference_count=1,
+        pull__attachment_ids=attachment_id,
+    )
+
+    redis_client.delete(content_id_key(attachment_id))
+
+    if content is None or content.reference_count > 0:
+        return False
+
+    if not AttachmentContent.objects(id=content.id, reference_count__lte=0).delete():
+        return False
+
+    Embedding.objects(attachment_id=content.content_id).delete()
+    drop_partition(Embedding, content.content_id)
+    object_store.delete(content.file_key)
+    redis_client.delete(f"attachment_id_{content.content_id}_number_of_embeddings")
+
+    return True
+
+
+def resolve_content_id(attachment_id: str, redis_client) -> str:
+    """
+    Resolve an attachment to the content id its embeddings are stored under.
+
+    The mapping is read from Redis and falls back to MongoDB, in which case it is
+    cached again. Attachments without an AttachmentContent resolve to themselves.
+
+    Args:
+        attachment_id (str): The UUID of the attachment.
+        redis_client: The Redis client caching the mapping.
+
+    Returns:
+        str: The content id of the attachment.
+    """
+    content_id = redis_client.get(content_id_key(attachment_id))
+    if content_id is not None:
+        return content_id.decode("utf-8")
+
+    content = (
+        AttachmentContent.objects(attachment_ids=attachment_id)
+        .only("content_id")
+        .first()
+    )
+    content_id = content.content_id if content else attachment_id
+    redis_client.set(content_id_key(attachment_id), content_id)
+
+    return content_id
@@ -0,0 +1,95 @@
+"""
+Module providing chunk diffing for incremental re-ingestion of attachments.
+
+Every stored chunk carries a hash of its text. When an attachment is replaced,
+the chunks of the new extraction are matched against the stored hashes so that
+only new or changed chunks are embedded, unchanged chunks are kept (and
+renumbered if they moved), and chunks that disappeared are deleted.
+
+Classes:
+    ChunkDiff: The result of diffing a new extraction against stored chunks.
+
+Functions:
+    chunk_content_hash: Compute the content hash of a chunk.
+    diff_chunks: Diff the chunks of a new extraction against stored chunks.
+"""
+
+import hashlib
+from collections import defaultdict, deque
+from typing import Any, Iterable, List, NamedTuple, Tuple
+
+
+class ChunkDiff(NamedTuple):
+    """
+    The result of diffing a new extraction against the stored chunks.
+
+    Attributes:
+        new_chunks (List[Tuple[int, str, str]]): The batch number, text and content
+            hash of each chunk that has to be embedded.
+        moved (List[Tuple[Any, int]]): The id and new batch number of each kept
+            document whose position changed.
+        orphaned_ids (List[Any]): The ids of the documents no longer present.
+        total (int): The number of chunks of the new extraction.
+    """
+
+    new_chunks: List[Tuple[int, str, str]]
+    moved: List[Tuple[Any, int]]
+    orphaned_ids: List[Any]
+    total: int
+
+
+def chunk_content_hash(chunk: str) -> str:
+    """
+    Compute the content hash of a chunk.
+
+    Args:
+        chunk (str): The chunk text.
+
+    Returns:
+        str: The hex SHA-256 digest of the chunk text.
+    """
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def diff_chunks(
+    existing: Iterable[Tuple[Any, str, int]], chunks: Iterable[str]
+) -> ChunkDiff:
+    """
+    Diff the chunks of a new extraction against the stored chunks.
+
+    Identical chunks are matched by content hash; when a chunk occurs several
+    times, each stored copy is matched at most once.
+
+    Args:
+        existing (Iterable[Tuple[Any, str, int]]): The id, content hash and batch
+            number of each stored document.
+        chunks (Iterable[str]): The chunks of the new extraction, in order.
+
+    Returns:
+        ChunkDiff: The chunks to embed, the documents to renumber and the
+        documents to delete.
+    """
+    stored = defaultdict(deque)
+    for document_id, content_hash, batch_no in sorted(existing, key=lambda d: d[2]):
+        stored[content_hash].append((document_id, batch_no))
+
+    new_chunks = []
+    moved = []
+    total = 0
+
+    for batch_no, chunk in enumerate(chunks, 1):
+        total = batch_no
+        content_hash = chunk_content_hash(chunk)
+
+        if stored[content_hash]:
+            document_id, stored_batch_no = stored[content_hash].popleft()
+            if stored_batch_no != batch_no:
+                moved.append((document_id, batch_no))
+        else:
+            new_chunks.append((batch_no, chunk, content_hash))
+
+    orphaned_ids = [
+        document_id for documents in stored.values() for document_id, _ in documents
+    ]
+
+    return ChunkDiff(new_chunks, moved, orphaned_ids, total)
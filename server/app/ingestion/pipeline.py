@@ -0,0 +1,125 @@
+"""
+Module providing a streaming extract -> chunk -> embed -> insert pipeline.
+
+Extractors yield text segments (pages, slides, paragraphs) as they are parsed.
+The segments are cut into chunks on the fly, embedded in concurrent batches by
+the shared EmbeddingClient and inserted into MongoDB in fixed-size batches, so
+peak memory no longer scales with the document size, embedding starts while
+later pages are still being parsed, and a crash loses at most one insert batch.
+
+Functions:
+    iter_fixed_size_chunks: Cut a stream of text segments into fixed-size chunks.
+    iter_batches: Group an iterable into lists of a fixed size.
+    ingest_chunks: Embed a stream of chunks and insert them in batches.
+"""
+
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from mongoengine import Document
+from app.embeddings import EmbeddingClient, get_embedding_client
+from app.vector_search import index_documents
+from config.config import Config
+
+
+def iter_fixed_size_chunks(
+    segments: Iterable[str], chunk_size: int = 1000
+) -> Iterator[str]:
+    """
+    Cut a stream of text segments into chunks of `chunk_size` characters.
+
+    The chunks are identical to slicing the concatenation of all segments at
+    `chunk_size` boundaries, but only the unfinished tail is buffered.
+
+    Args:
+        segments (Iterable[str]): The text segments, in document order.
+        chunk_size (int): The number of characters per chunk.
+
+    Yields:
+        str: The next chunk of text.
+    """
+    buffer = ""
+
+    for segment in segments:
+        buffer += segment
+        start = 0
+
+        while len(buffer) - start >= chunk_size:
+            yield buffer[start : start + chunk_size]
+            start += chunk_size
+
+        buffer = buffer[start:]
+
+    if buffer:
+        yield buffer
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """
+    Group an iterable into lists of at most `batch_size` items.
+
+    Args:
+        items (Iterable): The items to group.
+        batch_size (int): The maximum number of items per list.
+
+    Yields:
+        list: The next batch of items.
+    """
+    iterator = iter(items)
+
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest_chunks(
+    chunks: Iterable[str],
+    make_document: Callable[[int, str, list], Document],
+    document_class: type,
+    insert_batch_size: int = Config.INGESTION_INSERT_BATCH_SIZE,
+    on_batch_inserted: Optional[Callable[[int], None]] = None,
+    embedding_client: Optional[EmbeddingClient] = None,
+    insert_documents: Optional[Callable[[List[Document]], object]] = None,
+) -> int:
+    """
+    Embed a stream of chunks and insert the resulting documents in batches.
+
+    Args:
+        chunks (Iterable[str]): The text chunks, in document order.
+        make_document (Callable[[int, str, list], Document]): Builds the document
+            for a chunk given its 1-based sequence number, text and embedding.
+        document_class (type): The MongoEngine document class to insert into.
+        insert_batch_size (int): The number of documents per bulk insert.
+        on_batch_inserted (Callable[[int], None], optional): Called with the total
+            number of documents inserted so far after every batch.
+        embedding_client (EmbeddingClient, optional): The client used to embed the
+            chunks. Defaults to the process-wide client.
+        insert_documents (Callable[[List[Document]], object], optional): Stores a
+            batch of documents. Defaults to a bulk insert into `document_class`,
+            followed by adding the documents to the vector search backend.
+
+    Returns:
+        int: The total number of documents inserted.
+    """
+    embedding_client = embedding_client or get_embedding_client()
+    embedded_chunks = enumerate(embedding_client.embed_stream(chunks), 1)
+    total = 0
+
+    for batch in iter_batches(embedded_chunks, insert_batch_size):
+        documents: List[Document] = [
+            make_document(sequence, chunk, embedding)
+            for sequence, (chunk, embedding) in batch
+        ]
+        if insert_documents is not None:
+            insert_documents(documents)
+        else:
+            document_ids = document_class.objects.insert(documents, load_bulk=False)
+            index_documents(document_class, documents, document_ids)
+        total += len(documents)
+
+        if on_batch_inserted is not None:
+            on_batch_inserted(total)
+
+    return total
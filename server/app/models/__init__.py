@@ -10,3 +10,4 @@ from .embedding import Embedding
 from .recording_embedding import RecordingEmbedding
 from .message import Message
 from .user_hub_status import UserHubStatus
+from .attachment_content import AttachmentContent
@@ -0,0 +1,64 @@
+"""
+Module containing the AttachmentContent model for the application.
+"""
+
+from datetime import datetime
+from mongoengine import (
+    Document,
+    DateTimeField,
+    IntField,
+    ListField,
+    StringField,
+)
+
+CONTENT_STATUSES = ("pending", "ready", "failed")
+
+
+class AttachmentContent(Document):
+    """
+    Represents the stored bytes of an uploaded attachment, shared by every
+    attachment with identical content.
+
+    Attachments uploaded with the same bytes (for example the same PDF posted to
+    several hubs) point to a single object in the object store and a single set of
+    Embedding documents. The Embedding documents are stored under `content_id`,
+    and `reference_count` tracks how many attachments use the content so it is
+    only deleted when the last one is released.
+
+    New content is "pending" until its ingestion task marks it "ready", or
+    "failed" when the upload or the ingestion failed, in which case the next
+    upload of the same bytes ingests it again.
+
+    Attributes:
+        content_id (str): The ID the shared Embedding documents are stored under.
+        file_hash (str): The SHA-256 hash of the file bytes.
+        file_key (str): The object store key of the file.
+        file_url (str): The public URL of the file.
+        attachment_ids (list): The UUIDs of the attachments using the content.
+        reference_count (int): The number of attachments using the content.
+        status (str): Whether the content is "pending", "ready" or "failed". Content
+            stored before statuses were introduced is "ready".
+        status_updated_at (datetime): When the status last changed.
+        created_at (datetime): Timestamp indicating when the content was first uploaded.
+
+    Meta:
+        collection (str): The name of the MongoDB collection.
+        indexes (list): List of indexes for efficient querying.
+    """
+
+    content_id = StringField(required=True, unique=True)
+    file_hash = StringField(required=True, unique=True)
+    file_key = StringField(required=True)
+    file_url = StringField(required=True)
+    attachment_ids = ListField(StringField())
+    reference_count = IntField(default=0)
+    status = StringField(choices=CONTENT_STATUSES, default="ready")
+    status_updated_at = DateTimeField()
+    created_at = DateTimeField(default=datetime.now().replace(microsecond=0))
+
+    meta = {
+        "collection": "attachment_content",
+        "indexes": [
+            {"fields": ["attachment_ids"]},
+        ],
+    }
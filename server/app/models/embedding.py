@@ -10,7 +10,10 @@ from mongoengine import (
     ListField,
     StringField,
     IntField,
+    ValidationError,
 )
+import numpy as np
+from app.embeddings.vector_codec import VectorField, decode_vector
 
 
 class Embedding(Document):
@@ -20,8 +23,15 @@ class Embedding(Document):
     Attributes:
         hub_id (str): The ID of the hub to which the post belongs.
         post_id (UUID): The UUID of the post to which the embeddings are associated.
+        attachment_id (str): The content id of the attachment. Attachments with
+        identical files share it, see AttachmentContent.
         embeddings (list): List of lists containing embedding vectors
         representing text content.
+        content_hash (str): The SHA-256 hash of `text_content`, used to diff
+        re-uploaded attachments.
+        compact_embeddings (Binary): The embedding vector packed as a BSON binary
+        vector, used instead of `embeddings` when EMBEDDING_STORAGE_FORMAT is
+        "float32" or "int8".
         created_at (DateTime): Timestamp indicating when the embeddings were created.
 
     """
@@ -31,12 +41,38 @@ class Embedding(Document):
     attachment_id = StringField(required=True)
     batch_no = IntField(required=True)
     text_content = StringField(required=True)
-    embeddings = ListField(FloatField(), required=True)
+    content_hash = StringField()
+    embeddings = ListField(FloatField())
+    compact_embeddings = VectorField()
     created_at = DateTimeField(default=datetime.now().replace(microsecond=0))
 
     meta = {
         "collection": "embedding",
         "indexes": [
             {"fields": ["attachment_id"]},
+            {"fields": ["attachment_id", "content_hash"]},
         ],
     }
+
+    def clean(self):
+        """
+        Ensure the vector is stored either as a list of floats or in compact form.
+        """
+        if not self.embeddings and not self.compact_embeddings:
+            raise ValidationError(
+                "Either embeddings or compact_embeddings must be provided"
+            )
+
+    def get_vector(self) -> np.ndarray:
+        """
+        Return the embedding vector as a float32 NumPy array.
+
+        The compact form is decoded without copying when present; otherwise the
+        list of floats is converted.
+
+        Returns:
+            np.ndarray: The embedding vector.
+        """
+        if self.compact_embeddings:
+            return decode_vector(self.compact_embeddings)
+        return np.asarray(self.embeddings, dtype=np.float32)
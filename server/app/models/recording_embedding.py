@@ -7,9 +7,15 @@ from mongoengine import (
     Document,
     DateTimeField,
     FloatField,
+    IntField,
     ListField,
     StringField,
+    ValidationError,
 )
+import numpy as np
+from app.embeddings.vector_codec import VectorField, decode_vector
+
+MODALITIES = ("transcript", "frame")
 
 
 class RecordingEmbedding(Document):
@@ -36,7 +42,20 @@ class RecordingEmbedding(Document):
         text_content (StringField): The textual content extracted from
         the recording. Required field.
         embeddings (ListField of FloatField): The embeddings generated from
-        the text content. Required field.
+        the text content, unless stored in compact form.
+        compact_embeddings (VectorField): The embeddings packed as a BSON
+        binary vector, used when EMBEDDING_STORAGE_FORMAT is "float32" or "int8".
+        modality (StringField): Whether the text is a "transcript" chunk or
+        the description of a "frame".
+        start_time (FloatField): The offset in seconds from the start of the
+        recording at which the segment starts, when known.
+        end_time (FloatField): The offset in seconds at which the segment ends,
+        when known.
+        sequence (IntField): The position of the segment within its source:
+        among the frames of the room, or among the chunks of its transcript,
+        since a room has one transcript per recording.
+        chunk_id (StringField): The deterministic ID of the segment, derived from
+        the room, source and sequence, which makes ingestion idempotent.
         created_at (DateTimeField): The timestamp indicating when the
         recording embedding was created.
 
@@ -44,16 +63,58 @@ class RecordingEmbedding(Document):
         collection (str): The name of the MongoDB collection where
         documents of this class will be stored.
         indexes (list of dict): List of indexes to be created for efficient querying.
+
+    Note:
+        Chat queries filter the vector search on `room_id`, `modality`,
+        `start_time` and `end_time`, so these fields must be declared as "filter"
+        fields of the `recordingEmbeddedVectorIndex` Atlas Vector Search index.
+
+        The transcripts of a room each number their chunks from zero, so
+        `(room_id, modality, sequence)` is not unique and its index only orders
+        the segments. Uniqueness is enforced on `chunk_id`, which includes the
+        transcript ID.
     """
 
     room_id = StringField(required=True)
     text_content = StringField(required=True)
-    embeddings = ListField(FloatField(), required=True)
+    embeddings = ListField(FloatField())
+    compact_embeddings = VectorField()
+    modality = StringField(choices=MODALITIES)
+    start_time = FloatField()
+    end_time = FloatField()
+    sequence = IntField()
+    chunk_id = StringField()
     created_at = DateTimeField(default=datetime.now().replace(microsecond=0))
 
     meta = {
         "collection": "recording_embedding",
         "indexes": [
             {"fields": ["room_id"]},
+            {"fields": ["room_id", "modality", "sequence"]},
+            {"fields": ["room_id", "start_time", "end_time"]},
+            {"fields": ["chunk_id"], "unique": True, "sparse": True},
         ],
     }
+
+    def clean(self):
+        """
+        Ensure the vector is stored either as a list of floats or in compact form.
+        """
+        if not self.embeddings and not self.compact_embeddings:
+            raise ValidationError(
+                "Either embeddings or compact_embeddings must be provided"
+            )
+
+    def get_vector(self) -> np.ndarray:
+        """
+        Return the embedding vector as a float32 NumPy array.
+
+        The compact form is decoded without copying when present; otherwise the
+        list of floats is converted.
+
+        Returns:
+            np.ndarray: The embedding vector.
+        """
+        if self.compact_embeddings:
+            return decode_vector(self.compact_embeddings)
+        return np.asarray(self.embeddings, dtype=np.float32)
@@ -0,0 +1,43 @@
+"""
+Provides access to the analysis of recording frames.
+"""
+
+from .frame_analysis import (
+    decode_thumbnail,
+    decode_thumbnails,
+    frame_differences,
+    select_changed_frames,
+    select_keyframes,
+)
+from .perceptual_hash import (
+    dhash,
+    phash,
+    frame_hashes,
+    hamming_distances,
+    assign_scenes,
+    cluster_scenes,
+    select_scene_representatives,
+)
+from .image_context_cache import ImageContextCache
+from .embedding_ledger import (
+    EmbeddingLedger,
+    frame_reservation_id,
+    recording_chunk_id,
+)
+from .frame_ingestion import describe_stream, ingest_frames
+from .frame_session import FrameSessionState, FrameSession
+from .video_frames import frame_thumbnail, iter_video_frames, iter_video_keyframes
+from .transcript_ingestion import (
+    TranscriptCheckpoint,
+    iter_text_blocks,
+    ingest_transcript,
+    transcript_id,
+)
+from .frame_preprocessing import (
+    CropBox,
+    content_area,
+    detect_static_chrome,
+    prepare_frame,
+    record_payload_sizes,
+    payload_stats,
+)
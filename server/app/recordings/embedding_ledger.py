@@ -0,0 +1,183 @@
+"""
+Module providing the idempotent storage of recording embeddings.
+
+Celery may run an ingestion task more than once: publishing is retried, a failed
+task is retried, or a worker is lost before acknowledging it. Every recording
+embedding therefore gets a deterministic chunk ID derived from its room, source
+and sequence number, and is stored with an unordered bulk upsert that inserts it
+only when its chunk ID is new, so storing the same chunks again is a no-op.
+
+The number of recording embeddings of a room, which sizes the vector search, is
+maintained through a Redis ledger of the chunk IDs already counted. The chunk IDs
+of a stored batch are added to the ledger and the counter is increased by the
+number of new IDs in a single transaction, so every chunk is counted exactly once,
+even when a task is interrupted between storing a batch and counting it.
+
+Classes:
+    EmbeddingLedger: Exactly-once storage and counting of recording embeddings.
+
+Frame embeddings take their sequence numbers from a counter of the room. The
+numbers are reserved under an ID derived from the frames themselves, so a task
+that runs again, or the same frames uploaded again, get the same sequence
+numbers and chunk IDs.
+
+Functions:
+    recording_chunk_id: Return the deterministic ID of a recording chunk.
+    frame_reservation_id: Return the ID of the sequence numbers of some frames.
+"""
+
+import hashlib
+from typing import List, Optional, Sequence, Tuple
+
+import redis
+from pymongo import UpdateOne
+from app.models.recording_embedding import RecordingEmbedding
+from app.vector_search import index_documents
+
+
+def recording_chunk_id(room_id: str, source: str, sequence: int) -> str:
+    """
+    Return the deterministic ID of a chunk of a recording.
+
+    Args:
+        room_id (str): The ID of the room of the recording.
+        source (str): Where the chunk comes from: "frame", or "transcript:{id}"
+            with the ID of the transcript, since a room has one per recording.
+        sequence (int): The sequence number of the chunk within its source.
+
+    Returns:
+        str: The chunk ID, as a hexadecimal SHA-1 digest.
+    """
+    return hashlib.sha1(f"{room_id}:{source}:{sequence}".encode("utf-8")).hexdigest()
+
+
+def frame_reservation_id(
+    frames: Sequence[bytes], spans: Optional[Sequence[Tuple[float, float]]] = None
+) -> str:
+    """
+    Return the ID under which the sequence numbers of some frames are reserved.
+
+    The ID is derived from the bytes of the frames and their time spans, so the
+    same frames shown at the same times always get the same sequence numbers.
+
+    Args:
+        frames (Sequence[bytes]): The encoded frames, in order.
+        spans (Sequence[Tuple[float, float]], optional): The start and end time
+            of each frame.
+
+    Returns:
+        str: The reservation ID, as a hexadecimal SHA-1 digest.
+    """
+    digest = hashlib.sha1()
+    for index, frame in enumerate(frames):
+        digest.update(hashlib.sha1(frame).digest())
+        if spans:
+            digest.update(repr(tuple(spans[index])).encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+class EmbeddingLedger:
+    """
+    Exactly-once storage and counting of the recording embeddings of a room.
+
+    The ledger is a Redis set under `room_id_{room_id}_recording_ledger` holding
+    the chunk IDs counted in `room_id_{room_id}_number_of_recording_embeddings`.
+
+    Attributes:
+        redis_client: The Redis client holding the ledger and the counter.
+        room_id (str): The ID of the room.
+    """
+
+    def __init__(self, redis_client, room_id: str):
+        self.redis_client = redis_client
+        self.room_id = room_id
+
+    @property
+    def key(self) -> str:
+        """
+        The Redis set of the chunk IDs already counted.
+        """
+        return f"room_id_{self.room_id}_recording_ledger"
+
+    @property
+    def counter_key(self) -> str:
+        """
+        The Redis counter of the recording embeddings of the room.
+        """
+        return f"room_id_{self.room_id}_number_of_recording_embeddings"
+
+    def store(self, documents: List[RecordingEmbedding]) -> int:
+        """
+        Upsert recording embeddings by chunk ID and count the new ones.
+
+        Newly inserted embeddings are added to the vector search backend.
+
+        Args:
+            documents (List[RecordingEmbedding]): The embeddings, with their
+                `chunk_id` set.
+
+        Returns:
+            int: The number of embeddings counted for the first time.
+        """
+        if not documents:
+            return 0
+
+        for document in documents:
+            document.validate()
+
+        collection = (
+            RecordingEmbedding._get_collection()  # pylint: disable=protected-access
+        )
+        result = collection.bulk_write(
+            [
+                UpdateOne(
+                    {"chunk_id": document.chunk_id},
+                    {"$setOnInsert": document.to_mongo().to_dict()},
+                    upsert=True,
+                )
+                for document in documents
+            ],
+            ordered=False,
+        )
+        index_documents(
+            RecordingEmbedding,
+            [documents[position] for position in result.upserted_ids],
+            list(result.upserted_ids.values()),
+        )
+
+        return self.record([document.chunk_id for document in documents])
+
+    def record(self, chunk_ids: List[str]) -> int:
+        """
+        Add chunk IDs to the ledger and count those not counted before, atomically.
+
+        Args:
+            chunk_ids (List[str]): The IDs of the stored chunks.
+
+        Returns:
+            int: The number of chunk IDs that were new to the ledger.
+        """
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+
+        with self.redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.key)
+                    counted = pipe.smismember(self.key, chunk_ids)
+                    new_ids = [
+                        chunk_id
+                        for chunk_id, is_counted in zip(chunk_ids, counted)
+                        if not is_counted
+                    ]
+                    if not new_ids:
+                        pipe.unwatch()
+                        return 0
+
+                    pipe.multi()
+                    pipe.sadd(self.key, *new_ids)
+                    pipe.incrby(self.counter_key, len(new_ids))
+                    pipe.execute()
+                    return len(new_ids)
+                except redis.WatchError:
+                    continue
@@ -0,0 +1,174 @@
+"""
+Module providing the detection of changed frames in a recording.
+
+Each frame is decoded exactly once, directly at a reduced scale in grayscale,
+and shrunk to a small thumbnail. The differences between all adjacent frames
+are then computed in a single NumPy operation over the stacked thumbnails,
+instead of decoding every frame twice at full resolution for each pair.
+
+Functions:
+    decode_thumbnail: Decode an image into a small grayscale thumbnail.
+    decode_thumbnails: Decode a sequence of images into stacked thumbnails.
+    frame_differences: Compute the difference between adjacent thumbnails.
+    select_changed_frames: Select the frames that differ from their neighbour.
+    select_keyframes: Select the frames to describe with the vision model.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from app.recordings.perceptual_hash import (
+    cluster_scenes,
+    frame_hashes,
+    select_scene_representatives,
+)
+from config.config import Config
+
+
+def decode_thumbnail(
+    image_bytes: bytes,
+    size: Tuple[int, int] = (
+        Config.FRAME_THUMBNAIL_WIDTH,
+        Config.FRAME_THUMBNAIL_HEIGHT,
+    ),
+) -> np.ndarray:
+    """
+    Decode an image into a small grayscale thumbnail.
+
+    JPEG frames are decoded at a quarter of their resolution by the codec itself,
+    which is much cheaper than decoding them in full and resizing afterwards.
+
+    Args:
+        image_bytes (bytes): The encoded image.
+        size (Tuple[int, int]): The width and height of the thumbnail.
+
+    Returns:
+        np.ndarray: The thumbnail as a (height, width) uint8 array.
+
+    Raises:
+        ValueError: If the image cannot be decoded.
+    """
+    image = cv2.imdecode(
+        np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4
+    )
+    if image is None:
+        raise ValueError("Unable to decode image frame")
+
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def decode_thumbnails(
+    image_files: Sequence[bytes],
+    size: Tuple[int, int] = (
+        Config.FRAME_THUMBNAIL_WIDTH,
+        Config.FRAME_THUMBNAIL_HEIGHT,
+    ),
+    max_workers: int = Config.FRAME_DECODE_WORKERS,
+) -> np.ndarray:
+    """
+    Decode a sequence of images into stacked grayscale thumbnails.
+
+    OpenCV releases the GIL while decoding, so frames are decoded by a thread pool.
+
+    Args:
+        image_files (Sequence[bytes]): The encoded images, in recording order.
+        size (Tuple[int, int]): The width and height of the thumbnails.
+        max_workers (int): The number of decoding threads.
+
+    Returns:
+        np.ndarray: The thumbnails as an (n, height, width) uint8 array.
+    """
+    if not image_files:
+        return np.empty((0, size[1], size[0]), dtype=np.uint8)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        thumbnails = list(
+            executor.map(lambda image: decode_thumbnail(image, size), image_files)
+        )
+
+    return np.stack(thumbnails)
+
+
+def frame_differences(thumbnails: np.ndarray) -> np.ndarray:
+    """
+    Compute the mean absolute difference between each pair of adjacent thumbnails.
+
+    Args:
+        thumbnails (np.ndarray): The thumbnails as an (n, height, width) array.
+
+    Returns:
+        np.ndarray: The n - 1 differences, from 0.0 (same image) to 1.0
+        (completely different images).
+    """
+    if len(thumbnails) < 2:
+        return np.empty(0, dtype=np.float32)
+
+    pixels = thumbnails.astype(np.int16)
+    return np.abs(np.diff(pixels, axis=0)).mean(axis=(1, 2)) / 255.0
+
+
+def select_changed_frames(
+    differences: np.ndarray, threshold: float = Config.FRAME_DIFFERENCE_THRESHOLD
+) -> List[int]:
+    """
+    Select the frames that differ from their neighbour by more than `threshold`.
+
+    A frame is selected when it differs from the next frame; the last frame is
+    selected when it differs from the previous one. A single frame is always
+    selected.
+
+    Args:
+        differences (np.ndarray): The differences returned by `frame_differences`.
+        threshold (float): The minimum difference for a frame to be selected.
+
+    Returns:
+        List[int]: The indexes of the selected frames, in recording order.
+    """
+    if len(differences) == 0:
+        return [0]
+
+    changed = differences > threshold
+    selected = np.flatnonzero(changed).tolist()
+
+    if changed[-1]:
+        selected.append(len(differences))
+
+    return selected
+
+
+def select_keyframes(
+    thumbnails: np.ndarray,
+    algorithm: Optional[str] = None,
+    threshold: Optional[int] = None,
+) -> List[int]:
+    """
+    Select the frames of a recording that are described by the vision model.
+
+    With a perceptual hash algorithm, frames are clustered into scenes and one
+    representative per scene is selected. With "off", every frame that differs
+    from its neighbour by more than `FRAME_DIFFERENCE_THRESHOLD` is selected.
+
+    Args:
+        thumbnails (np.ndarray): The thumbnails as an (n, height, width) array.
+        algorithm (str, optional): "dhash", "phash" or "off". Defaults to
+            `Config.FRAME_HASH_ALGORITHM`.
+        threshold (int, optional): The maximum Hamming distance within a scene.
+            Defaults to `Config.FRAME_HASH_THRESHOLD`.
+
+    Returns:
+        List[int]: The indexes of the selected frames, in recording order.
+    """
+    algorithm = algorithm or Config.FRAME_HASH_ALGORITHM
+
+    if algorithm == "off":
+        return select_changed_frames(
+            frame_differences(thumbnails), Config.FRAME_DIFFERENCE_THRESHOLD
+        )
+
+    scenes = cluster_scenes(
+        frame_hashes(thumbnails, algorithm),
+        Config.FRAME_HASH_THRESHOLD if threshold is None else threshold,
+    )
+    return select_scene_representatives(scenes)
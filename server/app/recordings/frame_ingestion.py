@@ -0,0 +1,187 @@
+"""
+Module providing the describe -> embed -> insert pipeline for recording keyframes.
+
+Keyframes are described by the vision model concurrently, with at most
+`VISION_MAX_CONCURRENCY` requests in flight, and each request is retried with
+exponential backoff. Descriptions are consumed in frame order as they complete:
+they are embedded in batches and inserted as RecordingEmbedding documents batch
+by batch, while the next frames are still being described. Frames found in the
+ImageContextCache skip both the vision and the embedding request. Documents are
+stored through the EmbeddingLedger, so ingesting the same keyframes again stores
+and counts nothing.
+
+Functions:
+    describe_stream: Describe frames concurrently, yielding results in order.
+    ingest_frames: Describe, embed and store the keyframes of a recording.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from app.embeddings import get_embedding_client, vector_fields
+from app.ingestion.pipeline import iter_batches
+from app.models.recording_embedding import RecordingEmbedding
+from app.recordings.embedding_ledger import EmbeddingLedger, recording_chunk_id
+from app.recordings.image_context_cache import ImageContextCache
+from app.recordings.perceptual_hash import frame_hashes
+from config.config import Config
+
+Span = Tuple[Optional[float], Optional[float]]
+
+
+def call_with_retries(
+    function: Callable, argument, max_retries: int, retry_backoff: float
+):
+    """
+    Call `function(argument)`, retrying with exponential backoff on failure.
+
+    Raises:
+        Exception: The last error once all retries are exhausted.
+    """
+    attempt = 0
+
+    while True:
+        try:
+            return function(argument)
+        except Exception as error:
+            if attempt >= max_retries:
+                print(f"Error: {error}")
+                raise
+
+            delay = retry_backoff * (2**attempt)
+            print(f"Vision request failed ({error}), retrying in {delay}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def describe_stream(
+    images: Iterable[bytes],
+    describe: Callable[[bytes], str],
+    max_concurrency: int = Config.VISION_MAX_CONCURRENCY,
+    max_retries: int = Config.VISION_MAX_RETRIES,
+    retry_backoff: float = 1.0,
+) -> Iterator[str]:
+    """
+    Describe frames concurrently and yield the descriptions in frame order.
+
+    Frames are consumed from `images` only as fast as requests can be submitted,
+    so at most `max_concurrency` frames are held and described at a time.
+
+    Args:
+        images (Iterable[bytes]): The frames to describe.
+        describe (Callable[[bytes], str]): Sends one frame to the vision model.
+        max_concurrency (int): The maximum number of requests in flight.
+        max_retries (int): The number of retries of a failed request.
+        retry_backoff (float): The initial delay in seconds between retries.
+
+    Yields:
+        str: The description of each frame.
+    """
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        in_flight = deque()
+
+        for image in images:
+            if len(in_flight) >= max_concurrency:
+                yield in_flight.popleft().result()
+
+            in_flight.append(
+                executor.submit(
+                    call_with_retries, describe, image, max_retries, retry_backoff
+                )
+            )
+
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def ingest_frames(
+    image_files: List[bytes],
+    thumbnails: np.ndarray,
+    room_id: str,
+    describe: Callable[[bytes], str],
+    ledger: EmbeddingLedger,
+    batch_size: int = Config.EMBEDDING_BATCH_SIZE,
+    cache: Optional[ImageContextCache] = None,
+    spans: Optional[Sequence[Span]] = None,
+    first_sequence: int = 1,
+) -> int:
+    """
+    Describe, embed and store the keyframes of a recording.
+
+    Each keyframe is stored under the chunk ID of its sequence number, so the
+    sequence numbers must be the same when a task ingests its keyframes again.
+
+    Args:
+        image_files (List[bytes]): The keyframes, in recording order.
+        thumbnails (np.ndarray): The grayscale thumbnails of the keyframes.
+        room_id (str): The ID of the room the recording belongs to.
+        describe (Callable[[bytes], str]): Sends one frame to the vision model.
+        ledger (EmbeddingLedger): Stores and counts the embeddings of the room.
+        batch_size (int): The number of frames embedded and inserted together.
+        cache (ImageContextCache, optional): The cache of known slides.
+        spans (Sequence[Span], optional): The start and end time in seconds of the
+            scene of each keyframe.
+        first_sequence (int): The sequence number of the first keyframe.
+
+    Returns:
+        int: The number of RecordingEmbedding documents stored and counted for the
+        first time.
+    """
+    hashes = frame_hashes(thumbnails, "dhash")
+    cached = cache.get_many(hashes) if cache else [None] * len(image_files)
+    spans = spans or [(None, None)] * len(image_files)
+
+    descriptions = describe_stream(
+        (image for image, entry in zip(image_files, cached) if entry is None),
+        describe,
+    )
+
+    def described_frames():
+        for index, (frame_hash, entry) in enumerate(zip(hashes, cached)):
+            if entry is not None:
+                yield index, frame_hash, entry[0], entry[1]
+            else:
+                yield index, frame_hash, next(descriptions), None
+
+    embedding_client = get_embedding_client()
+    total = 0
+
+    for batch in iter_batches(described_frames(), batch_size):
+        missing = [position for position, frame in enumerate(batch) if frame[3] is None]
+        fetched = embedding_client.embed_documents(
+            [batch[position][2] for position in missing]
+        )
+        embeddings = [embedding for _, _, _, embedding in batch]
+        for position, embedding in zip(missing, fetched):
+            embeddings[position] = embedding
+
+        total += ledger.store(
+            [
+                RecordingEmbedding(
+                    room_id=room_id,
+                    text_content=description,
+                    modality="frame",
+                    start_time=spans[index][0],
+                    end_time=spans[index][1],
+                    sequence=first_sequence + index,
+                    chunk_id=recording_chunk_id(
+                        room_id, "frame", first_sequence + index
+                    ),
+                    **vector_fields(embedding),
+                )
+                for (index, _, description, _), embedding in zip(batch, embeddings)
+            ]
+        )
+
+        if cache and missing:
+            cache.set_many(
+                {
+                    batch[position][1]: (batch[position][2], embeddings[position])
+                    for position in missing
+                }
+            )
+
+    return total
@@ -0,0 +1,210 @@
+"""
+Module providing the shrinking of recording frames before vision inference.
+
+Frames are often multi-megabyte PNG screenshots, far larger than the input
+resolution of the vision model, which downsamples them anyway. Before a frame is
+sent, it is:
+
+- cropped to the content area when static UI chrome is detected: toolbars and
+  window borders are the rows and columns at the edges of the screen that do not
+  change across the frames of the recording;
+- downscaled so its longest side is at most `VISION_MAX_IMAGE_SIZE`;
+- re-encoded as JPEG or WebP at `VISION_IMAGE_QUALITY`.
+
+The bytes sent and saved are counted in Redis so the settings can be tuned.
+
+Functions:
+    detect_static_chrome: Find the content area of a stack of thumbnails.
+    content_area: Find the content area from the pixel range of the frames.
+    prepare_frame: Shrink a frame before it is sent to the vision model.
+    record_payload_sizes: Count the bytes of frames before and after shrinking.
+    payload_stats: Return the byte counters aggregated across all workers.
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from config.config import Config
+
+CropBox = Tuple[float, float, float, float]
+
+PAYLOAD_STATS_KEY = "vision_payload_stats"
+
+ENCODINGS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+def detect_static_chrome(
+    thumbnails: np.ndarray,
+    tolerance: int = 8,
+    min_frames: int = 3,
+    max_fraction: float = Config.VISION_CHROME_MAX_FRACTION,
+) -> Optional[CropBox]:
+    """
+    Find the content area of a recording from the thumbnails of its frames.
+
+    Rows and columns at the edges of the screen in which no pixel changes by more
+    than `tolerance` across all frames are considered static chrome. At most
+    `max_fraction` of the height or width is cropped on each side.
+
+    Args:
+        thumbnails (np.ndarray): The thumbnails as an (n, height, width) array.
+        tolerance (int): The pixel change below which a pixel is static.
+        min_frames (int): The minimum number of frames to detect chrome from.
+        max_fraction (float): The maximum fraction cropped on each side.
+
+    Returns:
+        CropBox: The top, bottom, left and right edges of the content area as
+        fractions of the height and width, or None when no chrome is detected.
+    """
+    if len(thumbnails) < min_frames:
+        return None
+
+    return content_area(
+        thumbnails.min(axis=0), thumbnails.max(axis=0), tolerance, max_fraction
+    )
+
+
+def content_area(
+    low: np.ndarray,
+    high: np.ndarray,
+    tolerance: int = 8,
+    max_fraction: float = Config.VISION_CHROME_MAX_FRACTION,
+) -> Optional[CropBox]:
+    """
+    Find the content area of a recording from the range of each thumbnail pixel.
+
+    The range can be accumulated over many batches of frames, as live frame
+    ingestion sessions do.
+
+    Args:
+        low (np.ndarray): The minimum of each thumbnail pixel across the frames.
+        high (np.ndarray): The maximum of each thumbnail pixel across the frames.
+        tolerance (int): The pixel change below which a pixel is static.
+        max_fraction (float): The maximum fraction cropped on each side.
+
+    Returns:
+        CropBox: The content area as in `detect_static_chrome`, or None when no
+        chrome is detected.
+    """
+    changed = (high.astype(np.int16) - low.astype(np.int16)) > tolerance
+    rows = np.flatnonzero(changed.any(axis=1))
+    columns = np.flatnonzero(changed.any(axis=0))
+
+    if len(rows) == 0:
+        return None
+
+    height, width = changed.shape
+    max_rows = int(height * max_fraction)
+    max_columns = int(width * max_fraction)
+
+    # Keep a one-pixel margin, since a thumbnail pixel spans many frame pixels.
+    top = min(max(rows[0] - 1, 0), max_rows)
+    bottom = max(min(rows[-1] + 2, height), height - max_rows)
+    left = min(max(columns[0] - 1, 0), max_columns)
+    right = max(min(columns[-1] + 2, width), width - max_columns)
+
+    if (top, bottom, left, right) == (0, height, 0, width):
+        return None
+
+    return top / height, bottom / height, left / width, right / width
+
+
+def prepare_frame(
+    image_bytes: bytes,
+    crop: Optional[CropBox] = None,
+    max_size: int = Config.VISION_MAX_IMAGE_SIZE,
+    image_format: str = Config.VISION_IMAGE_FORMAT,
+    quality: int = Config.VISION_IMAGE_QUALITY,
+) -> bytes:
+    """
+    Crop, downscale and re-encode a frame before it is sent to the vision model.
+
+    Args:
+        image_bytes (bytes): The encoded frame.
+        crop (CropBox, optional): The content area returned by
+            `detect_static_chrome`.
+        max_size (int): The maximum width and height of the frame sent.
+        image_format (str): Either "jpeg" or "webp".
+        quality (int): The encoding quality, from 1 to 100.
+
+    Returns:
+        bytes: The shrunk frame, or the original frame when shrinking it does not
+        make it smaller.
+
+    Raises:
+        ValueError: If the frame cannot be decoded or the format is not supported.
+    """
+    if image_format not in ENCODINGS:
+        raise ValueError(f"Unsupported vision image format: {image_format}")
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Unable to decode image frame")
+
+    if crop is not None:
+        height, width = image.shape[:2]
+        top, bottom, left, right = crop
+        image = image[
+            round(top * height) : round(bottom * height),
+            round(left * width) : round(right * width),
+        ]
+
+    scale = max_size / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(
+            image,
+            (round(image.shape[1] * scale), round(image.shape[0] * scale)),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    extension, quality_flag = ENCODINGS[image_format]
+    encoded, payload = cv2.imencode(extension, image, [quality_flag, quality])
+    if not encoded or len(payload) >= len(image_bytes):
+        return image_bytes
+
+    return payload.tobytes()
+
+
+def record_payload_sizes(redis_client, bytes_in: int, bytes_out: int) -> None:
+    """
+    Count the size of a frame before and after shrinking.
+
+    Args:
+        redis_client: The Redis client holding the counters.
+        bytes_in (int): The size of the original frame.
+        bytes_out (int): The size of the frame sent to the vision model.
+    """
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hincrby(PAYLOAD_STATS_KEY, "frames", 1)
+        pipe.hincrby(PAYLOAD_STATS_KEY, "bytes_in", bytes_in)
+        pipe.hincrby(PAYLOAD_STATS_KEY, "bytes_out", bytes_out)
+        pipe.execute()
+
+
+def payload_stats(redis_client) -> dict:
+    """
+    Return the frame size counters aggregated across all workers.
+
+    Args:
+        redis_client: The Redis client holding the counters.
+
+    Returns:
+        dict: The number of frames, bytes in, bytes out and the ratio of the two.
+    """
+    counters = {
+        key.decode("utf-8"): int(value)
+        for key, value in redis_client.hgetall(PAYLOAD_STATS_KEY).items()
+    }
+    bytes_in = counters.get("bytes_in", 0)
+    bytes_out = counters.get("bytes_out", 0)
+
+    return {
+        "frames": counters.get("frames", 0),
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "ratio": bytes_out / bytes_in if bytes_in else 0.0,
+    }
@@ -0,0 +1,520 @@
+"""
+Module providing incremental frame ingestion sessions for live recordings.
+
+Instead of uploading every frame of a class in one request once it ends, clients
+open a session for the room and append frames in small batches while the class
+is live. Each batch is processed by its own task, in the order the batches were
+received, and the scene state of the room is kept in Redis between batches:
+
+- the anchor hash of every scene seen so far, so a slide the educator returns to
+  is recognised even when it was shown in an earlier batch;
+- which scenes were already described, so each scene is described only once;
+- the last frame of the scene currently on screen. A scene is described once it
+  ends, from its last frame, so that frame is kept in the object store until the
+  next batch shows whether the scene continues;
+- the range of each thumbnail pixel across all frames, from which the static UI
+  chrome is detected once `VISION_CHROME_MIN_SCENES` scenes were seen, rather
+  than from the few frames of a single batch.
+
+Embeddings are therefore produced batch by batch and chat-with-recording works
+during the lecture.
+
+The keyframes and discarded frames of a batch are saved with the state that
+produced them, and deleted once the keyframes are stored. A task that fails
+after saving the state therefore stores the same keyframes when it is retried.
+A batch that keeps failing is skipped and counted, so the batches after it are
+still processed. So is a batch whose task could not be dispatched, or that the
+batches after it stopped waiting for.
+
+Classes:
+    Keyframe: A frame to describe, with the time span of its scene.
+    FrameSessionState: The scene state of a session between two batches.
+    FrameSession: Redis-backed ingestion session of a room.
+"""
+
+import json
+import time
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import redis
+from app.recordings.frame_preprocessing import CropBox, content_area
+from app.recordings.perceptual_hash import assign_scenes
+from config.config import Config
+
+
+def optional_float(value: Optional[bytes]) -> Optional[float]:
+    """
+    Parse a float stored in a Redis hash, where "" stands for None.
+    """
+    return float(value) if value else None
+
+
+class Keyframe(NamedTuple):
+    """
+    A frame to describe, with the time span its scene was on screen.
+    """
+
+    key: str
+    start_time: Optional[float]
+    end_time: Optional[float]
+
+
+class FrameSessionState:
+    """
+    The scene state of a frame ingestion session between two batches.
+
+    Attributes:
+        next_batch (int): The sequence number of the next batch to process.
+        anchors (np.ndarray): The anchor hash of each scene seen so far.
+        described (List[bool]): Whether each scene was described already.
+        open_scene (int): The scene currently on screen, or -1 before any frame.
+        pending_key (str, optional): The object store key of the last frame of
+            the open scene.
+        open_since (float, optional): The time the open scene appeared on screen.
+        pending_time (float, optional): The time of the pending frame.
+        frames (int): The number of frames received so far.
+        keyframes (int): The number of frames described so far.
+        pixel_min (np.ndarray, optional): The minimum of each thumbnail pixel.
+        pixel_max (np.ndarray, optional): The maximum of each thumbnail pixel.
+    """
+
+    def __init__(
+        self,
+        next_batch: int = 0,
+        anchors: Optional[np.ndarray] = None,
+        described: Optional[List[bool]] = None,
+        open_scene: int = -1,
+        pending_key: Optional[str] = None,
+        open_since: Optional[float] = None,
+        pending_time: Optional[float] = None,
+        frames: int = 0,
+        keyframes: int = 0,
+        pixel_min: Optional[np.ndarray] = None,
+        pixel_max: Optional[np.ndarray] = None,
+    ):
+        self.next_batch = next_batch
+        self.anchors = np.empty(0, dtype=np.uint64) if anchors is None else anchors
+        self.described = described or []
+        self.open_scene = open_scene
+        self.pending_key = pending_key
+        self.open_since = open_since
+        self.pending_time = pending_time
+        self.frames = frames
+        self.keyframes = keyframes
+        self.pixel_min = pixel_min
+        self.pixel_max = pixel_max
+
+    def advance(
+        self,
+        frame_keys: Sequence[str],
+        hashes: np.ndarray,
+        threshold: int = Config.FRAME_HASH_THRESHOLD,
+        timestamps: Optional[Sequence[Optional[float]]] = None,
+    ) -> Tuple[List[Keyframe], List[str]]:
+        """
+        Advance the scene state over the next batch of frames.
+
+        A scene is described from its last frame once the next frame belongs to
+        another scene, unless the scene was described before.
+
+        Args:
+            frame_keys (Sequence[str]): The object store keys of the frames.
+            hashes (np.ndarray): The perceptual hash of each frame.
+            threshold (int): The maximum Hamming distance within a scene.
+            timestamps (Sequence[float], optional): The offset of each frame from
+                the start of the recording, in seconds.
+
+        Returns:
+            Tuple[List[Keyframe], List[str]]: The frames to describe, and the keys
+            of the frames that are no longer needed.
+        """
+        scene_ids, self.anchors = assign_scenes(hashes, self.anchors, threshold)
+        self.described.extend([False] * (len(self.anchors) - len(self.described)))
+        timestamps = timestamps or [None] * len(frame_keys)
+        keyframes: List[Keyframe] = []
+        discarded_keys: List[str] = []
+
+        for frame_key, scene_id, timestamp in zip(frame_keys, scene_ids, timestamps):
+            scene_changed = scene_id != self.open_scene
+
+            if self.pending_key is not None:
+                if scene_changed and not self.described[self.open_scene]:
+                    self.described[self.open_scene] = True
+                    keyframes.append(
+                        Keyframe(self.pending_key, self.open_since, self.pending_time)
+                    )
+                else:
+                    discarded_keys.append(self.pending_key)
+
+            if scene_changed:
+                self.open_since = timestamp
+            self.open_scene = scene_id
+            self.pending_key = frame_key
+            self.pending_time = timestamp
+
+        self.frames += len(frame_keys)
+        self.keyframes += len(keyframes)
+
+        return keyframes, discarded_keys
+
+    def observe(self, thumbnails: np.ndarray) -> None:
+        """
+        Widen the range of each thumbnail pixel with the frames of a batch.
+
+        Args:
+            thumbnails (np.ndarray): The thumbnails as an (n, height, width) array.
+        """
+        if len(thumbnails) == 0:
+            return
+
+        low, high = thumbnails.min(axis=0), thumbnails.max(axis=0)
+        if self.pixel_min is None or self.pixel_min.shape != low.shape:
+            self.pixel_min, self.pixel_max = low, high
+        else:
+            self.pixel_min = np.minimum(self.pixel_min, low)
+            self.pixel_max = np.maximum(self.pixel_max, high)
+
+    def chrome(
+        self, min_scenes: int = Config.VISION_CHROME_MIN_SCENES
+    ) -> Optional[CropBox]:
+        """
+        Return the content area of the recording, once enough scenes were seen.
+
+        Args:
+            min_scenes (int): The number of distinct scenes below which no chrome
+                is detected, since a static part of a few slides is not chrome.
+
+        Returns:
+            CropBox: The content area, or None.
+        """
+        if self.pixel_min is None or len(self.anchors) < min_scenes:
+            return None
+
+        return content_area(self.pixel_min, self.pixel_max)
+
+    def flush(self) -> Tuple[List[Keyframe], List[str]]:
+        """
+        End the open scene when the session is closed.
+
+        Returns:
+            Tuple[List[Keyframe], List[str]]: The frames to describe, and the keys
+            of the frames that are no longer needed.
+        """
+        if self.pending_key is None:
+            return [], []
+
+        pending_key, self.pending_key = self.pending_key, None
+
+        if self.described[self.open_scene]:
+            return [], [pending_key]
+
+        self.described[self.open_scene] = True
+        self.keyframes += 1
+        return [Keyframe(pending_key, self.open_since, self.pending_time)], []
+
+
+class FrameSession:
+    """
+    Redis-backed frame ingestion session of a room.
+
+    The session is a Redis hash under `recording_session:{room_id}` holding its
+    status, the number of batches received and the FrameSessionState. It expires
+    `ttl` seconds after the last batch.
+
+    Attributes:
+        redis_client: The Redis client holding the session.
+        room_id (str): The ID of the room being recorded.
+        ttl (int): The expiry of an idle session, in seconds.
+    """
+
+    KEY_PREFIX = "recording_session"
+    OPEN = "open"
+    CLOSED = "closed"
+
+    def __init__(self, redis_client, room_id: str, ttl: int = Config.FRAME_SESSION_TTL):
+        self.redis_client = redis_client
+        self.room_id = room_id
+        self.ttl = ttl
+
+    @property
+    def key(self) -> str:
+        """
+        The Redis hash holding the session.
+        """
+        return f"{self.KEY_PREFIX}:{self.room_id}"
+
+    def lock(self, timeout: int = 60):
+        """
+        Return a Redis lock serializing the state updates of the session.
+        """
+        return self.redis_client.lock(f"{self.key}:lock", timeout=timeout)
+
+    def start(self) -> dict:
+        """
+        Open the session, or return the open session of the room.
+
+        Returns:
+            dict: The status of the session.
+        """
+        if self.redis_client.hsetnx(self.key, "status", self.OPEN):
+            self.redis_client.hset(
+                self.key,
+                mapping={"received": 0, "next_batch": 0, "started_at": time.time()},
+            )
+        self.redis_client.expire(self.key, self.ttl)
+
+        return self.status()
+
+    def status(self) -> Optional[dict]:
+        """
+        Return the status of the session, or None when there is no session.
+
+        Returns:
+            dict: The status, batches received and processed, and frame counts.
+        """
+        session = self.redis_client.hgetall(self.key)
+        if not session:
+            return None
+
+        return {
+            "room_id": self.room_id,
+            "status": session[b"status"].decode("utf-8"),
+            "batches_received": int(session.get(b"received", 0)),
+            "batches_processed": int(session.get(b"next_batch", 0)),
+            "frames": int(session.get(b"frames", 0)),
+            "keyframes": int(session.get(b"keyframes", 0)),
+            "batches_failed": int(session.get(b"failed_batches", 0)),
+        }
+
+    def elapsed(self) -> Optional[float]:
+        """
+        Return the number of seconds since the session was started.
+
+        Returns:
+            float: The elapsed time, or None when there is no session.
+        """
+        started_at = self.redis_client.hget(self.key, "started_at")
+        return time.time() - float(started_at) if started_at else None
+
+    def append_batch(self) -> Optional[int]:
+        """
+        Reserve the sequence number of the next batch of frames.
+
+        Returns:
+            int: The sequence number, or None when the session is not open.
+        """
+        return self._reserve_batch(close=False)
+
+    def close(self) -> Optional[int]:
+        """
+        Close the session to new batches.
+
+        Returns:
+            int: The sequence number of the final batch, which flushes the open
+            scene, or None when the session is not open.
+        """
+        return self._reserve_batch(close=True)
+
+    def _reserve_batch(self, close: bool) -> Optional[int]:
+        """
+        Reserve a batch sequence number while the session is open, atomically.
+        """
+        with self.redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.key)
+                    if pipe.hget(self.key, "status") != self.OPEN.encode("utf-8"):
+                        pipe.unwatch()
+                        return None
+
+                    pipe.multi()
+                    if close:
+                        pipe.hset(self.key, "status", self.CLOSED)
+                    pipe.hincrby(self.key, "received", 1)
+                    pipe.expire(self.key, self.ttl)
+                    return pipe.execute()[-2] - 1
+                except redis.WatchError:
+                    continue
+
+    def load_state(self) -> Optional[FrameSessionState]:
+        """
+        Load the scene state of the session.
+
+        Returns:
+            FrameSessionState: The state, or None when there is no session.
+        """
+        session = self.redis_client.hgetall(self.key)
+        if not session:
+            return None
+
+        pending_key = session.get(b"pending_key", b"").decode("utf-8")
+        pixel_shape = session.get(b"pixel_shape", b"").decode("utf-8")
+        pixel_shape = tuple(map(int, pixel_shape.split(","))) if pixel_shape else None
+
+        return FrameSessionState(
+            next_batch=int(session.get(b"next_batch", 0)),
+            anchors=np.frombuffer(session.get(b"anchors", b""), np.uint64).copy(),
+            described=[
+                bool(flag)
+                for flag in np.frombuffer(session.get(b"described", b""), np.uint8)
+            ],
+            open_scene=int(session.get(b"open_scene", -1)),
+            pending_key=pending_key or None,
+            open_since=optional_float(session.get(b"open_since")),
+            pending_time=optional_float(session.get(b"pending_time")),
+            frames=int(session.get(b"frames", 0)),
+            keyframes=int(session.get(b"keyframes", 0)),
+            pixel_min=(
+                np.frombuffer(session[b"pixel_min"], np.uint8).reshape(pixel_shape)
+                if pixel_shape
+                else None
+            ),
+            pixel_max=(
+                np.frombuffer(session[b"pixel_max"], np.uint8).reshape(pixel_shape)
+                if pixel_shape
+                else None
+            ),
+        )
+
+    def save_state(
+        self,
+        state: FrameSessionState,
+        sequence: Optional[int] = None,
+        keyframes: Sequence[Keyframe] = (),
+        discarded_keys: Sequence[str] = (),
+    ) -> None:
+        """
+        Save the scene state of the session and mark the batch as processed.
+
+        Args:
+            state (FrameSessionState): The state after the batch.
+            sequence (int, optional): The sequence number of the batch, whose
+                keyframes and discarded frames are saved with the state until
+                `finish_batch` is called.
+            keyframes (Sequence[Keyframe]): The frames to describe.
+            discarded_keys (Sequence[str]): The keys of the frames no longer needed.
+        """
+        with self.redis_client.pipeline() as pipe:
+            if sequence is not None:
+                pipe.hset(
+                    self.key,
+                    f"batch:{sequence}",
+                    json.dumps(
+                        {
+                            "keyframes": [list(keyframe) for keyframe in keyframes],
+                            "discarded_keys": list(discarded_keys),
+                        }
+                    ),
+                )
+            pipe.hset(
+                self.key,
+                mapping={
+                    "next_batch": state.next_batch,
+                    "anchors": np.asarray(state.anchors, np.uint64).tobytes(),
+                    "described": np.asarray(state.described, np.uint8).tobytes(),
+                    "open_scene": state.open_scene,
+                    "pending_key": state.pending_key or "",
+                    "open_since": "" if state.open_since is None else state.open_since,
+                    "pending_time": (
+                        "" if state.pending_time is None else state.pending_time
+                    ),
+                    "frames": state.frames,
+                    "keyframes": state.keyframes,
+                },
+            )
+            if state.pixel_min is not None:
+                pipe.hset(
+                    self.key,
+                    mapping={
+                        "pixel_shape": ",".join(map(str, state.pixel_min.shape)),
+                        "pixel_min": np.asarray(state.pixel_min, np.uint8).tobytes(),
+                        "pixel_max": np.asarray(state.pixel_max, np.uint8).tobytes(),
+                    },
+                )
+            pipe.expire(self.key, self.ttl)
+            pipe.execute()
+
+    def load_batch(self, sequence: int) -> Optional[Tuple[List[Keyframe], List[str]]]:
+        """
+        Load the outcome of a batch whose state was saved but whose keyframes
+        were not stored yet.
+
+        Args:
+            sequence (int): The sequence number of the batch.
+
+        Returns:
+            Tuple[List[Keyframe], List[str]]: The frames to describe, and the keys
+            of the frames that are no longer needed, or None.
+        """
+        batch = self.redis_client.hget(self.key, f"batch:{sequence}")
+        if batch is None:
+            return None
+
+        batch = json.loads(batch)
+        return [Keyframe(*keyframe) for keyframe in batch["keyframes"]], batch[
+            "discarded_keys"
+        ]
+
+    def finish_batch(self, sequence: int) -> None:
+        """
+        Forget the outcome and failures of a batch once its keyframes are stored.
+
+        Args:
+            sequence (int): The sequence number of the batch.
+        """
+        self.redis_client.hdel(self.key, f"batch:{sequence}", f"failures:{sequence}")
+
+    def count_failure(self, sequence: int) -> int:
+        """
+        Count a failed attempt at processing a batch.
+
+        Args:
+            sequence (int): The sequence number of the batch.
+
+        Returns:
+            int: The number of failed attempts so far.
+        """
+        return self.redis_client.hincrby(self.key, f"failures:{sequence}", 1)
+
+    def fail_batch(self, sequence: int) -> None:
+        """
+        Give up on a batch, counting it in the failed batches of the session.
+
+        Args:
+            sequence (int): The sequence number of the batch.
+        """
+        self.finish_batch(sequence)
+        self.redis_client.hincrby(self.key, "failed_batches", 1)
+
+    def skip_batch(self, sequence: int) -> None:
+        """
+        Mark a batch that will not be processed, so the batches after it stop
+        waiting for it, and count it in the failed batches of the session.
+
+        Args:
+            sequence (int): The sequence number of the batch.
+        """
+        if not self.redis_client.exists(self.key):
+            return
+
+        if self.redis_client.hsetnx(self.key, f"skipped:{sequence}", 1):
+            self.redis_client.hincrby(self.key, "failed_batches", 1)
+
+    def is_skipped(self, sequence: int) -> bool:
+        """
+        Tell whether a batch was marked by `skip_batch`.
+
+        Args:
+            sequence (int): The sequence number of the batch.
+
+        Returns:
+            bool: True if the batch must not be processed.
+        """
+        return bool(self.redis_client.hexists(self.key, f"skipped:{sequence}"))
+
+    def delete(self) -> None:
+        """
+        Delete the session once its final batch is processed.
+        """
+        self.redis_client.delete(self.key)
@@ -0,0 +1,225 @@
+"""
+Module providing a cache of image descriptions keyed by perceptual hash.
+
+Educators reuse the same slide decks across recorded sessions, so the same
+slides are described by the vision model and embedded again and again. This
+cache maps the 64-bit dHash of a frame to the generated description and its
+embedding, and matches frames whose hash is within a Hamming-distance tolerance
+of a cached one.
+
+Near matches are found with multi-index hashing: the hash is split into
+`tolerance + 1` bands, and by the pigeonhole principle any hash within
+`tolerance` bits of a cached hash shares at least one band with it exactly.
+Each band value indexes a Redis set of cached hashes, so a lookup only compares
+the few candidates sharing a band instead of scanning every entry.
+
+Classes:
+    ImageContextCache: Redis-backed cache of image descriptions and embeddings.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from app.recordings.perceptual_hash import hamming_distances
+from config.config import Config
+
+CachedContext = Tuple[str, Optional[list]]
+
+
+class ImageContextCache:
+    """
+    Cache of image descriptions and their embeddings keyed by perceptual hash.
+
+    Each entry is a Redis hash under `image_context_cache:entry:{hash}` holding the
+    description, the embedding as packed float32 bytes and the embedding model.
+    Band sets under `image_context_cache:band:{band}:{value}` index the entries.
+
+    Attributes:
+        redis_client: The Redis client holding the cache.
+        tolerance (int): The maximum Hamming distance of a match.
+        ttl (int): The expiry of each entry, in seconds.
+        model (str): The embedding model the cached embeddings were generated by.
+    """
+
+    KEY_PREFIX = "image_context_cache"
+
+    def __init__(
+        self,
+        redis_client,
+        tolerance: int = Config.IMAGE_CONTEXT_CACHE_TOLERANCE,
+        ttl: int = Config.IMAGE_CONTEXT_CACHE_TTL,
+        model: str = Config.EMBEDDING_MODEL,
+    ):
+        if not 0 <= tolerance < 64:
+            raise ValueError("tolerance must be between 0 and 63")
+
+        self.redis_client = redis_client
+        self.tolerance = tolerance
+        self.ttl = ttl
+        self.model = model
+        self._bands = self._band_layout(tolerance + 1)
+
+    @staticmethod
+    def _band_layout(number_of_bands: int) -> List[Tuple[int, int]]:
+        """
+        Split 64 bits into `number_of_bands` bands of near-equal width.
+
+        Returns:
+            List[Tuple[int, int]]: The shift and mask of each band.
+        """
+        width, extra = divmod(64, number_of_bands)
+        layout = []
+        shift = 0
+
+        for band in range(number_of_bands):
+            band_width = width + (1 if band < extra else 0)
+            layout.append((shift, (1 << band_width) - 1))
+            shift += band_width
+
+        return layout
+
+    @property
+    def stats_key(self) -> str:
+        """
+        The Redis hash holding the hit and miss counters.
+        """
+        return f"{self.KEY_PREFIX}:stats"
+
+    def entry_key(self, frame_hash: int) -> str:
+        """
+        Return the Redis key of the entry cached for `frame_hash`.
+        """
+        return f"{self.KEY_PREFIX}:entry:{frame_hash:016x}"
+
+    def band_keys(self, frame_hash: int) -> List[str]:
+        """
+        Return the Redis keys of the band sets `frame_hash` belongs to.
+        """
+        return [
+            f"{self.KEY_PREFIX}:band:{band}:{(frame_hash >> shift) & mask:x}"
+            for band, (shift, mask) in enumerate(self._bands)
+        ]
+
+    def get_many(self, frame_hashes: Sequence[int]) -> List[Optional[CachedContext]]:
+        """
+        Look up the cached descriptions of several frames.
+
+        Args:
+            frame_hashes (Sequence[int]): The dHash of each frame.
+
+        Returns:
+            List[Optional[CachedContext]]: For each frame, None on a miss, otherwise
+            the description and its embedding. The embedding is None when it was
+            generated by another embedding model.
+        """
+        frame_hashes = [int(frame_hash) for frame_hash in frame_hashes]
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for frame_hash in frame_hashes:
+                pipe.sunion(self.band_keys(frame_hash))
+            candidate_sets = pipe.execute()
+
+        matches = [
+            self._closest(frame_hash, candidates)
+            for frame_hash, candidates in zip(frame_hashes, candidate_sets)
+        ]
+
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for match in matches:
+                if match is not None:
+                    pipe.hgetall(self.entry_key(match))
+            entries = iter(pipe.execute())
+
+        results: List[Optional[CachedContext]] = []
+        for frame_hash, match in zip(frame_hashes, matches):
+            entry = next(entries) if match is not None else None
+            if not entry:
+                if match is not None:
+                    self._forget(match)
+                results.append(None)
+                continue
+
+            embedding = None
+            if entry.get(b"model", b"").decode("utf-8") == self.model:
+                embedding = np.frombuffer(entry[b"embedding"], np.float32).tolist()
+            results.append((entry[b"description"].decode("utf-8"), embedding))
+
+        hits = sum(1 for result in results if result is not None)
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            if hits:
+                pipe.hincrby(self.stats_key, "hits", hits)
+            if len(results) - hits:
+                pipe.hincrby(self.stats_key, "misses", len(results) - hits)
+            pipe.execute()
+
+        return results
+
+    def set_many(self, entries: Dict[int, Tuple[str, list]]) -> None:
+        """
+        Cache the descriptions and embeddings of several frames.
+
+        Args:
+            entries (Dict[int, Tuple[str, list]]): The description and embedding of
+                each frame, keyed by its dHash.
+        """
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for frame_hash, (description, embedding) in entries.items():
+                frame_hash = int(frame_hash)
+                entry_key = self.entry_key(frame_hash)
+                pipe.hset(
+                    entry_key,
+                    mapping={
+                        "description": description,
+                        "embedding": np.asarray(embedding, np.float32).tobytes(),
+                        "model": self.model,
+                    },
+                )
+                pipe.expire(entry_key, self.ttl)
+                for band_key in self.band_keys(frame_hash):
+                    pipe.sadd(band_key, f"{frame_hash:016x}")
+                    pipe.expire(band_key, self.ttl)
+            pipe.execute()
+
+    def stats(self) -> dict:
+        """
+        Return the hit and miss counters aggregated across all workers.
+
+        Returns:
+            dict: The hits, misses and hit rate.
+        """
+        counters = {
+            key.decode("utf-8"): int(value)
+            for key, value in self.redis_client.hgetall(self.stats_key).items()
+        }
+        hits = counters.get("hits", 0)
+        lookups = hits + counters.get("misses", 0)
+
+        return {
+            "hits": hits,
+            "misses": counters.get("misses", 0),
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def _closest(self, frame_hash: int, candidates: set) -> Optional[int]:
+        """
+        Return the candidate closest to `frame_hash` within the tolerance.
+        """
+        if not candidates:
+            return None
+
+        candidates = [int(candidate, 16) for candidate in candidates]
+        distances = hamming_distances(
+            np.uint64(frame_hash), np.array(candidates, dtype=np.uint64)
+        )
+        closest = int(np.argmin(distances))
+
+        return candidates[closest] if distances[closest] <= self.tolerance else None
+
+    def _forget(self, frame_hash: int) -> None:
+        """
+        Remove an expired entry from its band sets.
+        """
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for band_key in self.band_keys(frame_hash):
+                pipe.srem(band_key, f"{frame_hash:016x}")
+            pipe.execute()
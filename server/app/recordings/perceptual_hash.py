@@ -0,0 +1,197 @@
+"""
+Module providing perceptual hashes of recording frames and scene clustering.
+
+Video compression makes almost every pair of frames differ by a few pixels, so a
+pixel difference above zero is not a useful signal that the slide changed.
+Perceptual hashes are robust to that noise: frames showing the same slide hash
+to values only a few bits apart, while a different slide flips many bits.
+
+Frames are grouped into scenes by comparing their hash with the anchor hash of
+every scene seen so far, so a slide the educator returns to later joins its
+earlier scene. Only one representative frame per scene is described by the
+vision model.
+
+Functions:
+    dhash: Compute the 64-bit difference hash of a thumbnail.
+    phash: Compute the 64-bit DCT perceptual hash of a thumbnail.
+    frame_hashes: Hash a stack of thumbnails.
+    hamming_distances: Count the differing bits between a hash and other hashes.
+    assign_scenes: Assign frames to scenes, continuing from earlier anchors.
+    cluster_scenes: Group frames into visually distinct scenes.
+    select_scene_representatives: Pick one frame per scene.
+"""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from config.config import Config
+
+BIT_WEIGHTS = np.uint64(1) << np.arange(63, -1, -1, dtype=np.uint64)
+
+
+def _pack_bits(bits: np.ndarray) -> np.uint64:
+    """
+    Pack 64 booleans into an unsigned 64-bit integer, most significant bit first.
+    """
+    return np.bitwise_or.reduce(BIT_WEIGHTS[bits.ravel()], initial=np.uint64(0))
+
+
+def dhash(thumbnail: np.ndarray) -> np.uint64:
+    """
+    Compute the 64-bit difference hash of a grayscale thumbnail.
+
+    Each bit tells whether a pixel is brighter than its right neighbour in a 9x8
+    reduction of the image.
+
+    Args:
+        thumbnail (np.ndarray): A (height, width) grayscale image.
+
+    Returns:
+        np.uint64: The difference hash.
+    """
+    reduced = cv2.resize(thumbnail, (9, 8), interpolation=cv2.INTER_AREA)
+    return _pack_bits(reduced[:, 1:] > reduced[:, :-1])
+
+
+def phash(thumbnail: np.ndarray) -> np.uint64:
+    """
+    Compute the 64-bit DCT perceptual hash of a grayscale thumbnail.
+
+    Each bit tells whether one of the 8x8 lowest frequency DCT coefficients of a
+    32x32 reduction of the image is above their median.
+
+    Args:
+        thumbnail (np.ndarray): A (height, width) grayscale image.
+
+    Returns:
+        np.uint64: The perceptual hash.
+    """
+    reduced = cv2.resize(thumbnail, (32, 32), interpolation=cv2.INTER_AREA)
+    coefficients = cv2.dct(reduced.astype(np.float32))[:8, :8]
+    return _pack_bits(coefficients > np.median(coefficients.ravel()[1:]))
+
+
+HASH_FUNCTIONS = {"dhash": dhash, "phash": phash}
+
+
+def frame_hashes(
+    thumbnails: np.ndarray, algorithm: str = Config.FRAME_HASH_ALGORITHM
+) -> np.ndarray:
+    """
+    Hash a stack of grayscale thumbnails.
+
+    Args:
+        thumbnails (np.ndarray): The thumbnails as an (n, height, width) array.
+        algorithm (str): Either "dhash" or "phash".
+
+    Returns:
+        np.ndarray: The n hashes as a uint64 array.
+
+    Raises:
+        ValueError: If the algorithm is not supported.
+    """
+    if algorithm not in HASH_FUNCTIONS:
+        raise ValueError(f"Unsupported frame hash algorithm: {algorithm}")
+
+    hash_function = HASH_FUNCTIONS[algorithm]
+    return np.array([hash_function(thumbnail) for thumbnail in thumbnails], np.uint64)
+
+
+def hamming_distances(frame_hash: np.uint64, hashes: np.ndarray) -> np.ndarray:
+    """
+    Count the bits that differ between a hash and each of several hashes.
+
+    Args:
+        frame_hash (np.uint64): The hash to compare.
+        hashes (np.ndarray): The hashes to compare it with, as a uint64 array.
+
+    Returns:
+        np.ndarray: The number of differing bits for each hash in `hashes`.
+    """
+    differing = np.bitwise_xor(np.asarray(hashes, np.uint64), np.uint64(frame_hash))
+    bits = np.unpackbits(differing.view(np.uint8).reshape(-1, 8), axis=1)
+    return bits.sum(axis=1)
+
+
+def assign_scenes(
+    hashes: np.ndarray,
+    anchors: Optional[np.ndarray] = None,
+    threshold: int = Config.FRAME_HASH_THRESHOLD,
+) -> Tuple[List[int], np.ndarray]:
+    """
+    Assign each frame to a scene, continuing from the anchors of earlier frames.
+
+    A frame joins the closest scene whose anchor (the hash of its first frame) is
+    at most `threshold` bits away, otherwise it starts a new scene. Anchors do not
+    move, so slow drift such as a slide being annotated cannot chain unrelated
+    frames together.
+
+    Args:
+        hashes (np.ndarray): The frame hashes, in recording order.
+        anchors (np.ndarray, optional): The anchors of the scenes seen before
+            these frames, so scenes continue across batches of frames.
+        threshold (int): The maximum Hamming distance within a scene.
+
+    Returns:
+        Tuple[List[int], np.ndarray]: The scene index of each frame, and the
+        anchors of all scenes seen so far.
+    """
+    anchors = (
+        np.empty(0, dtype=np.uint64)
+        if anchors is None
+        else np.asarray(anchors, dtype=np.uint64)
+    )
+    scene_ids: List[int] = []
+
+    for frame_hash in hashes:
+        if len(anchors):
+            distances = hamming_distances(frame_hash, anchors)
+            closest = int(np.argmin(distances))
+            if distances[closest] <= threshold:
+                scene_ids.append(closest)
+                continue
+
+        anchors = np.append(anchors, np.uint64(frame_hash))
+        scene_ids.append(len(anchors) - 1)
+
+    return scene_ids, anchors
+
+
+def cluster_scenes(
+    hashes: np.ndarray, threshold: int = Config.FRAME_HASH_THRESHOLD
+) -> List[List[int]]:
+    """
+    Group frames into scenes of visually identical frames.
+
+    Args:
+        hashes (np.ndarray): The frame hashes, in recording order.
+        threshold (int): The maximum Hamming distance within a scene.
+
+    Returns:
+        List[List[int]]: The frame indexes of each scene, in order of first
+        appearance.
+    """
+    scene_ids, anchors = assign_scenes(hashes, threshold=threshold)
+    scenes: List[List[int]] = [[] for _ in range(len(anchors))]
+
+    for index, scene_id in enumerate(scene_ids):
+        scenes[scene_id].append(index)
+
+    return scenes
+
+
+def select_scene_representatives(scenes: List[List[int]]) -> List[int]:
+    """
+    Pick the frame of each scene sent to the vision model.
+
+    The last frame of a scene is used because slides are often revealed
+    progressively, so it shows the most complete version of the slide.
+
+    Args:
+        scenes (List[List[int]]): The scenes returned by `cluster_scenes`.
+
+    Returns:
+        List[int]: One frame index per scene, in recording order.
+    """
+    return sorted(scene[-1] for scene in scenes)
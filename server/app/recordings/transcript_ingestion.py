@@ -0,0 +1,255 @@
+"""
+Module providing the resumable, streaming ingestion of recording transcripts.
+
+The transcript is read as a stream of lines grouped into blocks, cut into chunks
+on the fly, embedded in concurrent batches and inserted into RecordingEmbedding
+batch by batch, so long transcripts no longer have to be read, chunked and
+embedded in one go within the task's time limit.
+
+After every inserted batch the number of chunks stored so far is checkpointed
+in Redis. The checkpoint is kept per transcript, since a room has one transcript
+per recording. Chunking is deterministic, so a retried task re-reads the
+transcript, skips the chunks already stored and continues with the next one
+instead of embedding everything again. Chunks are stored through the EmbeddingLedger, so a
+batch repeated after a crash between its insert and its checkpoint is neither
+stored nor counted twice.
+
+Classes:
+    TranscriptCheckpoint: Redis checkpoint of the ingestion of a transcript.
+
+Functions:
+    transcript_id: Return the ID identifying a transcript of a room.
+    iter_text_blocks: Group the lines of a text stream into blocks.
+    iter_time_spans: Pair transcript chunks with the time span of their timestamps.
+    ingest_transcript: Chunk, embed and store a transcript, resuming if needed.
+"""
+
+import hashlib
+import io
+import re
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.embeddings import vector_fields
+from app.ingestion import get_chunker, ingest_chunks
+from app.models.recording_embedding import RecordingEmbedding
+from app.recordings.embedding_ledger import EmbeddingLedger, recording_chunk_id
+from config.config import Config
+
+# "[mm:ss]" or "[hh:mm:ss]" markers, or bare "hh:mm:ss" times.
+TIMESTAMP = re.compile(
+    r"\[(?:(\d{1,2}):)?(\d{1,2}):(\d{2})(?:[.,]\d+)?\]"
+    r"|\b(\d{1,2}):(\d{2}):(\d{2})(?:[.,]\d+)?\b"
+)
+
+
+def transcript_id(transcript_url: str, recording_id: Optional[str] = None) -> str:
+    """
+    Return the ID identifying a transcript among the transcripts of its room.
+
+    Args:
+        transcript_url (str): The presigned URL of the transcript.
+        recording_id (str, optional): The ID of the recording or session the
+            transcript belongs to, when the webhook sends one.
+
+    Returns:
+        str: The recording ID, otherwise a hash of the URL without its query
+            string, which changes every time the URL is presigned.
+    """
+    if recording_id:
+        return str(recording_id)
+
+    parts = urlsplit(transcript_url)
+    return hashlib.sha1(f"{parts.netloc}{parts.path}".encode("utf-8")).hexdigest()
+
+
+class TranscriptCheckpoint:
+    """
+    Redis checkpoint of the ingestion of one transcript of a room.
+
+    The checkpoint is a Redis hash under
+    `transcript_checkpoint:{room_id}:{transcript_id}` holding the number of chunks
+    stored and whether the transcript was fully ingested.
+
+    Attributes:
+        redis_client: The Redis client holding the checkpoint.
+        room_id (str): The ID of the room of the transcript.
+        transcript_id (str): The ID of the transcript, see `transcript_id`.
+        ttl (int): The expiry of the checkpoint, in seconds.
+    """
+
+    KEY_PREFIX = "transcript_checkpoint"
+
+    def __init__(
+        self,
+        redis_client,
+        room_id: str,
+        transcript_id: str,
+        ttl: int = Config.TRANSCRIPT_CHECKPOINT_TTL,
+    ):
+        self.redis_client = redis_client
+        self.room_id = room_id
+        self.transcript_id = transcript_id
+        self.ttl = ttl
+
+    @property
+    def key(self) -> str:
+        """
+        The Redis hash holding the checkpoint.
+        """
+        return f"{self.KEY_PREFIX}:{self.room_id}:{self.transcript_id}"
+
+    def load(self) -> tuple:
+        """
+        Load the checkpoint.
+
+        Returns:
+            tuple: The number of chunks stored, and whether ingestion completed.
+        """
+        checkpoint = self.redis_client.hgetall(self.key)
+
+        return (
+            int(checkpoint.get(b"chunks", 0)),
+            checkpoint.get(b"completed") == b"1",
+        )
+
+    def save(self, chunks: int, completed: bool = False) -> None:
+        """
+        Save the number of chunks stored so far.
+
+        Args:
+            chunks (int): The number of chunks stored.
+            completed (bool): Whether the whole transcript was ingested.
+        """
+        with self.redis_client.pipeline() as pipe:
+            pipe.hset(self.key, mapping={"chunks": chunks, "completed": int(completed)})
+            pipe.expire(self.key, self.ttl)
+            pipe.execute()
+
+
+def iter_text_blocks(
+    stream: BinaryIO, block_size: int = Config.TRANSCRIPT_BLOCK_SIZE
+) -> Iterator[str]:
+    """
+    Decode a UTF-8 stream and group its lines into blocks of about `block_size`
+    characters, without splitting lines.
+
+    Args:
+        stream (BinaryIO): The readable binary stream.
+        block_size (int): The minimum number of characters per block.
+
+    Yields:
+        str: The next block of text.
+    """
+    lines = []
+    size = 0
+
+    for line in io.TextIOWrapper(stream, encoding="utf-8"):
+        lines.append(line)
+        size += len(line)
+
+        if size >= block_size:
+            yield "".join(lines)
+            lines, size = [], 0
+
+    if lines:
+        yield "".join(lines)
+
+
+def timestamp_seconds(match: re.Match) -> float:
+    """
+    Convert a TIMESTAMP match into seconds.
+    """
+    hours, minutes, seconds = (
+        match.group(1, 2, 3) if match.group(2) else match.group(4, 5, 6)
+    )
+    return float(int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds))
+
+
+def iter_time_spans(
+    chunks: Iterable[str],
+) -> Iterator[Tuple[str, Tuple[Optional[float], Optional[float]]]]:
+    """
+    Pair each transcript chunk with the time span of its timestamps.
+
+    A chunk spans from its first to its last timestamp. A chunk without any
+    timestamp is placed at the end of the previous chunk, and the span is None
+    when the transcript has no timestamps.
+
+    Args:
+        chunks (Iterable[str]): The transcript chunks, in order.
+
+    Yields:
+        Tuple[str, Tuple[float, float]]: Each chunk and its start and end time in
+        seconds.
+    """
+    previous_end = None
+
+    for chunk in chunks:
+        offsets = [timestamp_seconds(match) for match in TIMESTAMP.finditer(chunk)]
+
+        if offsets:
+            previous_end = offsets[-1]
+            yield chunk, (offsets[0], previous_end)
+        else:
+            yield chunk, (previous_end, previous_end)
+
+
+def ingest_transcript(
+    stream: BinaryIO, room_id: str, checkpoint: TranscriptCheckpoint
+) -> int:
+    """
+    Chunk, embed and store a transcript, continuing from the checkpoint.
+
+    The number of recording embeddings of the room is increased after every
+    stored batch, so chat-with-recording sees the transcript as it is ingested.
+
+    Args:
+        stream (BinaryIO): The transcript as a readable binary stream.
+        room_id (str): The ID of the room of the transcript.
+        checkpoint (TranscriptCheckpoint): The checkpoint of the transcript.
+
+    Returns:
+        int: The number of transcript chunks stored by this call.
+    """
+    stored, completed = checkpoint.load()
+    if completed:
+        return 0
+
+    ledger = EmbeddingLedger(checkpoint.redis_client, room_id)
+    spans = {}
+
+    def remaining_chunks() -> Iterator[str]:
+        chunks = get_chunker(paged=False)(iter_text_blocks(stream))
+        for ordinal, (chunk, span) in enumerate(iter_time_spans(chunks), 1):
+            if ordinal > stored:
+                spans[ordinal] = span
+                yield chunk
+
+    def make_recording_embedding(
+        sequence: int, chunk: str, embedding: list
+    ) -> RecordingEmbedding:
+        start_time, end_time = spans.pop(stored + sequence)
+        return RecordingEmbedding(
+            room_id=room_id,
+            text_content=chunk,
+            modality="transcript",
+            start_time=start_time,
+            end_time=end_time,
+            sequence=stored + sequence,
+            chunk_id=recording_chunk_id(
+                room_id, f"transcript:{checkpoint.transcript_id}", stored + sequence
+            ),
+            **vector_fields(embedding),
+        )
+
+    inserted = ingest_chunks(
+        chunks=remaining_chunks(),
+        make_document=make_recording_embedding,
+        document_class=RecordingEmbedding,
+        on_batch_inserted=lambda inserted: checkpoint.save(stored + inserted),
+        insert_documents=ledger.store,
+    )
+    checkpoint.save(stored + inserted, completed=True)
+
+    return inserted
@@ -0,0 +1,140 @@
+"""
+Module providing the extraction of keyframes from recording video files.
+
+Frames are sampled from the video with OpenCV at `VIDEO_SAMPLE_FPS`: the frames
+in between are only grabbed, which advances the stream without converting them
+to images. Each sampled frame is reduced to a grayscale thumbnail and hashed,
+and scene changes are detected on the stream with the same scene state used by
+frame ingestion sessions. Only the frame of the scene currently on screen is
+kept, so memory stays bounded whatever the length of the video.
+
+Functions:
+    frame_thumbnail: Reduce a decoded frame to a small grayscale thumbnail.
+    iter_video_frames: Sample frames from a video file.
+    iter_video_keyframes: Yield the keyframes of a video file.
+"""
+
+from typing import Iterator, Tuple
+
+import cv2
+import numpy as np
+from app.recordings.frame_session import FrameSessionState, Keyframe
+from app.recordings.perceptual_hash import frame_hashes
+from config.config import Config
+
+
+def frame_thumbnail(
+    frame: np.ndarray,
+    size: Tuple[int, int] = (
+        Config.FRAME_THUMBNAIL_WIDTH,
+        Config.FRAME_THUMBNAIL_HEIGHT,
+    ),
+) -> np.ndarray:
+    """
+    Reduce a decoded BGR frame to a small grayscale thumbnail.
+
+    Args:
+        frame (np.ndarray): The frame as a (height, width, 3) uint8 array.
+        size (Tuple[int, int]): The width and height of the thumbnail.
+
+    Returns:
+        np.ndarray: The thumbnail as a (height, width) uint8 array.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+
+def iter_video_frames(
+    video_path: str, sample_fps: float = Config.VIDEO_SAMPLE_FPS
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Sample frames from a video file at `sample_fps` frames per second.
+
+    Args:
+        video_path (str): The path of the video file.
+        sample_fps (float): The number of frames sampled per second of video.
+
+    Yields:
+        Tuple[float, np.ndarray]: The timestamp in seconds and the BGR frame.
+
+    Raises:
+        ValueError: If the video cannot be opened.
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Unable to open video: {video_path}")
+
+    try:
+        video_fps = capture.get(cv2.CAP_PROP_FPS) or sample_fps
+        step = max(1, round(video_fps / sample_fps))
+        index = 0
+
+        while capture.grab():
+            if index % step == 0:
+                retrieved, frame = capture.retrieve()
+                if retrieved:
+                    yield index / video_fps, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def iter_video_keyframes(
+    video_path: str,
+    sample_fps: float = Config.VIDEO_SAMPLE_FPS,
+    threshold: int = Config.FRAME_HASH_THRESHOLD,
+    jpeg_quality: int = Config.VIDEO_FRAME_JPEG_QUALITY,
+) -> Iterator[Tuple[float, float, bytes, np.ndarray]]:
+    """
+    Yield the keyframes of a video file, one per scene, as they are found.
+
+    A scene is yielded from its last sampled frame once the video moves on to
+    another scene, unless the scene was shown before.
+
+    Args:
+        video_path (str): The path of the video file.
+        sample_fps (float): The number of frames sampled per second of video.
+        threshold (int): The maximum Hamming distance within a scene.
+        jpeg_quality (int): The JPEG quality of the encoded keyframes.
+
+    Yields:
+        Tuple[float, float, bytes, np.ndarray]: The time in seconds the scene
+        appeared and of the keyframe, the JPEG encoded keyframe and its
+        grayscale thumbnail.
+    """
+    algorithm = (
+        "dhash" if Config.FRAME_HASH_ALGORITHM == "off" else Config.FRAME_HASH_ALGORITHM
+    )
+    state = FrameSessionState()
+    frames = {}
+
+    def encode(keyframe: Keyframe) -> Tuple[float, float, bytes, np.ndarray]:
+        frame, thumbnail = frames.pop(keyframe.key)
+        encoded, image = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        )
+        if not encoded:
+            raise ValueError("Unable to encode video frame")
+        return keyframe.start_time, keyframe.end_time, image.tobytes(), thumbnail
+
+    for index, (timestamp, frame) in enumerate(
+        iter_video_frames(video_path, sample_fps)
+    ):
+        frame_key = str(index)
+        thumbnail = frame_thumbnail(frame)
+        frames[frame_key] = (frame, thumbnail)
+
+        keyframes, discarded_keys = state.advance(
+            [frame_key],
+            frame_hashes(thumbnail[np.newaxis], algorithm),
+            threshold,
+            timestamps=[timestamp],
+        )
+        for discarded_key in discarded_keys:
+            del frames[discarded_key]
+        for keyframe in keyframes:
+            yield encode(keyframe)
+
+    keyframes, _ = state.flush()
+    for keyframe in keyframes:
+        yield encode(keyframe)
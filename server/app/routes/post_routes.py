@@ -2,23 +2,44 @@
 Post routes for the Flask application.
 """
 
+import io
 import os
 import uuid
 import mimetypes
-import math
 from datetime import datetime
 import base64
 from flask import Blueprint, request, current_app, jsonify
 from werkzeug.utils import secure_filename
 from app.auth.firebase_auth import firebase_token_required
+from app.chat import (
+    AttachmentNotProcessedError,
+    MaterialChat,
+    answer_cache_stats,
+    conversation_user,
+    delete_conversations,
+    generate_answer,
+)
 from app.core import limiter
+from app.embeddings import EmbeddingCache
 from marshmallow import Schema, fields, ValidationError
 from app.enums import StatusCode
 from app.models.hub import Post, Hub
 from app.models.embedding import Embedding
 from bson import ObjectId
 from app.celery.tasks.post_tasks import process_uploaded_file
-import google.generativeai as genai
+from app.ingestion import (
+    acquire_attachment_content,
+    claim_content_ingestion,
+    mark_content_status,
+    content_id_key,
+    hash_file_stream,
+    release_attachment_content,
+    replace_sole_attachment_content,
+)
+from app.models.attachment_content import AttachmentContent
+from app.storage import get_object_store
+from app.vector_search import drop_partition
+from config.config import Config
 
 
 post_blueprint = Blueprint("post", __name__)
@@ -72,32 +93,6 @@ def decode_base64_to_objectid(base64_encoded: str) -> ObjectId:
     return object_id
 
 
-def extract_text_embedding(chunk: str) -> list:
-    """
-    Generate text embeddings for a text chunk using a pre-trained model.
-
-    Args:
-        chunk (str): The text chunk for which embeddings are to be generated.
-
-    Returns:
-        list: A list of embedding vectors representing the text chunk.
-
-    Raises:
-        Exception: If an error occurs during the embedding generation process.
-
-    """
-    try:
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=chunk,
-            task_type="semantic_similarity",
-        )
-        return result["embedding"]
-    except Exception as error:
-        print(f"Error: {error}")
-        raise
-
-
 class CreatePostSchema(Schema):
     """
     Schema for validating and serializing data when creating a post.
@@ -173,7 +168,12 @@ def create_post(hub_id):
         - The request body is expected to contain form data representing the attributes
           of the post, including its type, title, description, topic, and attached files.
         - The attached files should be included as a list of files, and each file will be
-          uploaded to an Amazon S3 bucket for storage.
+          streamed to the object store (an Amazon S3 bucket in production).
+        - With `CLAIM_CHECK_UPLOADS` enabled, only the object key of each file is sent
+          to the `process_uploaded_file` task instead of the file bytes.
+        - Files are deduplicated by the hash of their bytes: a file that was already
+          uploaded, in any hub, reuses the stored object and embeddings of the first
+          upload and is not processed again.
         - Upon successful creation of the post, the post object is added to the specified
           hub's list of posts and saved to the database.
 
@@ -200,38 +200,65 @@ def create_post(hub_id):
 
         redis_client = current_app.redis_client
 
+        object_store = get_object_store(s3_client=s3_client)
+
         for file in files:
             if file and allowed_file(file.filename):
-                file_data = file.read()
                 filename = secure_filename(file.filename)
                 extension = os.path.splitext(filename)[1]
                 attachment_uuid = str(uuid.uuid4())
                 unique_filename = attachment_uuid + extension
+                content_type = mimetypes.guess_type(filename)[0]
 
                 file_key = f"posts/{hub_id}/{unique_filename}"
-                s3_client.put_object(
-                    Body=file_data,
-                    Bucket="eduhub-ai",
-                    Key=file_key,
-                    ContentType=mimetypes.guess_type(filename)[0],
-                )
                 file_url = f"https://d2zvmtskygrsot.cloudfront.net/{file_key}"
-                uploaded_file_urls.append(file_url)
-                task = process_uploaded_file.apply_async(
-                    args=[
-                        file_data,
-                        filename,
-                        hub_id,
-                        post_uuid,
-                        attachment_uuid,
-                    ],
-                    retry_policy={
-                        "max_retries": 3,
-                        "interval_start": 2,
-                        "interval_step": 2,
-                        "interval_max": 10,
-                    },
+
+                content, created = acquire_attachment_content(
+                    hash_file_stream(file.stream), attachment_uuid, file_key, file_url
                 )
+                redis_client.set(content_id_key(attachment_uuid), content.content_id)
+                uploaded_file_urls.append(content.file_url)
+
+                # A failed or abandoned ingestion of the same bytes is retried
+                # incrementally, keeping the batches it already stored.
+                retry = not created and claim_content_ingestion(content)
+                if not (created or retry):
+                    continue
+
+                try:
+                    if Config.CLAIM_CHECK_UPLOADS:
+                        file_data = None
+                        object_store.put(content.file_key, file.stream, content_type)
+                    else:
+                        file_data = file.read()
+                        object_store.put(
+                            content.file_key, io.BytesIO(file_data), content_type
+                        )
+
+                    task = process_uploaded_file.apply_async(
+                        args=[
+                            file_data,
+                            filename,
+                            hub_id,
+                            post_uuid,
+                            content.content_id,
+                            content.file_key,
+                            retry,
+                        ],
+                        retry_policy={
+                            "max_retries": 3,
+                            "interval_start": 2,
+                            "interval_step": 2,
+                            "interval_max": 10,
+                        },
+                    )
+                except Exception:
+                    mark_content_status(content.content_id, "failed")
+                    release_attachment_content(
+                        attachment_uuid, redis_client, object_store
+                    )
+                    raise
+
                 task_ids.append(task.id)
 
         post = Post(
@@ -288,6 +315,269 @@ def create_post(hub_id):
         )
 
 
+@post_blueprint.route(
+    "/api/<hub_id>/replace-attachment/<post_id>/<attachment_id>", methods=["POST"]
+)
+@limiter.limit("5 per minute")
+@firebase_token_required
+def replace_attachment(hub_id, post_id, attachment_id):
+    """
+    Replace an attachment of a post with an edited version.
+
+    The new file is stored under a new object key. If no other attachment shares
+    the content of the attachment, the new file is re-ingested incrementally: only
+    chunks that are new or changed compared to the previous version are embedded,
+    and the embeddings of removed chunks are deleted. Otherwise the attachment
+    drops its reference on the shared content and the new file is deduplicated
+    like a new upload.
+
+    Args:
+        hub_id (str): The unique identifier of the hub where the post belongs.
+        post_id (str): The UUID of the post.
+        attachment_id (str): The UUID of the attachment to replace.
+
+    Returns:
+        tuple: A tuple containing a JSON response and an HTTP status code.
+            - If successful, returns the new attachment URL with status code 200.
+            - If the file is missing or not allowed, returns status code 400.
+            - If the post or attachment is not found, returns status code 404.
+            - If an error occurs, returns status code 500.
+    """
+    try:
+        file = request.files.get("file")
+
+        if not file or not allowed_file(file.filename):
+            return (
+                jsonify({"error": "A supported file is required", "success": False}),
+                StatusCode.BAD_REQUEST.value,
+            )
+
+        hub_object_id = decode_base64_to_objectid(str(hub_id))
+        hub = Hub.objects(id=hub_object_id, posts__uuid=post_id).only("posts.$").first()
+        attachments_url = hub.posts[0].attachments_url if hub else []
+        previous = AttachmentContent.objects(attachment_ids=attachment_id).first()
+        attachment_index = next(
+            (
+                index
+                for index, url in enumerate(attachments_url)
+                if (
+                    url == previous.file_url
+                    if previous
+                    else f"/{attachment_id}." in url
+                )
+            ),
+            None,
+        )
+
+        if attachment_index is None:
+            return (
+                jsonify({"error": "Attachment not found", "success": False}),
+                StatusCode.NOT_FOUND.value,
+            )
+
+        file_hash = hash_file_stream(file.stream)
+
+        if previous is not None and previous.file_hash == file_hash:
+            return (
+                jsonify(
+                    {"message": previous.file_url, "task_id": None, "success": True}
+                ),
+                StatusCode.SUCCESS.value,
+            )
+
+        filename = secure_filename(file.filename)
+        extension = os.path.splitext(filename)[1]
+        content_type = mimetypes.guess_type(filename)[0]
+        file_key = f"posts/{hub_id}/{uuid.uuid4()}{extension}"
+        file_url = f"https://d2zvmtskygrsot.cloudfront.net/{file_key}"
+
+        redis_client = current_app.redis_client
+        object_store = get_object_store(s3_client=current_app.config["S3_CLIENT"])
+
+        replaced = None
+        if not AttachmentContent.objects(file_hash=file_hash).first():
+            replaced = replace_sole_attachment_content(
+                attachment_id, file_hash, file_key, file_url
+            )
+
+        if replaced is not None:
+            content_id, created, incremental = replaced.content_id, True, True
+            try:
+                object_store.put(file_key, file.stream, content_type)
+            except Exception:
+                mark_content_status(content_id, "failed")
+                raise
+            object_store.delete(replaced.file_key)
+        else:
+            if previous is not None:
+                release_attachment_content(attachment_id, redis_client, object_store)
+
+            # Attachments uploaded before deduplication keep their embeddings under
+            # their own id, so they can still be re-ingested incrementally.
+            content, created = acquire_attachment_content(
+                file_hash,
+                attachment_id,
+                file_key,
+                file_url,
+                content_id=attachment_id if previous is None else str(uuid.uuid4()),
+            )
+            content_id, file_url = content.content_id, content.file_url
+            file_key = content.file_key
+
+            # A failed or abandoned ingestion of the same bytes is retried
+            # incrementally, keeping the batches it already stored.
+            retry = not created and claim_content_ingestion(content)
+            incremental = previous is None or retry
+
+            if created or retry:
+                try:
+                    object_store.put(file_key, file.stream, content_type)
+                except Exception:
+                    mark_content_status(content_id, "failed")
+                    raise
+                created = True
+
+            if content_id != attachment_id and previous is None:
+                Embedding.objects(attachment_id=attachment_id).delete()
+                drop_partition(Embedding, attachment_id)
+                redis_client.delete(
+                    f"attachment_id_{attachment_id}_number_of_embeddings"
+                )
+
+            if previous is None:
+                object_store.delete(
+                    attachments_url[attachment_index].split(".net/", 1)[-1]
+                )
+
+        attachments_url[attachment_index] = file_url
+        Hub.objects(id=hub_object_id, posts__uuid=post_id).update_one(
+            set__posts__S__attachments_url=attachments_url
+        )
+
+        redis_client.set(content_id_key(attachment_id), content_id)
+        redis_client.delete(
+            f"hub_{hub_object_id}_paginated_page_1", f"hub_{hub_object_id}_introductory"
+        )
+
+        task_id = None
+        if created:
+            try:
+                task = process_uploaded_file.apply_async(
+                    args=[
+                        None,
+                        filename,
+                        hub_id,
+                        post_id,
+                        content_id,
+                        file_key,
+                        incremental,
+                    ],
+                    retry_policy={
+                        "max_retries": 3,
+                        "interval_start": 2,
+                        "interval_step": 2,
+                        "interval_max": 10,
+                    },
+                )
+            except Exception:
+                mark_content_status(content_id, "failed")
+                raise
+            task_id = task.id
+            redis_client.publish(f"{task_id}", "PENDING")
+
+        return (
+            jsonify({"message": file_url, "task_id": task_id, "success": True}),
+            StatusCode.SUCCESS.value,
+        )
+
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
+
+
+@post_blueprint.route(
+    "/api/<hub_id>/delete-attachment/<post_id>/<attachment_id>", methods=["DELETE"]
+)
+@limiter.limit("5 per minute")
+@firebase_token_required
+def delete_attachment(hub_id, post_id, attachment_id):
+    """
+    Remove an attachment from a post.
+
+    The attachment drops its reference on its content. The stored file and the
+    embeddings are only deleted once no attachment in any hub uses them anymore.
+
+    Args:
+        hub_id (str): The unique identifier of the hub where the post belongs.
+        post_id (str): The UUID of the post.
+        attachment_id (str): The UUID of the attachment to remove.
+
+    Returns:
+        tuple: A tuple containing a JSON response and an HTTP status code.
+            - If successful, returns whether the shared content was deleted with
+              status code 200.
+            - If the post or attachment is not found, returns status code 404.
+            - If an error occurs, returns status code 500.
+    """
+    try:
+        hub_object_id = decode_base64_to_objectid(str(hub_id))
+        hub = Hub.objects(id=hub_object_id, posts__uuid=post_id).only("posts.$").first()
+        attachments_url = hub.posts[0].attachments_url if hub else []
+        content = AttachmentContent.objects(attachment_ids=attachment_id).first()
+        attachment_index = next(
+            (
+                index
+                for index, url in enumerate(attachments_url)
+                if (url == content.file_url if content else f"/{attachment_id}." in url)
+            ),
+            None,
+        )
+
+        if attachment_index is None:
+            return (
+                jsonify({"error": "Attachment not found", "success": False}),
+                StatusCode.NOT_FOUND.value,
+            )
+
+        removed_url = attachments_url.pop(attachment_index)
+        Hub.objects(id=hub_object_id, posts__uuid=post_id).update_one(
+            set__posts__S__attachments_url=attachments_url
+        )
+
+        redis_client = current_app.redis_client
+        object_store = get_object_store(s3_client=current_app.config["S3_CLIENT"])
+
+        if content is not None:
+            content_deleted = release_attachment_content(
+                attachment_id, redis_client, object_store
+            )
+        else:
+            Embedding.objects(attachment_id=attachment_id).delete()
+            drop_partition(Embedding, attachment_id)
+            object_store.delete(removed_url.split(".net/", 1)[-1])
+            redis_client.delete(f"attachment_id_{attachment_id}_number_of_embeddings")
+            content_deleted = True
+
+        delete_conversations(redis_client, f"attachment_id_{attachment_id}")
+        redis_client.delete(
+            f"hub_{hub_object_id}_paginated_page_1",
+            f"hub_{hub_object_id}_introductory",
+        )
+
+        return (
+            jsonify({"message": {"content_deleted": content_deleted}, "success": True}),
+            StatusCode.SUCCESS.value,
+        )
+
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
+
+
 @post_blueprint.route("/api/<hub_id>/get-post/<post_id>", methods=["GET"])
 @limiter.limit("5 per minute")
 # @firebase_token_required
@@ -334,8 +624,10 @@ def chat_with_material(attachment_id):
     Handle chat with material based on provided attachment_id.
 
     This endpoint receives a POST request containing a JSON payload with a 'query' field,
-    representing the user's question. It then performs a vector search on the database
-    using the provided query, constrained by the attachment_id. After retrieving the
+    representing the user's question. It then performs a vector search on the database,
+    through the backend selected by VECTOR_SEARCH_BACKEND, using the provided query,
+    constrained by the content id the attachment_id resolves to, since attachments with
+    identical files share their embeddings. After retrieving the
     context related to the query, it prompts the generative model to provide an informative
     response to the question based on the retrieved context.
 
@@ -346,6 +638,8 @@ def chat_with_material(attachment_id):
         tuple: A tuple containing JSON response and HTTP status code.
             - If the operation is successful, returns a JSON response with the generated answer
               and success status along with HTTP status code 200 (OK).
+            - If the attachment has not been processed yet, returns a JSON response with
+              error message and failure status along with HTTP status code 409 (Conflict).
             - If an error occurs, returns a JSON response with error message and failure status
               along with HTTP status code 500 (Internal Server Error).
     """
@@ -353,94 +647,90 @@ def chat_with_material(attachment_id):
         schema = ChatWithMaterialSchema()
         data = schema.load(request.get_json())
 
-        query = data.get("query")
-
-        query_embeddings = extract_text_embedding(query)
-
-        redis_client = current_app.redis_client
-        attachment_number_of_embeddings_key = (
-            f"attachment_id_{attachment_id}_number_of_embeddings"
-        )
-        attachment_previous_conversation_key = (
-            f"attachment_id_{attachment_id}_previous_conversation"
-        )
-        attachment_cached_data = redis_client.mget(
-            attachment_number_of_embeddings_key, attachment_previous_conversation_key
+        chat = MaterialChat(
+            current_app.redis_client,
+            attachment_id,
+            data["query"],
+            conversation_user(),
         )
 
-        number_of_embeddings = attachment_cached_data[0]
-        number_of_embeddings = int(number_of_embeddings.decode("utf-8"))
-        limit_results = math.ceil(math.sqrt(number_of_embeddings))
+        answer = chat.cached_answer()
+        if answer is None:
+            answer = generate_answer(chat.build_prompt())
 
-        previous_conversation = attachment_cached_data[1]
+        chat.remember(answer)
 
-        results = Embedding.objects.aggregate(
-            [
-                {
-                    "$vectorSearch": {
-                        "index": "embeddedVectorIndex",
-                        "path": "embeddings",
-                        "queryVector": query_embeddings,
-                        "filter": {"attachment_id": str(attachment_id)},
-                        "numCandidates": number_of_embeddings,
-                        "limit": limit_results,
-                    }
-                },
+        return (
+            jsonify(
                 {
-                    "$project": {
-                        "_id": 0,
-                        "text_content": 1,
-                    }
-                },
-            ]
+                    "success": True,
+                    "message": answer,
+                }
+            ),
+            StatusCode.SUCCESS.value,
         )
 
-        retrieved_context = ""
-
-        for result in list(results):
-            retrieved_context += result["text_content"]
-
-        if previous_conversation is not None:
-            previous_conversation = previous_conversation.decode("utf-8")
-        else:
-            previous_conversation = "No previous conversation found!"
-
-        if len(previous_conversation) > 10000:
-            previous_conversation = previous_conversation[-10000:]
-
-        prompt = f"""
-        Instruction: Please provide an informative response to the following question with the help of your knowledge, the Retrieved Context and the Previous Conversation in Markdown format.
-
-        Question: {query}
-
-        Retrieved Context: {retrieved_context}
+    except AttachmentNotProcessedError as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.CONFLICT.value,
+        )
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
 
-        Previous Conversation: {previous_conversation}
 
-        Note: If the model is unable to generate an answer based on the retrieved context or previous conversation, please follow these instructions:
+@post_blueprint.route("/api/embedding-cache-stats", methods=["GET"])
+@limiter.limit("5 per minute")
+@firebase_token_required
+def get_embedding_cache_stats():
+    """
+    Retrieve the hit and miss counters of the embedding cache.
 
-        1. Notify the user that the generated answer is based on the model's own knowledge.
-        2. Provide an answer using the model's own knowledge.
-        3. If possible, prompt something related to the topic to continue the conversation.
-        """
+    Returns:
+        tuple: A tuple containing JSON response and HTTP status code.
+            - If the operation is successful, returns the cache hits, local hits,
+              misses, hit rate and number of entries along with HTTP status code 200.
+            - If an error occurs, returns a JSON response with error message and
+              failure status along with HTTP status code 500 (Internal Server Error).
+    """
+    try:
+        embedding_cache = EmbeddingCache(current_app.redis_client)
 
-        if len(prompt) > 25000:
-            prompt = prompt[:25000]
+        return (
+            jsonify({"message": embedding_cache.stats(), "success": True}),
+            StatusCode.SUCCESS.value,
+        )
 
-        model = genai.GenerativeModel("gemini-pro")
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
 
-        answer = model.generate_content(prompt)
 
-        previous_conversation += f"user: {query}\nmodel: {answer.text}\n"
-        redis_client.set(
-            attachment_previous_conversation_key, previous_conversation, ex=3600
-        )
+@post_blueprint.route("/api/answer-cache-stats", methods=["GET"])
+@limiter.limit("5 per minute")
+@firebase_token_required
+def get_answer_cache_stats():
+    """
+    Retrieve the hit rate and generation time saved by the semantic answer cache.
 
+    Returns:
+        tuple: A tuple containing JSON response and HTTP status code.
+            - If the operation is successful, returns the cache hits, misses, hit
+              rate and seconds saved along with HTTP status code 200.
+            - If an error occurs, returns a JSON response with error message and
+              failure status along with HTTP status code 500 (Internal Server Error).
+    """
+    try:
         return (
             jsonify(
                 {
+                    "message": answer_cache_stats(current_app.redis_client),
                     "success": True,
-                    "message": answer.text,
                 }
             ),
             StatusCode.SUCCESS.value,
@@ -5,19 +5,37 @@ Recording routes for the Flask application.
 import base64
 from datetime import datetime, timedelta
 import math
+import os
+import time
 import uuid
+from typing import List, Optional
 from bson import ObjectId
 from flask import Blueprint, current_app, request, jsonify
+from werkzeug.utils import secure_filename
 from app.auth.firebase_auth import firebase_token_required
+from app.chat import (
+    NO_CONVERSATION,
+    ConversationMemory,
+    SemanticAnswerCache,
+    build_chat_prompt,
+    conversation_user,
+)
 from app.enums import StatusCode
 from app.core import limiter
+from app.embeddings import extract_text_embedding
 from app.celery.tasks.recording_tasks import (
+    process_frame_batch,
     process_image_files,
+    process_recording_video,
     process_recording_webhook,
 )
 from app.models.hub import Hub, Recording
-from app.models.recording_embedding import RecordingEmbedding
-from marshmallow import Schema, fields
+from app.models.recording_embedding import MODALITIES, RecordingEmbedding
+from app.recordings import FrameSession
+from app.storage import get_object_store
+from app.vector_search import select_vector_search_backend
+from config.config import Config
+from marshmallow import Schema, fields, validate
 import google.generativeai as genai
 
 recording_blueprint = Blueprint("recording", __name__)
@@ -60,15 +78,37 @@ class ProcessImageFilesSchema(Schema):
     image_files = fields.List(fields.Field())
 
 
+class ProcessRecordingVideoSchema(Schema):
+    """
+    Schema for validating data when processing a recording video.
+
+    Attributes:
+        room_id (str): The unique identifier of the room. Required field.
+        video_key (str, optional): The object store key of an already stored video.
+    """
+
+    room_id = fields.String(required=True)
+    video_key = fields.String()
+
+
 class ChatWithRecordingSchema(Schema):
     """
     Represents a schema for handling chat data with recording.
 
     Attributes:
         query (str): The query string associated with the chat.
+        modality (str, optional): Search only "transcript" chunks or "frame"
+            descriptions.
+        start_time (float, optional): Search only segments ending after this offset
+            from the start of the recording, in seconds.
+        end_time (float, optional): Search only segments starting before this offset
+            from the start of the recording, in seconds.
     """
 
     query = fields.String(required=True)
+    modality = fields.String(validate=validate.OneOf(MODALITIES))
+    start_time = fields.Float(validate=validate.Range(min=0))
+    end_time = fields.Float(validate=validate.Range(min=0))
 
 
 def decode_base64_to_objectid(base64_encoded: str) -> ObjectId:
@@ -87,30 +127,75 @@ def decode_base64_to_objectid(base64_encoded: str) -> ObjectId:
     return object_id
 
 
-def extract_text_embedding(chunk: str) -> list:
+def parse_frame_timestamps(number_of_frames: int) -> Optional[List[float]]:
     """
-    Generate text embeddings for a text chunk using a pre-trained model.
+    Parse the optional `timestamps` form field of a frame upload.
 
     Args:
-        chunk (str): The text chunk for which embeddings are to be generated.
+        number_of_frames (int): The number of uploaded frames.
 
     Returns:
-        list: A list of embedding vectors representing the text chunk.
+        List[float]: The offset of each frame from the start of the recording, in
+        seconds, or None when no timestamps were sent.
 
     Raises:
-        Exception: If an error occurs during the embedding generation process.
+        ValueError: If the timestamps are not numbers or do not match the frames.
+    """
+    timestamps = request.form.getlist("timestamps")
+    if not timestamps:
+        return None
+
+    if len(timestamps) != number_of_frames:
+        raise ValueError("Expected one timestamp per frame")
+
+    return [float(timestamp) for timestamp in timestamps]
 
+
+def recording_search_filter(
+    room_id: str,
+    modality: Optional[str] = None,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+) -> dict:
     """
-    try:
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=chunk,
-            task_type="semantic_similarity",
-        )
-        return result["embedding"]
-    except Exception as error:
-        print(f"Error: {error}")
-        raise
+    Build the vector search filter scoping a chat query to part of a recording.
+
+    Segments overlapping the time window are kept, so a slide shown from 10:00 to
+    14:00 matches a question about 12:00 to 13:00. Segments without a time only
+    match queries without a time window.
+
+    Args:
+        room_id (str): The unique identifier of the room.
+        modality (str, optional): "transcript" or "frame".
+        start_time (float, optional): The start of the time window, in seconds.
+        end_time (float, optional): The end of the time window, in seconds.
+
+    Returns:
+        dict: The MongoDB filter, applied as a $vectorSearch pre-filter on Atlas.
+    """
+    search_filter = {"room_id": str(room_id)}
+
+    if modality is not None:
+        search_filter["modality"] = modality
+    if start_time is not None:
+        search_filter["end_time"] = {"$gte": start_time}
+    if end_time is not None:
+        search_filter["start_time"] = {"$lte": end_time}
+
+    return search_filter
+
+
+def format_offset(seconds: float) -> str:
+    """
+    Format an offset in seconds as "mm:ss", or "hh:mm:ss" past an hour.
+    """
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return (
+        f"{hours}:{minutes:02d}:{seconds:02d}"
+        if hours
+        else f"{minutes:02d}:{seconds:02d}"
+    )
 
 
 def convert_to_yyyymmdd(date_string: str) -> str:
@@ -289,7 +374,8 @@ def recording_webhook_listener():
 
     If the request contains valid JSON data, it checks if the event type is "transcription.success".
     If so, it extracts relevant data from the "data" field for
-    further processing, such as recording ID, room name, and duration.
+    further processing, such as recording ID, room name, and duration. The recording
+    (or session) ID identifies the transcript, since a room has one per recording.
 
     Returns:
         A JSON response indicating the success or failure of the webhook processing.
@@ -310,12 +396,15 @@ def recording_webhook_listener():
                 transcription_data = webhook_data.get("data")
 
                 room_id = transcription_data.get("room_id")
+                recording_id = transcription_data.get(
+                    "recording_id"
+                ) or transcription_data.get("session_id")
                 transcript_txt_presigned_url = transcription_data.get(
                     "transcript_txt_presigned_url"
                 )
 
                 process_recording_webhook.apply_async(
-                    args=[transcript_txt_presigned_url, room_id],
+                    args=[transcript_txt_presigned_url, room_id, recording_id],
                     retry_policy={
                         "max_retries": 3,
                         "interval_start": 2,
@@ -356,12 +445,15 @@ def process_image_files_endpoint():
     Request Parameters:
         - room_id (str): The unique identifier of the room associated with the images.
         - image_files (FileStorage): The image files to be processed.
+        - timestamps (float, optional): The offset of each frame from the start of the
+          recording, in seconds, one per image file.
 
     Returns:
         A JSON response indicating the success or failure of the request.
 
     Raises:
-        - BadRequest (400): If no image files are found in the request.
+        - BadRequest (400): If no image files are found in the request, or the
+          timestamps do not match the image files.
         - InternalServerError (500): If an unexpected error occurs during processing.
 
     Note:
@@ -372,6 +464,8 @@ def process_image_files_endpoint():
           for scalable and efficient processing of image files in the background.
         - Retry policy is configured for the Celery task to handle transient failures with
           exponential backoff.
+        - With `CLAIM_CHECK_UPLOADS` enabled, the frames are streamed to the object store
+          and only their keys are sent to the task instead of the image bytes.
     """
     try:
         schema = ProcessImageFilesSchema()
@@ -386,11 +480,31 @@ def process_image_files_endpoint():
             )
 
         image_files = request.files.getlist("image_files")
-        print(image_files)
-        image_files_bytes = [image_file.read() for image_file in image_files]
+
+        try:
+            timestamps = parse_frame_timestamps(len(image_files))
+        except ValueError as error:
+            return (
+                jsonify({"error": str(error), "success": False}),
+                StatusCode.BAD_REQUEST.value,
+            )
+
+        if Config.CLAIM_CHECK_UPLOADS:
+            object_store = get_object_store(s3_client=current_app.config["S3_CLIENT"])
+            image_files_bytes = None
+            image_keys = []
+
+            for image_file in image_files:
+                extension = os.path.splitext(secure_filename(image_file.filename))[1]
+                image_key = f"recordings/{room_id}/frames/{uuid.uuid4()}{extension}"
+                object_store.put(image_key, image_file.stream, image_file.mimetype)
+                image_keys.append(image_key)
+        else:
+            image_files_bytes = [image_file.read() for image_file in image_files]
+            image_keys = None
 
         process_image_files.apply_async(
-            args=[image_files_bytes, room_id],
+            args=[image_files_bytes, room_id, image_keys, timestamps],
             retry_policy={
                 "max_retries": 3,
                 "interval_start": 2,
@@ -413,6 +527,293 @@ def process_image_files_endpoint():
         )
 
 
+@recording_blueprint.route("/api/process-recording-video", methods=["POST"])
+@limiter.limit("5 per minute")
+# @firebase_token_required
+def process_recording_video_endpoint():
+    """
+    Extract the keyframes of a recording video to generate recording embeddings.
+
+    The video is either uploaded with the request, in which case it is streamed to the
+    object store, or referenced by the object store key of an already stored video.
+    The 'process_recording_video' Celery task then samples its frames, detects scene
+    changes and stores the keyframes as recording embeddings.
+
+    Request Parameters:
+        - room_id (str): The unique identifier of the room associated with the video.
+        - video_file (FileStorage, optional): The video file to be processed.
+        - video_key (str, optional): The object store key of the video file, used
+          when no video file is uploaded.
+
+    Returns:
+        tuple: A tuple containing the JSON response and HTTP status code.
+    """
+    try:
+        schema = ProcessRecordingVideoSchema()
+        data = schema.load(request.form)
+
+        room_id = data.get("room_id")
+        video_key = data.get("video_key")
+
+        if "video_file" in request.files:
+            video_file = request.files["video_file"]
+            extension = os.path.splitext(secure_filename(video_file.filename))[1]
+            video_key = f"recordings/{room_id}/videos/{uuid.uuid4()}{extension}"
+            object_store = get_object_store(s3_client=current_app.config["S3_CLIENT"])
+            object_store.put(video_key, video_file.stream, video_file.mimetype)
+
+        if not video_key:
+            return (
+                jsonify({"error": "No video found in request", "success": False}),
+                StatusCode.BAD_REQUEST.value,
+            )
+
+        process_recording_video.apply_async(
+            args=[room_id, video_key],
+            retry_policy={
+                "max_retries": 3,
+                "interval_start": 2,
+                "interval_step": 2,
+                "interval_max": 10,
+            },
+        )
+
+        return (
+            jsonify({"message": "Successfully queued the video", "success": True}),
+            StatusCode.SUCCESS.value,
+        )
+
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
+
+
+@recording_blueprint.route("/api/recording-sessions/<room_id>/start", methods=["POST"])
+@limiter.limit("5 per minute")
+# @firebase_token_required
+def start_frame_session(room_id):
+    """
+    Open a frame ingestion session for a live recording.
+
+    Frames are then appended in small batches with `append_session_frames` while the
+    class is live, and the session is closed with `end_frame_session`. Starting a
+    session that is already open returns the open session, so clients can reconnect.
+
+    Args:
+        room_id (str): The unique identifier of the room being recorded.
+
+    Returns:
+        tuple: A tuple containing the JSON response and HTTP status code.
+    """
+    try:
+        session = FrameSession(current_app.redis_client, room_id).start()
+
+        return (
+            jsonify({"message": session, "success": True}),
+            StatusCode.SUCCESS.value,
+        )
+
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
+
+
+@recording_blueprint.route("/api/recording-sessions/<room_id>/frames", methods=["POST"])
+@limiter.limit("60 per minute")
+# @firebase_token_required
+def append_session_frames(room_id):
+    """
+    Append a batch of frames to the open frame ingestion session of a room.
+
+    The frames are uploaded to the object store and processed by the
+    'process_frame_batch' Celery task, which continues the scene detection of the
+    previous batches, so only the frames of new slides are described.
+
+    Request Parameters:
+        - image_files (FileStorage): The frames of the batch, in recording order.
+        - timestamps (float, optional): The offset of each frame from the start of the
+          class, in seconds. Defaults to the time elapsed since the session started.
+
+    Args:
+        room_id (str): The unique identifier of the room being recorded.
+
+    Returns:
+        tuple: A tuple containing the JSON response and HTTP status code.
+
+    Note:
+        - At most `FRAME_SESSION_MAX_BATCH_SIZE` frames are accepted per request.
+        - A 409 Conflict is returned when the room has no open session.
+    """
+    try:
+        image_files = request.files.getlist("image_files")
+
+        if not image_files:
+            return (
+                jsonify({"error": "No files found in request", "success": False}),
+                StatusCode.BAD_REQUEST.value,
+            )
+
+        if len(image_files) > Config.FRAME_SESSION_MAX_BATCH_SIZE:
+            return (
+                jsonify(
+                    {
+                        "error": "Batches are limited to "
+                        f"{Config.FRAME_SESSION_MAX_BATCH_SIZE} frames",
+                        "success": False,
+                    }
+                ),
+                StatusCode.BAD_REQUEST.value,
+            )
+
+        try:
+            timestamps = parse_frame_timestamps(len(image_files))
+        except ValueError as error:
+            return (
+                jsonify({"error": str(error), "success": False}),
+                StatusCode.BAD_REQUEST.value,
+            )
+
+        session = FrameSession(current_app.redis_client, room_id)
+        status = session.status()
+        if status is None or status["status"] != FrameSession.OPEN:
+            return (
+                jsonify({"error": "No open recording session", "success": False}),
+                StatusCode.CONFLICT.value,
+            )
+
+        object_store = get_object_store(s3_client=current_app.config["S3_CLIENT"])
+        image_keys = []
+
+        for image_file in image_files:
+            extension = os.path.splitext(secure_filename(image_file.filename))[1]
+            image_key = f"recordings/{room_id}/frames/{uuid.uuid4()}{extension}"
+            object_store.put(image_key, image_file.stream, image_file.mimetype)
+            image_keys.append(image_key)
+
+        sequence = session.append_batch()
+
+        if sequence is None:
+            for image_key in image_keys:
+                object_store.delete(image_key)
+
+            return (
+                jsonify({"error": "No open recording session", "success": False}),
+                StatusCode.CONFLICT.value,
+            )
+
+        if timestamps is None:
+            timestamps = [session.elapsed()] * len(image_keys)
+
+        try:
+            process_frame_batch.apply_async(
+                args=[room_id, sequence, image_keys, False, timestamps]
+            )
+        except Exception:
+            # The batches after it must not wait for a batch that never arrives.
+            session.skip_batch(sequence)
+            for image_key in image_keys:
+                object_store.delete(image_key)
+            raise
+
+        return (
+            jsonify(
+                {
+                    "message": {"sequence": sequence, "frames": len(image_keys)},
+                    "success": True,
+                }
+            ),
+            StatusCode.SUCCESS.value,
+        )
+
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
+
+
+@recording_blueprint.route("/api/recording-sessions/<room_id>/end", methods=["POST"])
+@limiter.limit("5 per minute")
+# @firebase_token_required
+def end_frame_session(room_id):
+    """
+    Close the frame ingestion session of a room.
+
+    The session stops accepting batches, and a final batch describes the slide that
+    was on screen when the class ended once all earlier batches are processed.
+
+    Args:
+        room_id (str): The unique identifier of the room being recorded.
+
+    Returns:
+        tuple: A tuple containing the JSON response and HTTP status code.
+    """
+    try:
+        session = FrameSession(current_app.redis_client, room_id)
+        sequence = session.close()
+
+        if sequence is None:
+            return (
+                jsonify({"error": "No open recording session", "success": False}),
+                StatusCode.CONFLICT.value,
+            )
+
+        try:
+            process_frame_batch.apply_async(args=[room_id, sequence, [], True])
+        except Exception:
+            session.skip_batch(sequence)
+            raise
+
+        return (
+            jsonify({"message": "Recording session closed", "success": True}),
+            StatusCode.SUCCESS.value,
+        )
+
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
+
+
+@recording_blueprint.route("/api/recording-sessions/<room_id>", methods=["GET"])
+@limiter.limit("30 per minute")
+# @firebase_token_required
+def get_frame_session(room_id):
+    """
+    Retrieve the progress of the frame ingestion session of a room.
+
+    Args:
+        room_id (str): The unique identifier of the room being recorded.
+
+    Returns:
+        tuple: A tuple containing the JSON response and HTTP status code.
+    """
+    try:
+        session = FrameSession(current_app.redis_client, room_id).status()
+
+        if session is None:
+            return (
+                jsonify({"error": "Recording session not found", "success": False}),
+                StatusCode.NOT_FOUND.value,
+            )
+
+        return (
+            jsonify({"message": session, "success": True}),
+            StatusCode.SUCCESS.value,
+        )
+
+    except Exception as error:
+        return (
+            jsonify({"error": str(error), "success": False}),
+            StatusCode.INTERNAL_SERVER_ERROR.value,
+        )
+
+
 @recording_blueprint.route("/api/chat-with-recording/<room_id>", methods=["POST"])
 @limiter.limit("5 per minute")
 @firebase_token_required
@@ -439,6 +840,8 @@ def chat_with_recording(room_id):
 
     Note:
         - The endpoint expects a JSON payload containing the user's query.
+        - An optional modality and time window in seconds scope the vector search to
+        the transcript or the slides of part of the recording.
         - The conversation context includes the retrieved context from the
         recording and any previous conversation.
         - The model used for generating responses is a Generative AI model capable
@@ -453,6 +856,12 @@ def chat_with_recording(room_id):
         data = schema.load(request.get_json())
 
         query = data.get("query")
+        search_filter = recording_search_filter(
+            room_id,
+            modality=data.get("modality"),
+            start_time=data.get("start_time"),
+            end_time=data.get("end_time"),
+        )
 
         query_embeddings = extract_text_embedding(query)
 
@@ -460,84 +869,76 @@ def chat_with_recording(room_id):
         recording_number_of_embeddings_key = (
             f"room_id_{room_id}_number_of_recording_embeddings"
         )
-        recording_previous_conversation_key = f"room_id_{room_id}_previous_conversation"
-        recording_cached_data = redis_client.mget(
-            recording_number_of_embeddings_key, recording_previous_conversation_key
-        )
-
-        number_of_embeddings = recording_cached_data[0]
+        number_of_embeddings = redis_client.get(recording_number_of_embeddings_key)
         number_of_embeddings = int(number_of_embeddings.decode("utf-8"))
         limit_results = math.ceil(math.sqrt(number_of_embeddings))
 
-        previous_conversation = recording_cached_data[1]
-
-        results = RecordingEmbedding.objects.aggregate(
-            [
-                {
-                    "$vectorSearch": {
-                        "index": "recordingEmbeddedVectorIndex",
-                        "path": "embeddings",
-                        "queryVector": query_embeddings,
-                        "filter": {"room_id": str(room_id)},
-                        "numCandidates": number_of_embeddings,
-                        "limit": limit_results,
-                    }
-                },
-                {
-                    "$project": {
-                        "_id": 0,
-                        "text_content": 1,
-                    }
-                },
-            ]
+        # Only the conversations of verified users are remembered.
+        user = conversation_user()
+        memory = (
+            ConversationMemory(redis_client, f"room_id_{room_id}", user)
+            if user
+            else None
         )
 
-        retrieved_context = ""
-
-        for result in list(results):
-            retrieved_context += result["text_content"]
-
-        if previous_conversation is not None:
-            previous_conversation = previous_conversation.decode("utf-8")
-        else:
-            previous_conversation = "No previous conversation found!"
-
-        if len(previous_conversation) > 10000:
-            previous_conversation = previous_conversation[-10000:]
-
-        prompt = f"""
-        Instruction: Please provide an informative response to the following question with the help of your knowledge, the Retrieved Context and the Previous Conversation in Markdown format.
-
-        Question: {query}
-
-        Retrieved Context: {retrieved_context}
-
-        Previous Conversation: {previous_conversation}
-
-        Note: If the model is unable to generate an answer based on the retrieved context or previous conversation, please follow these instructions:
-
-        1. Notify the user that the generated answer is based on the model's own knowledge.
-        2. Provide an answer using the model's own knowledge.
-        3. If possible, prompt something related to the topic to continue the conversation.
-        """
+        # Answers restricted to a modality or time window are cached apart.
+        cache_partition = ":".join(
+            [str(room_id)]
+            + [str(data.get(key, "")) for key in ("modality", "start_time", "end_time")]
+        )
+        answer_cache = (
+            SemanticAnswerCache(
+                redis_client, RecordingEmbedding, cache_partition, number_of_embeddings
+            )
+            if Config.ANSWER_CACHE_ENABLED
+            else None
+        )
+        answer = answer_cache.get(query_embeddings) if answer_cache else None
+
+        if answer is None:
+            started = time.perf_counter()
+            results = select_vector_search_backend(number_of_embeddings).search(
+                RecordingEmbedding,
+                str(room_id),
+                query_embeddings,
+                limit=limit_results,
+                num_candidates=number_of_embeddings,
+                search_filter=search_filter,
+                fields=("_id", "text_content", "start_time"),
+            )
 
-        if len(prompt) > 25000:
-            prompt = prompt[:25000]
+            retrieved_context = ""
 
-        model = genai.GenerativeModel("gemini-pro")
+            for result in results:
+                if result.get("start_time") is not None:
+                    retrieved_context += f"[{format_offset(result['start_time'])}] "
+                retrieved_context += result["text_content"]
 
-        answer = model.generate_content(prompt)
+            prompt = build_chat_prompt(
+                query,
+                retrieved_context,
+                memory.render() if memory is not None else NO_CONVERSATION,
+            )
+            model = genai.GenerativeModel("gemini-pro")
+            answer = model.generate_content(prompt).text
+
+            if answer_cache is not None:
+                answer_cache.set(
+                    query,
+                    query_embeddings,
+                    answer,
+                    [result["_id"] for result in results],
+                    time.perf_counter() - started,
+                )
 
-        previous_conversation += f"user: {query}\nmodel: {answer.text}\n"
-        redis_client.set(
-            recording_previous_conversation_key, previous_conversation, ex=3600
-        )
+        if memory is not None:
+            memory.append(query, answer)
 
         return (
             jsonify(
                 {
                     "success": True,
-                    "message": answer.text,
+                    "message": answer,
                 }
             ),
             StatusCode.SUCCESS.value,
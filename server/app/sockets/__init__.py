@@ -17,3 +17,7 @@ from .group_chat_sockets import (
 from .assignment_sockets import (
     generate_assignment,
 )
+
+from .chat_sockets import (
+    chat_with_material,
+)
@@ -0,0 +1,87 @@
+"""
+Chat sockets for the Flask application.
+"""
+
+from firebase_admin import auth
+from flask import current_app, request
+from flask_socketio import emit
+from app.app import socketio
+from app.auth.firebase_auth import verify_payload_token
+from app.chat import MaterialChat, conversation_user, stream_answer
+
+
+def chat_with_material(data):
+    """
+    Event handler for asking a question about an attachment with a streamed answer.
+
+    Args:
+        data (dict): A dictionary containing the following keys:
+            - "attachment_id" (str): The ID of the attachment asked about.
+            - "query" (str): The question.
+            - "id_token" (str): The Firebase ID token of the user asking.
+
+    Returns:
+        None
+
+    Raises:
+        None
+
+    Notes:
+        - Retrieves the context exactly like the `chat-with-material` route.
+        - Emits a "chat-token" event to the client with every part of the answer
+          as the model generates it, then a "chat-answer" event with the full answer.
+        - A cached answer is sent as a single "chat-token" event.
+        - Like the route, requires a valid Firebase ID token: without one, emits an
+          error message to the client.
+        - Appends the question and the full answer to the conversation memory of
+          the user verified from "id_token".
+        - If any error occurs during the process, emits an error message to the client.
+
+    """
+    try:
+        attachment_id = data.get("attachment_id")
+        query = data.get("query")
+
+        if not attachment_id or not query:
+            emit("error", {"message": "attachment_id and query are required"})
+            return
+
+        try:
+            verified_user = verify_payload_token(data.get("id_token"))
+        except auth.InvalidIdTokenError:
+            emit("error", {"message": "Invalid authorization token"})
+            return
+
+        if verified_user is None:
+            emit("error", {"message": "Authorization token is missing"})
+            return
+
+        chat = MaterialChat(
+            current_app.redis_client,
+            attachment_id,
+            query,
+            conversation_user(verified_user),
+        )
+
+        answer = chat.cached_answer()
+        if answer is not None:
+            emit("chat-token", {"attachment_id": attachment_id, "token": answer})
+        else:
+            tokens = []
+            for token in stream_answer(
+                chat.build_prompt(), label=f"chat-with-material {request.sid}"
+            ):
+                tokens.append(token)
+                emit("chat-token", {"attachment_id": attachment_id, "token": token})
+                socketio.sleep(0)
+            answer = "".join(tokens)
+
+        chat.remember(answer)
+
+        emit("chat-answer", {"attachment_id": attachment_id, "message": answer})
+
+    except Exception as error:
+        emit(
+            "error",
+            {"message": f"An error occurred: {error}"},
+        )
@@ -0,0 +1,10 @@
+"""
+Provides access to the object store used for claim-check uploads.
+"""
+
+from .object_store import (
+    ObjectStore,
+    S3ObjectStore,
+    LocalObjectStore,
+    get_object_store,
+)
@@ -0,0 +1,216 @@
+"""
+Module providing object store backends for claim-check uploads.
+
+Instead of shipping file bytes through the Celery broker, routes store uploads in
+an object store and hand tasks only the object key (the "claim check"). Workers
+then stream the object back from storage. Two backends are available: Amazon S3
+for production and the local filesystem for development and offline tests.
+
+Classes:
+    ObjectStore: Interface shared by the object store backends.
+    S3ObjectStore: Object store backed by an S3 bucket.
+    LocalObjectStore: Object store backed by a local directory.
+
+Functions:
+    get_object_store: Return the object store selected in Config.
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+import boto3
+from config.config import Config
+
+
+class ObjectStore:
+    """
+    Interface shared by the object store backends.
+    """
+
+    def put(
+        self, key: str, file_obj: BinaryIO, content_type: Optional[str] = None
+    ) -> None:
+        """
+        Stream a file-like object into the store under `key`.
+
+        Args:
+            key (str): The object key.
+            file_obj (BinaryIO): The readable binary stream to store.
+            content_type (str, optional): The MIME type of the object.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def open(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Open the object stored under `key` as a readable binary stream.
+
+        Args:
+            key (str): The object key.
+
+        Yields:
+            BinaryIO: The readable binary stream of the object.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[str]:
+        """
+        Make the object stored under `key` available as a local file.
+
+        The object is streamed to a temporary file that is removed on exit, so
+        libraries that work on file paths never need the whole object in memory.
+
+        Args:
+            key (str): The object key.
+
+        Yields:
+            str: The path of a local file holding the object.
+        """
+        suffix = os.path.splitext(key)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+            temp_path = temp_file.name
+            with self.open(key) as stream:
+                shutil.copyfileobj(stream, temp_file)
+
+        try:
+            yield temp_path
+        finally:
+            os.remove(temp_path)
+
+    def read(self, key: str) -> bytes:
+        """
+        Read the whole object stored under `key`.
+
+        Args:
+            key (str): The object key.
+
+        Returns:
+            bytes: The content of the object.
+        """
+        with self.open(key) as stream:
+            return stream.read()
+
+    def delete(self, key: str) -> None:
+        """
+        Delete the object stored under `key`.
+
+        Args:
+            key (str): The object key.
+        """
+        raise NotImplementedError
+
+
+class S3ObjectStore(ObjectStore):
+    """
+    Object store backed by an S3 bucket.
+
+    Attributes:
+        s3_client: The boto3 S3 client.
+        bucket (str): The name of the bucket.
+    """
+
+    def __init__(self, s3_client=None, bucket: str = Config.OBJECT_STORE_BUCKET):
+        self.s3_client = s3_client or boto3.client(
+            "s3",
+            region_name=Config.AWS_REGION,
+            aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
+        )
+        self.bucket = bucket
+
+    def put(
+        self, key: str, file_obj: BinaryIO, content_type: Optional[str] = None
+    ) -> None:
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.s3_client.upload_fileobj(file_obj, self.bucket, key, ExtraArgs=extra_args)
+
+    @contextmanager
+    def open(self, key: str) -> Iterator[BinaryIO]:
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        body = response["Body"]
+        try:
+            yield body
+        finally:
+            body.close()
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[str]:
+        suffix = os.path.splitext(key)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+            temp_path = temp_file.name
+            self.s3_client.download_fileobj(self.bucket, key, temp_file)
+
+        try:
+            yield temp_path
+        finally:
+            os.remove(temp_path)
+
+    def delete(self, key: str) -> None:
+        self.s3_client.delete_object(Bucket=self.bucket, Key=key)
+
+
+class LocalObjectStore(ObjectStore):
+    """
+    Object store backed by a local directory.
+
+    Attributes:
+        root (str): The directory under which objects are stored.
+    """
+
+    def __init__(self, root: str = Config.OBJECT_STORE_LOCAL_ROOT):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        """
+        Return the filesystem path of `key`, refusing keys outside the root.
+        """
+        root = os.path.abspath(self.root)
+        path = os.path.abspath(os.path.join(root, key))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def put(
+        self, key: str, file_obj: BinaryIO, content_type: Optional[str] = None
+    ) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as destination:
+            shutil.copyfileobj(file_obj, destination)
+
+    @contextmanager
+    def open(self, key: str) -> Iterator[BinaryIO]:
+        with open(self._path(key), "rb") as stream:
+            yield stream
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[str]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        yield path
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def get_object_store(s3_client=None) -> ObjectStore:
+    """
+    Return the object store selected by `Config.OBJECT_STORE_BACKEND`.
+
+    Args:
+        s3_client (optional): An existing boto3 S3 client to reuse.
+
+    Returns:
+        ObjectStore: A LocalObjectStore when the backend is "local",
+        otherwise an S3ObjectStore.
+    """
+    if Config.OBJECT_STORE_BACKEND == "local":
+        return LocalObjectStore()
+    return S3ObjectStore(s3_client=s3_client)
@@ -0,0 +1,16 @@
+"""
+Provides access to the vector search backends of the chat endpoints.
+"""
+
+from .backend import (
+    VectorSearchBackend,
+    AtlasVectorSearch,
+    fetch_ranked,
+    get_vector_search_backend,
+    select_vector_search_backend,
+    index_documents,
+    remove_documents,
+    drop_partition,
+)
+from .hnsw_index import HnswIndex, LocalVectorSearch
+from .exact_index import ExactIndex, ExactVectorSearch
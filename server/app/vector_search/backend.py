@@ -0,0 +1,348 @@
+"""
+Module providing the pluggable vector search used by the chat endpoints.
+
+Chat queries search the Embedding chunks of one attachment or the
+RecordingEmbedding chunks of one room. The backend selected by
+`VECTOR_SEARCH_BACKEND` answers these queries:
+
+- "atlas" runs the Atlas-only `$vectorSearch` aggregation stage;
+- "local" searches an HNSW index kept on local disk per attachment and per room,
+  which also works against a plain mongod and saves the Atlas round trip.
+
+Partitions of at most `EXACT_SEARCH_MAX_VECTORS` vectors are searched exactly
+instead, by the "exact" backend scoring every cached vector.
+
+Backends rank document IDs; the documents are then read from MongoDB with the
+query filter applied, so deleted documents and documents outside the filter
+are never returned even when the index still holds them. Deleted documents are
+also removed from the local indexes, so they do not take the place of live
+neighbours, and the indexes of deleted attachments are dropped.
+
+Classes:
+    VectorSearchBackend: Interface of a vector search backend.
+    AtlasVectorSearch: Vector search through Atlas $vectorSearch.
+
+Functions:
+    partition_path: Return the local file of a partition.
+    file_lock: Hold an exclusive lock on a local file across processes.
+    fetch_ranked: Read ranked documents from MongoDB, keeping their order.
+    get_vector_search_backend: Return the process-wide vector search backend.
+    select_vector_search_backend: Pick exact or ANN search for a corpus size.
+    index_documents: Add newly stored documents to the vector search backends.
+    remove_documents: Remove deleted documents from the vector search backends.
+    drop_partition: Drop the indexes of a deleted partition.
+"""
+
+import fcntl
+import os
+import re
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+from app.embeddings.vector_codec import vector_search_path
+from config.config import Config
+
+# The Atlas index and the partition field of each searchable collection.
+SEARCH_INDEXES = {
+    "embedding": ("embeddedVectorIndex", "attachment_id"),
+    "recording_embedding": ("recordingEmbeddedVectorIndex", "room_id"),
+}
+
+
+def search_index(document_class: type) -> tuple:
+    """
+    Return the Atlas index name and partition field of a document class.
+    """
+    return SEARCH_INDEXES[document_class._meta["collection"]]
+
+
+def partition_path(
+    root: str, document_class: type, partition: str, extension: str
+) -> str:
+    """
+    Return the local file of a partition of a collection under `root`.
+    """
+    safe_partition = re.sub(r"[^\w.-]", "_", str(partition))
+    return os.path.join(
+        root, document_class._meta["collection"], f"{safe_partition}{extension}"
+    )
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive lock on a local file across the processes of this host.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "w", encoding="utf-8") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def projection(fields: Sequence[str]) -> dict:
+    """
+    Return the MongoDB projection of `fields`, excluding "_id" unless requested.
+    """
+    return {"_id": int("_id" in fields), **{field: 1 for field in fields}}
+
+
+def fetch_ranked(
+    document_class: type,
+    document_ids: Sequence,
+    search_filter: Optional[dict] = None,
+    fields: Sequence[str] = ("text_content",),
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """
+    Read ranked documents from MongoDB, keeping their rank order.
+
+    Args:
+        document_class (type): The Embedding or RecordingEmbedding model.
+        document_ids (Sequence): The document IDs, best match first.
+        search_filter (dict, optional): Further conditions the documents must match.
+        fields (Sequence[str]): The fields to return, including "_id" when the
+            document IDs are needed.
+        limit (int, optional): The maximum number of documents to return.
+
+    Returns:
+        List[dict]: The requested fields of the matching documents, best first.
+    """
+    collection = document_class._get_collection()  # pylint: disable=protected-access
+    query = {"_id": {"$in": list(document_ids)}, **(search_filter or {})}
+    documents = {
+        document["_id"]: document
+        for document in collection.find(query, {**projection(fields), "_id": 1})
+    }
+    if "_id" not in fields:
+        for document in documents.values():
+            del document["_id"]
+
+    ranked = [
+        documents[document_id]
+        for document_id in document_ids
+        if document_id in documents
+    ]
+    return ranked if limit is None else ranked[:limit]
+
+
+class VectorSearchBackend:
+    """
+    Interface of a vector search backend.
+    """
+
+    def search(
+        self,
+        document_class: type,
+        partition: str,
+        query_vector: Sequence[float],
+        limit: int,
+        num_candidates: int,
+        search_filter: Optional[dict] = None,
+        fields: Sequence[str] = ("text_content",),
+    ) -> List[dict]:
+        """
+        Return the documents of a partition closest to a query vector.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            partition (str): The attachment content ID or the room ID searched.
+            query_vector (Sequence[float]): The embedding of the query.
+            limit (int): The maximum number of documents to return.
+            num_candidates (int): The number of nearest neighbours to consider.
+            search_filter (dict, optional): Further conditions on the documents.
+            fields (Sequence[str]): The fields to return.
+
+        Returns:
+            List[dict]: The requested fields of the closest documents, best first.
+        """
+        raise NotImplementedError
+
+    def add(
+        self, document_class: type, documents: Sequence, document_ids: Sequence
+    ) -> None:
+        """
+        Add newly stored documents to the index. Does nothing by default, for
+        backends indexing the collection themselves.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            documents (Sequence): The stored documents.
+            document_ids (Sequence): The MongoDB IDs of the documents.
+        """
+
+    def remove(
+        self, document_class: type, partition: str, document_ids: Sequence
+    ) -> None:
+        """
+        Remove deleted documents from the index of a partition. Does nothing by
+        default, for backends indexing the collection themselves.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            partition (str): The attachment content ID or the room ID.
+            document_ids (Sequence): The MongoDB IDs of the deleted documents.
+        """
+
+    def drop(self, document_class: type, partition: str) -> None:
+        """
+        Drop the index of a partition whose documents were all deleted. Does
+        nothing by default, for backends indexing the collection themselves.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            partition (str): The attachment content ID or the room ID.
+        """
+
+
+class AtlasVectorSearch(VectorSearchBackend):
+    """
+    Vector search through the Atlas `$vectorSearch` aggregation stage.
+    """
+
+    def search(
+        self,
+        document_class: type,
+        partition: str,
+        query_vector: Sequence[float],
+        limit: int,
+        num_candidates: int,
+        search_filter: Optional[dict] = None,
+        fields: Sequence[str] = ("text_content",),
+    ) -> List[dict]:
+        index, partition_field = search_index(document_class)
+
+        results = document_class.objects.aggregate(
+            [
+                {
+                    "$vectorSearch": {
+                        "index": index,
+                        "path": vector_search_path(),
+                        "queryVector": list(query_vector),
+                        "filter": {partition_field: partition, **(search_filter or {})},
+                        "numCandidates": num_candidates,
+                        "limit": limit,
+                    }
+                },
+                {"$project": projection(fields)},
+            ]
+        )
+
+        return list(results)
+
+
+_backends: Dict[str, VectorSearchBackend] = {}
+
+
+def get_vector_search_backend(name: Optional[str] = None) -> VectorSearchBackend:
+    """
+    Return the process-wide vector search backend, creating it on first use.
+
+    Args:
+        name (str, optional): "atlas", "local" or "exact". Defaults to
+            `Config.VECTOR_SEARCH_BACKEND`.
+
+    Returns:
+        VectorSearchBackend: The shared backend.
+
+    Raises:
+        ValueError: If the backend is not supported.
+    """
+    name = name or Config.VECTOR_SEARCH_BACKEND
+
+    if name not in _backends:
+        if name == "atlas":
+            _backends[name] = AtlasVectorSearch()
+        elif name == "local":
+            # pylint: disable=import-outside-toplevel
+            from app.vector_search.hnsw_index import LocalVectorSearch
+
+            _backends[name] = LocalVectorSearch()
+        elif name == "exact":
+            # pylint: disable=import-outside-toplevel
+            from app.vector_search.exact_index import ExactVectorSearch
+
+            _backends[name] = ExactVectorSearch()
+        else:
+            raise ValueError(f"Unsupported vector search backend: {name}")
+
+    return _backends[name]
+
+
+def select_vector_search_backend(corpus_size: int) -> VectorSearchBackend:
+    """
+    Return the exact backend for small corpora, otherwise the configured ANN backend.
+
+    Args:
+        corpus_size (int): The number of vectors of the searched partition.
+
+    Returns:
+        VectorSearchBackend: The backend to search the partition with.
+    """
+    if 0 < corpus_size <= Config.EXACT_SEARCH_MAX_VECTORS:
+        return get_vector_search_backend("exact")
+    return get_vector_search_backend()
+
+
+def index_documents(
+    document_class: type, documents: Sequence, document_ids: Sequence
+) -> None:
+    """
+    Add newly stored documents to the configured vector search backend, and to
+    the exact backend when it is enabled.
+
+    Args:
+        document_class (type): The Embedding or RecordingEmbedding model.
+        documents (Sequence): The stored documents.
+        document_ids (Sequence): The MongoDB IDs of the documents.
+    """
+    for backend in indexing_backends(document_class):
+        backend.add(document_class, documents, document_ids)
+
+
+def remove_documents(
+    document_class: type, partition: str, document_ids: Sequence
+) -> None:
+    """
+    Remove deleted documents from the configured vector search backend, and from
+    the exact backend when it is enabled.
+
+    Args:
+        document_class (type): The Embedding or RecordingEmbedding model.
+        partition (str): The attachment content ID or the room ID.
+        document_ids (Sequence): The MongoDB IDs of the deleted documents.
+    """
+    if len(document_ids) == 0:
+        return
+
+    for backend in indexing_backends(document_class):
+        backend.remove(document_class, partition, document_ids)
+
+
+def drop_partition(document_class: type, partition: str) -> None:
+    """
+    Drop the indexes of a partition whose documents were all deleted, from the
+    configured vector search backend and the exact backend when it is enabled.
+
+    Args:
+        document_class (type): The Embedding or RecordingEmbedding model.
+        partition (str): The attachment content ID or the room ID.
+    """
+    for backend in indexing_backends(document_class):
+        backend.drop(document_class, partition)
+
+
+def indexing_backends(document_class: type) -> List[VectorSearchBackend]:
+    """
+    Return the backends whose indexes follow the documents of a collection.
+    """
+    if document_class._meta.get("collection") not in SEARCH_INDEXES:
+        return []
+
+    names = {Config.VECTOR_SEARCH_BACKEND}
+    if Config.EXACT_SEARCH_MAX_VECTORS > 0:
+        names.add("exact")
+
+    return [get_vector_search_backend(name) for name in sorted(names)]
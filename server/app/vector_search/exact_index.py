@@ -0,0 +1,264 @@
+"""
+Module providing exact brute-force vector search over memory-mapped matrices.
+
+Most attachments produce only tens to a few hundred chunks, and for those an ANN
+round trip costs more than scoring every vector. The vectors of each attachment
+and room are cached under `EXACT_INDEX_DIR/<collection>/<partition>.vectors` as
+one contiguous float32 matrix of unit vectors, memory-mapped on use, and a query
+is a single matrix-vector product followed by an `argpartition` top-k.
+
+A file holds a header with the dimension and number of vectors, the 12-byte
+MongoDB ID of each vector, then the matrix. The cache is filled from MongoDB on
+the first query of a partition and rebuilt when its number of vectors differs
+from the corpus size of the query; inserting or deleting documents drops the
+cached files of their partitions.
+
+Classes:
+    ExactIndex: The memory-mapped vectors of one partition.
+    ExactVectorSearch: Exact vector search over the cached matrices.
+"""
+
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from bson import ObjectId
+from app.vector_search.backend import (
+    VectorSearchBackend,
+    fetch_ranked,
+    file_lock,
+    partition_path,
+    search_index,
+)
+from config.config import Config
+
+HEADER = struct.Struct("<II")
+
+
+class ExactIndex:
+    """
+    The memory-mapped unit vectors of one partition.
+
+    Attributes:
+        document_ids (List[ObjectId]): The document ID of each row.
+        matrix (np.ndarray): The (n, dim) float32 matrix of unit vectors.
+    """
+
+    def __init__(self, document_ids: List[ObjectId], matrix: np.ndarray):
+        self.document_ids = document_ids
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return len(self.document_ids)
+
+    @classmethod
+    def load(cls, path: str) -> "ExactIndex":
+        """
+        Memory-map the vectors saved at `path`.
+
+        Args:
+            path (str): The file written by `save`.
+
+        Returns:
+            ExactIndex: The index, reading the matrix from the page cache.
+        """
+        with open(path, "rb") as vectors_file:
+            dim, count = HEADER.unpack(vectors_file.read(HEADER.size))
+            raw_ids = vectors_file.read(12 * count)
+
+        document_ids = [
+            ObjectId(raw_ids[offset : offset + 12])
+            for offset in range(0, len(raw_ids), 12)
+        ]
+        if count == 0:
+            return cls(document_ids, np.empty((0, dim), dtype=np.float32))
+
+        matrix = np.memmap(
+            path,
+            dtype=np.float32,
+            mode="r",
+            offset=HEADER.size + 12 * count,
+            shape=(count, dim),
+        )
+        return cls(document_ids, matrix)
+
+    @staticmethod
+    def save(path: str, document_ids: Sequence[ObjectId], vectors: np.ndarray) -> None:
+        """
+        Normalize vectors and save them with their IDs, replacing `path` atomically.
+
+        Args:
+            path (str): The file to write.
+            document_ids (Sequence[ObjectId]): The document ID of each vector.
+            vectors (np.ndarray): The vectors as an (n, dim) array.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as vectors_file:
+            vectors_file.write(HEADER.pack(vectors.shape[1], len(document_ids)))
+            vectors_file.write(
+                b"".join(document_id.binary for document_id in document_ids)
+            )
+            vectors_file.write(vectors.astype("<f4").tobytes())
+        os.replace(f"{path}.tmp", path)
+
+    def query(self, vector: Sequence[float], k: int) -> List[ObjectId]:
+        """
+        Return the IDs of the `k` documents closest to a vector, closest first.
+
+        Args:
+            vector (Sequence[float]): The query vector.
+            k (int): The number of neighbours.
+
+        Returns:
+            List[ObjectId]: The document IDs, by decreasing cosine similarity.
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+
+        scores = self.matrix @ np.asarray(vector, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [self.document_ids[row] for row in top]
+
+
+class ExactVectorSearch(VectorSearchBackend):
+    """
+    Exact vector search over float32 matrices cached on local disk.
+
+    The corpus size of a query, passed as `num_candidates`, is the number of
+    vectors the partition should hold; every vector is scored.
+
+    Attributes:
+        root (str): The cache directory.
+    """
+
+    def __init__(self, root: str = Config.EXACT_INDEX_DIR):
+        self.root = root
+        self._loaded: Dict[str, Tuple[int, ExactIndex]] = {}
+        self._lock = threading.Lock()
+
+    def index_path(self, document_class: type, partition: str) -> str:
+        """
+        Return the path of the cached vectors of a partition.
+        """
+        return partition_path(self.root, document_class, partition, ".vectors")
+
+    def build(self, document_class: type, partition: str) -> None:
+        """
+        Cache the vectors of a partition from MongoDB.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            partition (str): The attachment content ID or the room ID.
+        """
+        _, partition_field = search_index(document_class)
+        documents = list(
+            document_class.objects(**{partition_field: partition}).only(
+                "embeddings", "compact_embeddings"
+            )
+        )
+        if not documents:
+            return
+
+        ExactIndex.save(
+            self.index_path(document_class, partition),
+            [document.id for document in documents],
+            np.stack([document.get_vector() for document in documents]),
+        )
+
+    def load(
+        self, document_class: type, partition: str, corpus_size: Optional[int] = None
+    ) -> Optional[ExactIndex]:
+        """
+        Return the cached vectors of a partition, caching them first if needed.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            partition (str): The attachment content ID or the room ID.
+            corpus_size (int, optional): The expected number of vectors. A cache
+                of another size is rebuilt.
+
+        Returns:
+            ExactIndex: The vectors, or None when the partition has none.
+        """
+        path = self.index_path(document_class, partition)
+        index = self._load_cached(path)
+
+        if index is None or (corpus_size is not None and len(index) != corpus_size):
+            with file_lock(path):
+                index = self._load_cached(path)
+                if index is None or (
+                    corpus_size is not None and len(index) != corpus_size
+                ):
+                    self.build(document_class, partition)
+                    index = self._load_cached(path)
+
+        return index
+
+    def _load_cached(self, path: str) -> Optional[ExactIndex]:
+        """
+        Memory-map the vectors at `path`, reusing the mapping while unchanged.
+        """
+        try:
+            version = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            loaded = self._loaded.get(path)
+            if loaded is None or loaded[0] != version:
+                loaded = (version, ExactIndex.load(path))
+                self._loaded[path] = loaded
+
+        return loaded[1]
+
+    def search(
+        self,
+        document_class: type,
+        partition: str,
+        query_vector: Sequence[float],
+        limit: int,
+        num_candidates: int,
+        search_filter: Optional[dict] = None,
+        fields: Sequence[str] = ("text_content",),
+    ) -> List[dict]:
+        index = self.load(document_class, partition, corpus_size=num_candidates)
+        if index is None:
+            return []
+
+        # Without a filter only the top `limit` rows can be returned; with one,
+        # every row is ranked so the filter is applied to the whole partition.
+        k = limit if not search_filter else len(index)
+        document_ids = index.query(query_vector, k)
+
+        return fetch_ranked(document_class, document_ids, search_filter, fields, limit)
+
+    def add(
+        self, document_class: type, documents: Sequence, document_ids: Sequence
+    ) -> None:
+        _, partition_field = search_index(document_class)
+
+        for partition in {getattr(document, partition_field) for document in documents}:
+            self.drop(document_class, partition)
+
+    def remove(
+        self, document_class: type, partition: str, document_ids: Sequence
+    ) -> None:
+        self.drop(document_class, partition)
+
+    def drop(self, document_class: type, partition: str) -> None:
+        path = self.index_path(document_class, partition)
+        if not os.path.exists(path):
+            return
+
+        with file_lock(path):
+            if os.path.exists(path):
+                os.remove(path)
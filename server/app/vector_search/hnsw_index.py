@@ -0,0 +1,376 @@
+"""
+Module providing the local HNSW vector search backend.
+
+Every attachment and every room gets its own HNSW graph (hnswlib, cosine space)
+under `VECTOR_INDEX_DIR/<collection>/<partition>.hnsw`. The `.ids` file next to
+it holds the vector dimension followed by the 12-byte MongoDB ID of every vector:
+label `i` of the graph is the document at position `i`.
+
+Deleted documents are marked deleted in the graph, so searches skip them, and
+their IDs are zeroed in the `.ids` file. The files of a partition are removed
+when its attachment is deleted.
+
+Indexes are loaded lazily on the first query of a partition and reloaded when
+another process saved a newer version. Documents are added incrementally as they
+are inserted: the index is reloaded, extended and saved under an exclusive file
+lock, so the workers of one host can update the same partition concurrently.
+
+A host that did not see the inserts of a partition, such as a new API server,
+has no index or a shorter one than the corpus size of the query. The index is
+then built from MongoDB before it is searched.
+
+Classes:
+    HnswIndex: The HNSW graph and document IDs of one partition.
+    LocalVectorSearch: Vector search over local HNSW indexes.
+"""
+
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import hnswlib
+import numpy as np
+from bson import ObjectId
+from app.vector_search.backend import (
+    VectorSearchBackend,
+    fetch_ranked,
+    file_lock,
+    partition_path,
+    search_index,
+)
+from config.config import Config
+
+# The ID stored for the labels of deleted documents.
+DELETED_ID = bytes(12)
+
+
+class HnswIndex:
+    """
+    The HNSW graph and document IDs of one partition.
+
+    Attributes:
+        path (str): The path of the graph file; the IDs are stored at `path.ids`.
+        index (hnswlib.Index): The graph, or None before the first vector.
+        document_ids (List[ObjectId]): The document ID of each label, None for
+            the labels of deleted documents.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index: Optional[hnswlib.Index] = None
+        self.document_ids: List[Optional[ObjectId]] = []
+
+    @property
+    def ids_path(self) -> str:
+        """
+        The file holding the document ID of each label.
+        """
+        return f"{self.path}.ids"
+
+    def __len__(self) -> int:
+        return sum(document_id is not None for document_id in self.document_ids)
+
+    def load(self) -> "HnswIndex":
+        """
+        Load the graph and IDs from disk, if they were saved before.
+
+        Returns:
+            HnswIndex: This index.
+        """
+        if not os.path.exists(self.path):
+            return self
+
+        with open(self.ids_path, "rb") as ids_file:
+            (dim,) = struct.unpack("<I", ids_file.read(4))
+            raw_ids = ids_file.read()
+        self.document_ids = [
+            (
+                None
+                if raw_ids[offset : offset + 12] == DELETED_ID
+                else ObjectId(raw_ids[offset : offset + 12])
+            )
+            for offset in range(0, len(raw_ids), 12)
+        ]
+
+        self.index = hnswlib.Index(space="cosine", dim=dim)
+        self.index.load_index(self.path)
+        return self
+
+    def add(self, document_ids: Sequence[ObjectId], vectors: np.ndarray) -> None:
+        """
+        Add vectors to the graph, growing it as needed.
+
+        Args:
+            document_ids (Sequence[ObjectId]): The document ID of each vector.
+            vectors (np.ndarray): The vectors as an (n, dim) float32 array.
+        """
+        if len(document_ids) == 0:
+            return
+
+        if self.index is None:
+            self.index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+            self.index.init_index(
+                max_elements=max(len(document_ids), 64),
+                ef_construction=Config.HNSW_EF_CONSTRUCTION,
+                M=Config.HNSW_M,
+            )
+
+        required = len(self.document_ids) + len(document_ids)
+        if required > self.index.get_max_elements():
+            self.index.resize_index(max(required, 2 * self.index.get_max_elements()))
+
+        labels = np.arange(len(self.document_ids), required)
+        self.index.add_items(vectors, labels)
+        self.document_ids.extend(document_ids)
+
+    def remove(self, document_ids: Sequence[ObjectId]) -> int:
+        """
+        Mark the labels of deleted documents deleted, so searches skip them.
+
+        Args:
+            document_ids (Sequence[ObjectId]): The IDs of the deleted documents.
+
+        Returns:
+            int: The number of labels marked deleted.
+        """
+        removed = set(document_ids)
+        labels = [
+            label
+            for label, document_id in enumerate(self.document_ids)
+            if document_id is not None and document_id in removed
+        ]
+
+        for label in labels:
+            self.index.mark_deleted(label)
+            self.document_ids[label] = None
+
+        return len(labels)
+
+    def save(self) -> None:
+        """
+        Save the graph and IDs, replacing the previous files atomically.
+
+        The IDs are written first: a reader loading the IDs of the new version with
+        the graph of the old one only sees labels it can resolve.
+        """
+        if self.index is None:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with open(f"{self.ids_path}.tmp", "wb") as ids_file:
+            ids_file.write(struct.pack("<I", self.index.dim))
+            ids_file.write(
+                b"".join(
+                    DELETED_ID if document_id is None else document_id.binary
+                    for document_id in self.document_ids
+                )
+            )
+        os.replace(f"{self.ids_path}.tmp", self.ids_path)
+
+        self.index.save_index(f"{self.path}.tmp")
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def query(
+        self, vector: Sequence[float], k: int, ef: int = Config.HNSW_EF_SEARCH
+    ) -> List[ObjectId]:
+        """
+        Return the IDs of the `k` documents closest to a vector, closest first.
+
+        Args:
+            vector (Sequence[float]): The query vector.
+            k (int): The number of neighbours.
+            ef (int): The size of the candidate list explored by the search.
+
+        Returns:
+            List[ObjectId]: The document IDs.
+        """
+        k = min(k, len(self) if self.index else 0)
+        if k <= 0:
+            return []
+
+        self.index.set_ef(max(ef, k))
+        labels, _ = self.index.knn_query(np.asarray([vector], dtype=np.float32), k=k)
+
+        return [
+            self.document_ids[label]
+            for label in labels[0]
+            if label < len(self.document_ids) and self.document_ids[label] is not None
+        ]
+
+
+class LocalVectorSearch(VectorSearchBackend):
+    """
+    Vector search over HNSW indexes kept on local disk per attachment and per room.
+
+    Attributes:
+        root (str): The directory holding the indexes.
+    """
+
+    def __init__(self, root: str = Config.VECTOR_INDEX_DIR):
+        self.root = root
+        self._loaded: Dict[str, Tuple[int, HnswIndex]] = {}
+        self._lock = threading.Lock()
+
+    def index_path(self, document_class: type, partition: str) -> str:
+        """
+        Return the path of the index of a partition.
+        """
+        return partition_path(self.root, document_class, partition, ".hnsw")
+
+    def build(self, document_class: type, partition: str, indexed: int = 0) -> None:
+        """
+        Index the vectors of a partition from MongoDB, unless MongoDB holds no more
+        documents than the `indexed` ones. The caller holds the file lock.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            partition (str): The attachment content ID or the room ID.
+            indexed (int): The number of vectors of the current index.
+        """
+        _, partition_field = search_index(document_class)
+        documents = document_class.objects(**{partition_field: partition})
+        if documents.count() <= indexed:
+            return
+
+        documents = list(documents.only("embeddings", "compact_embeddings"))
+        index = HnswIndex(self.index_path(document_class, partition))
+        index.add(
+            [document.id for document in documents],
+            np.stack([document.get_vector() for document in documents]).astype(
+                np.float32
+            ),
+        )
+        index.save()
+        print(f"HNSW index of {partition} built from {len(documents)} documents")
+
+    def load(
+        self, document_class: type, partition: str, corpus_size: Optional[int] = None
+    ) -> HnswIndex:
+        """
+        Return the index of a partition, loading it when it changed on disk.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            partition (str): The attachment content ID or the room ID.
+            corpus_size (int, optional): The expected number of vectors. An index
+                holding fewer vectors is built from MongoDB first.
+
+        Returns:
+            HnswIndex: The index, empty when nothing was indexed yet.
+        """
+        path = self.index_path(document_class, partition)
+        index = self._load_cached(path)
+
+        if corpus_size is not None and len(index) < corpus_size:
+            with file_lock(path):
+                index = self._load_cached(path)
+                if len(index) < corpus_size:
+                    self.build(document_class, partition, indexed=len(index))
+                    index = self._load_cached(path)
+
+        return index
+
+    def _load_cached(self, path: str) -> HnswIndex:
+        """
+        Load the index at `path`, reusing the loaded index while unchanged.
+        """
+        try:
+            version = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return HnswIndex(path)
+
+        with self._lock:
+            loaded = self._loaded.get(path)
+            if loaded is None or loaded[0] != version:
+                loaded = (version, HnswIndex(path).load())
+                self._loaded[path] = loaded
+
+        return loaded[1]
+
+    def search(
+        self,
+        document_class: type,
+        partition: str,
+        query_vector: Sequence[float],
+        limit: int,
+        num_candidates: int,
+        search_filter: Optional[dict] = None,
+        fields: Sequence[str] = ("text_content",),
+    ) -> List[dict]:
+        document_ids = self.load(
+            document_class, partition, corpus_size=num_candidates
+        ).query(query_vector, num_candidates)
+
+        return fetch_ranked(document_class, document_ids, search_filter, fields, limit)
+
+    def add(
+        self, document_class: type, documents: Sequence, document_ids: Sequence
+    ) -> None:
+        _, partition_field = search_index(document_class)
+        partitions: Dict[str, list] = {}
+
+        for document, document_id in zip(documents, document_ids):
+            partitions.setdefault(getattr(document, partition_field), []).append(
+                (document_id, document.get_vector())
+            )
+
+        for partition, items in partitions.items():
+            path = self.index_path(document_class, partition)
+
+            with file_lock(path):
+                index = HnswIndex(path).load()
+                index.add(
+                    [document_id for document_id, _ in items],
+                    np.stack([vector for _, vector in items]).astype(np.float32),
+                )
+                index.save()
+
+    def remove(
+        self, document_class: type, partition: str, document_ids: Sequence
+    ) -> None:
+        path = self.index_path(document_class, partition)
+        if not os.path.exists(path):
+            return
+
+        with file_lock(path):
+            index = HnswIndex(path).load()
+            if index.index is not None and index.remove(document_ids):
+                index.save()
+
+    def drop(self, document_class: type, partition: str) -> None:
+        path = self.index_path(document_class, partition)
+        if not os.path.exists(path):
+            return
+
+        with file_lock(path):
+            for stale_path in (path, HnswIndex(path).ids_path):
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+
+        with self._lock:
+            self._loaded.pop(path, None)
+
+    def rebuild(
+        self,
+        document_class: type,
+        partition: str,
+        document_ids: Sequence[ObjectId],
+        vectors: np.ndarray,
+    ) -> None:
+        """
+        Replace the index of a partition with the given vectors.
+
+        Args:
+            document_class (type): The Embedding or RecordingEmbedding model.
+            partition (str): The attachment content ID or the room ID.
+            document_ids (Sequence[ObjectId]): The document ID of each vector.
+            vectors (np.ndarray): The vectors as an (n, dim) float32 array.
+        """
+        path = self.index_path(document_class, partition)
+
+        with file_lock(path):
+            index = HnswIndex(path)
+            index.add(document_ids, vectors)
+            index.save()
@@ -19,6 +19,71 @@ class Config:
     - MONGODB_SETTINGS: dict
     - JWT_SECRET_KEY: str
     - FIREBASE_CREDENTIALS: str
+    - EMBEDDING_MODEL: str
+    - EMBEDDING_BATCH_SIZE: int
+    - EMBEDDING_MAX_CONCURRENCY: int
+    - EMBEDDING_MAX_RETRIES: int
+    - EMBEDDING_CACHE_ENABLED: bool
+    - EMBEDDING_CACHE_MAX_ENTRIES: int
+    - EMBEDDING_CACHE_TTL: int
+    - EMBEDDING_CACHE_LOCAL_MAX_ENTRIES: int
+    - EMBEDDING_STORAGE_FORMAT: str ("list", "float32" or "int8")
+    - INGESTION_INSERT_BATCH_SIZE: int
+    - CHUNKER: str ("structured" or "fixed")
+    - CHUNK_MAX_TOKENS: int
+    - CHUNK_OVERLAP_TOKENS: int
+    - CHUNK_DEDUPE: bool
+    - CLAIM_CHECK_UPLOADS: bool
+    - OBJECT_STORE_BACKEND: str
+    - PDF_PARALLEL_MODE: str ("chord", "process" or "off"; "process" needs a
+      worker pool whose children may start processes, such as solo or threads)
+    - PDF_PARALLEL_PAGE_THRESHOLD: int
+    - FRAME_THUMBNAIL_WIDTH: int
+    - FRAME_THUMBNAIL_HEIGHT: int
+    - FRAME_DECODE_WORKERS: int
+    - FRAME_DIFFERENCE_THRESHOLD: float
+    - FRAME_HASH_ALGORITHM: str ("dhash", "phash" or "off")
+    - FRAME_HASH_THRESHOLD: int
+    - IMAGE_CONTEXT_CACHE_ENABLED: bool
+    - IMAGE_CONTEXT_CACHE_TOLERANCE: int
+    - IMAGE_CONTEXT_CACHE_TTL: int
+    - VISION_MAX_CONCURRENCY: int
+    - VISION_TIMEOUT: float
+    - VISION_MAX_RETRIES: int
+    - VISION_MAX_IMAGE_SIZE: int
+    - VISION_IMAGE_FORMAT: str ("jpeg" or "webp")
+    - VISION_IMAGE_QUALITY: int
+    - VISION_CROP_CHROME: bool
+    - VISION_CHROME_MAX_FRACTION: float
+    - VISION_CHROME_MIN_SCENES: int
+    - FRAME_SESSION_TTL: int
+    - FRAME_SESSION_MAX_BATCH_SIZE: int
+    - FRAME_BATCH_MAX_FAILURES: int
+    - FRAME_BATCH_RETRY_DELAY: int
+    - FRAME_BATCH_MAX_WAIT: int
+    - VIDEO_SAMPLE_FPS: float
+    - VIDEO_FRAME_JPEG_QUALITY: int
+    - TRANSCRIPT_BLOCK_SIZE: int
+    - TRANSCRIPT_CHECKPOINT_TTL: int
+    - FRAME_SEQUENCE_RESERVATION_TTL: int
+    - VECTOR_SEARCH_BACKEND: str ("atlas" or "local")
+    - VECTOR_INDEX_DIR: str
+    - HNSW_M: int
+    - HNSW_EF_CONSTRUCTION: int
+    - HNSW_EF_SEARCH: int
+    - EXACT_SEARCH_MAX_VECTORS: int
+    - EXACT_INDEX_DIR: str
+    - ANSWER_CACHE_ENABLED: bool
+    - ANSWER_CACHE_THRESHOLD: float
+    - ANSWER_CACHE_TTL: int
+    - ANSWER_CACHE_MAX_ENTRIES: int
+    - CONTENT_PENDING_TIMEOUT: int
+    - CONVERSATION_TTL: int
+    - CONVERSATION_MAX_TURNS: int
+    - CONVERSATION_KEEP_TURNS: int
+    - WORKER_MONGO_MAX_POOL_SIZE: int
+    - WORKER_REDIS_MAX_CONNECTIONS: int
+    - WORKER_HTTP_POOL_SIZE: int
     """
 
     DEBUG = True
@@ -41,6 +106,90 @@ class Config:
     CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     SESSION_TYPE = os.getenv("SESSION_TYPE")
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+    EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+    EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true") == "true"
+    EMBEDDING_CACHE_MAX_ENTRIES = int(
+        os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000")
+    )
+    EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", str(30 * 24 * 3600)))
+    EMBEDDING_CACHE_LOCAL_MAX_ENTRIES = int(
+        os.getenv("EMBEDDING_CACHE_LOCAL_MAX_ENTRIES", "2048")
+    )
+    EMBEDDING_STORAGE_FORMAT = os.getenv("EMBEDDING_STORAGE_FORMAT", "list")
+    INGESTION_INSERT_BATCH_SIZE = int(os.getenv("INGESTION_INSERT_BATCH_SIZE", "200"))
+    CHUNKER = os.getenv("CHUNKER", "structured")
+    CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+    CHUNK_DEDUPE = os.getenv("CHUNK_DEDUPE", "true") == "true"
+    CHUNK_TOKEN_ENCODING = os.getenv("CHUNK_TOKEN_ENCODING", "cl100k_base")
+    AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+    CLAIM_CHECK_UPLOADS = os.getenv("CLAIM_CHECK_UPLOADS", "true") == "true"
+    OBJECT_STORE_BACKEND = os.getenv("OBJECT_STORE_BACKEND", "s3")
+    OBJECT_STORE_BUCKET = os.getenv("OBJECT_STORE_BUCKET", "eduhub-ai")
+    OBJECT_STORE_LOCAL_ROOT = os.getenv("OBJECT_STORE_LOCAL_ROOT", "object_store")
+    PDF_PARALLEL_MODE = os.getenv("PDF_PARALLEL_MODE", "chord")
+    PDF_PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "200"))
+    PDF_PAGES_PER_RANGE = int(os.getenv("PDF_PAGES_PER_RANGE", "50"))
+    PDF_PARALLEL_WORKERS = int(
+        os.getenv("PDF_PARALLEL_WORKERS", str(min(os.cpu_count() or 2, 4)))
+    )
+    FRAME_THUMBNAIL_WIDTH = int(os.getenv("FRAME_THUMBNAIL_WIDTH", "64"))
+    FRAME_THUMBNAIL_HEIGHT = int(os.getenv("FRAME_THUMBNAIL_HEIGHT", "36"))
+    FRAME_DECODE_WORKERS = int(os.getenv("FRAME_DECODE_WORKERS", "4"))
+    FRAME_DIFFERENCE_THRESHOLD = float(os.getenv("FRAME_DIFFERENCE_THRESHOLD", "0.0"))
+    FRAME_HASH_ALGORITHM = os.getenv("FRAME_HASH_ALGORITHM", "dhash")
+    FRAME_HASH_THRESHOLD = int(os.getenv("FRAME_HASH_THRESHOLD", "8"))
+    IMAGE_CONTEXT_CACHE_ENABLED = (
+        os.getenv("IMAGE_CONTEXT_CACHE_ENABLED", "true") == "true"
+    )
+    IMAGE_CONTEXT_CACHE_TOLERANCE = int(os.getenv("IMAGE_CONTEXT_CACHE_TOLERANCE", "4"))
+    IMAGE_CONTEXT_CACHE_TTL = int(
+        os.getenv("IMAGE_CONTEXT_CACHE_TTL", str(90 * 24 * 3600))
+    )
+    VISION_MAX_CONCURRENCY = int(os.getenv("VISION_MAX_CONCURRENCY", "8"))
+    VISION_TIMEOUT = float(os.getenv("VISION_TIMEOUT", "60"))
+    VISION_MAX_RETRIES = int(os.getenv("VISION_MAX_RETRIES", "2"))
+    VISION_MAX_IMAGE_SIZE = int(os.getenv("VISION_MAX_IMAGE_SIZE", "1024"))
+    VISION_IMAGE_FORMAT = os.getenv("VISION_IMAGE_FORMAT", "jpeg")
+    VISION_IMAGE_QUALITY = int(os.getenv("VISION_IMAGE_QUALITY", "85"))
+    VISION_CROP_CHROME = os.getenv("VISION_CROP_CHROME", "true") == "true"
+    VISION_CHROME_MAX_FRACTION = float(os.getenv("VISION_CHROME_MAX_FRACTION", "0.2"))
+    VISION_CHROME_MIN_SCENES = int(os.getenv("VISION_CHROME_MIN_SCENES", "5"))
+    FRAME_SESSION_TTL = int(os.getenv("FRAME_SESSION_TTL", str(6 * 3600)))
+    FRAME_SESSION_MAX_BATCH_SIZE = int(os.getenv("FRAME_SESSION_MAX_BATCH_SIZE", "50"))
+    FRAME_BATCH_MAX_FAILURES = int(os.getenv("FRAME_BATCH_MAX_FAILURES", "5"))
+    FRAME_BATCH_RETRY_DELAY = int(os.getenv("FRAME_BATCH_RETRY_DELAY", "5"))
+    FRAME_BATCH_MAX_WAIT = int(os.getenv("FRAME_BATCH_MAX_WAIT", "600"))
+    VIDEO_SAMPLE_FPS = float(os.getenv("VIDEO_SAMPLE_FPS", "1.0"))
+    VIDEO_FRAME_JPEG_QUALITY = int(os.getenv("VIDEO_FRAME_JPEG_QUALITY", "90"))
+    TRANSCRIPT_BLOCK_SIZE = int(os.getenv("TRANSCRIPT_BLOCK_SIZE", "8192"))
+    TRANSCRIPT_CHECKPOINT_TTL = int(
+        os.getenv("TRANSCRIPT_CHECKPOINT_TTL", str(7 * 24 * 3600))
+    )
+    FRAME_SEQUENCE_RESERVATION_TTL = int(
+        os.getenv("FRAME_SEQUENCE_RESERVATION_TTL", str(7 * 24 * 3600))
+    )
+    VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "atlas")
+    VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_indexes")
+    HNSW_M = int(os.getenv("HNSW_M", "16"))
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    EXACT_SEARCH_MAX_VECTORS = int(os.getenv("EXACT_SEARCH_MAX_VECTORS", "1000"))
+    EXACT_INDEX_DIR = os.getenv("EXACT_INDEX_DIR", "vector_cache")
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true") == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+    CONTENT_PENDING_TIMEOUT = int(os.getenv("CONTENT_PENDING_TIMEOUT", "900"))
+    CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "3600"))
+    CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "12"))
+    CONVERSATION_KEEP_TURNS = int(os.getenv("CONVERSATION_KEEP_TURNS", "4"))
+    WORKER_MONGO_MAX_POOL_SIZE = int(os.getenv("WORKER_MONGO_MAX_POOL_SIZE", "10"))
+    WORKER_REDIS_MAX_CONNECTIONS = int(os.getenv("WORKER_REDIS_MAX_CONNECTIONS", "20"))
+    WORKER_HTTP_POOL_SIZE = int(os.getenv("WORKER_HTTP_POOL_SIZE", "10"))
 
 
 class TestConfig:
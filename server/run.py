@@ -23,11 +23,23 @@ from app.sockets.group_chat_sockets import (
 from app.sockets.assignment_sockets import (
     generate_assignment,
 )
-from app.celery.tasks.post_tasks import process_uploaded_file
+from app.sockets.chat_sockets import (
+    chat_with_material,
+)
+from app.celery.tasks.post_tasks import (
+    process_uploaded_file,
+    extract_pdf_page_range,
+    process_extracted_pdf_pages,
+)
 from app.celery.tasks.recording_tasks import (
     process_image_files,
+    process_frame_batch,
+    process_recording_video,
     process_recording_webhook,
 )
+from app.celery.tasks.chat_tasks import (
+    compact_conversation,
+)
 from app.celery.tasks.assignment_tasks import (
     process_assignment_generation,
     process_assignment_changes,
@@ -56,11 +68,17 @@ socketio.on_event("join-hub", handle_join_hub)
 socketio.on_event("leave-hub", handle_leave_hub)
 socketio.on_event("send-message", handle_send_message)
 socketio.on_event("generate-assignment", generate_assignment)
+socketio.on_event("chat-with-material", chat_with_material)
 
 
 celery_instance.register_task(process_uploaded_file)
+celery_instance.register_task(extract_pdf_page_range)
+celery_instance.register_task(process_extracted_pdf_pages)
 celery_instance.register_task(process_image_files)
+celery_instance.register_task(process_frame_batch)
+celery_instance.register_task(process_recording_video)
 celery_instance.register_task(process_recording_webhook)
+celery_instance.register_task(compact_conversation)
 celery_instance.register_task(process_assignment_generation)
 celery_instance.register_task(process_assignment_changes)
 celery_instance.register_task(process_create_assignment_using_ai)
@@ -0,0 +1,231 @@
+"""
+Unit tests for the text extraction helpers of the post tasks.
+"""
+
+import io
+import docx
+import fakeredis
+import fitz
+import mongomock
+import pptx
+import pytest
+from mongoengine import connect, disconnect
+from app.celery.tasks import post_tasks
+from app.celery.tasks.post_tasks import extract_text_from_pdf, iter_page_ranges
+from app.ingestion import chunking
+from app.ingestion.chunking import StructuredChunker
+from app.storage.object_store import LocalObjectStore
+
+
+@pytest.fixture(scope="module")
+def pdf_bytes():
+    """
+    Fixture providing a PDF with one line of text on each of its 12 pages.
+    """
+    document = fitz.open()
+    for page_number in range(12):
+        page = document.new_page()
+        page.insert_text((72, 72), f"Page number {page_number}")
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def test_iter_page_ranges():
+    """
+    Test that pages are split into consecutive ranges covering the document.
+    """
+    assert list(iter_page_ranges(7, 3)) == [(0, 3), (3, 6), (6, 7)]
+    assert not list(iter_page_ranges(0, 3))
+
+
+def test_parallel_extraction_matches_serial_extraction(pdf_bytes, monkeypatch):
+    """
+    Test that the process pool extraction yields the pages in order.
+    """
+    monkeypatch.setattr(post_tasks.Config, "PDF_PARALLEL_MODE", "off")
+    serial_pages = list(extract_text_from_pdf(pdf_bytes))
+
+    monkeypatch.setattr(post_tasks.Config, "PDF_PARALLEL_MODE", "process")
+    monkeypatch.setattr(post_tasks.Config, "PDF_PARALLEL_PAGE_THRESHOLD", 5)
+    monkeypatch.setattr(post_tasks.Config, "PDF_PAGES_PER_RANGE", 5)
+    monkeypatch.setattr(post_tasks.Config, "PDF_PARALLEL_WORKERS", 2)
+    parallel_pages = list(extract_text_from_pdf(pdf_bytes))
+
+    assert len(serial_pages) == 12
+    assert parallel_pages == serial_pages
+    assert "Page number 11" in parallel_pages[-1]
+
+
+def test_daemonic_process_extracts_serially(pdf_bytes, monkeypatch):
+    """
+    Test that a daemonic worker process falls back to serial extraction instead
+    of starting a process pool.
+    """
+
+    def no_process_pool(*args, **kwargs):
+        raise AssertionError("daemonic processes are not allowed to have children")
+
+    monkeypatch.setattr(post_tasks.Config, "PDF_PARALLEL_MODE", "process")
+    monkeypatch.setattr(post_tasks.Config, "PDF_PARALLEL_PAGE_THRESHOLD", 5)
+    monkeypatch.setattr(post_tasks, "in_daemonic_process", lambda: True)
+    monkeypatch.setattr(post_tasks, "ProcessPoolExecutor", no_process_pool)
+
+    pages = list(extract_text_from_pdf(pdf_bytes))
+
+    assert len(pages) == 12
+    assert "Page number 11" in pages[-1]
+
+
+class WordEncoding:
+    """
+    Stand-in for a tiktoken encoding counting one token per word.
+    """
+
+    @staticmethod
+    def encode(text):
+        return text.split()
+
+    @staticmethod
+    def decode(tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(scope="function")
+def ingested_chunks(monkeypatch):
+    """
+    Fixture collecting the chunks that `process_uploaded_file` would embed, with
+    the structured chunker counting words as tokens.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    chunks = []
+    monkeypatch.setattr(post_tasks.Config, "CHUNKER", "structured")
+    monkeypatch.setattr(post_tasks.Config, "REDIS_CLIENT", fakeredis.FakeRedis())
+    monkeypatch.setattr(chunking, "_chunkers", {})
+    monkeypatch.setattr(StructuredChunker, "encoding", WordEncoding())
+    monkeypatch.setattr(
+        post_tasks,
+        "ingest_chunks",
+        lambda **kwargs: chunks.extend(kwargs["chunks"]),
+    )
+    yield chunks
+    disconnect(alias="default")
+
+
+def test_docx_paragraphs_are_not_stripped_as_page_edges(ingested_chunks):
+    """
+    Test that numbered DOCX paragraphs are all ingested.
+    """
+    paragraphs = [
+        "Question 1",
+        "What is 2 + 2?",
+        "Answer: 4",
+        "Question 2",
+        "What is 3 + 5?",
+        "Answer: 8",
+        "Step 1: mix the flour.",
+        "Step 2: add the water.",
+    ]
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    data = io.BytesIO()
+    document.save(data)
+
+    post_tasks.process_uploaded_file(
+        data.getvalue(), "notes.docx", "hub", "post", "attachment"
+    )
+
+    text = " ".join(ingested_chunks)
+    for paragraph in paragraphs:
+        assert paragraph in text
+
+
+def test_pptx_slides_are_not_stripped_as_page_edges(ingested_chunks):
+    """
+    Test that slide lines differing only in numbers are all ingested.
+    """
+    slides = [
+        ("Glycolysis", "Outputs: 2 ATP"),
+        ("Krebs cycle", "Outputs: 2 ATP"),
+        ("Electron transport chain", "Outputs: 36 ATP"),
+    ]
+    presentation = pptx.Presentation()
+    for title, body in slides:
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = title
+        slide.placeholders[1].text = body
+    data = io.BytesIO()
+    presentation.save(data)
+
+    post_tasks.process_uploaded_file(
+        data.getvalue(), "slides.pptx", "hub", "post", "attachment"
+    )
+
+    text = " ".join(ingested_chunks)
+    assert "Outputs: 36 ATP" in text
+    assert "Electron transport chain" in text
+
+
+def test_chord_page_texts_go_through_the_object_store(
+    pdf_bytes, ingested_chunks, tmp_path, monkeypatch
+):
+    """
+    Test that page-range subtasks hand their page texts to the chord callback
+    through the object store, which deletes them once ingested.
+    """
+    object_store = LocalObjectStore(root=str(tmp_path))
+    object_store.put("uploads/doc.pdf", io.BytesIO(pdf_bytes))
+    monkeypatch.setattr(post_tasks, "get_object_store", lambda: object_store)
+
+    page_range_keys = [
+        post_tasks.extract_pdf_page_range("uploads/doc.pdf", start, end)
+        for start, end in iter_page_ranges(12, 5)
+    ]
+    assert all(isinstance(pages_key, str) for pages_key in page_range_keys)
+
+    post_tasks.process_extracted_pdf_pages(page_range_keys, "hub", "post", "doc")
+
+    text = " ".join(ingested_chunks)
+    assert "Page number 0" in text and "Page number 11" in text
+    for pages_key in page_range_keys:
+        with pytest.raises(FileNotFoundError):
+            object_store.read(pages_key)
+
+
+def test_large_pdf_upload_is_replaced_by_the_chord(
+    pdf_bytes, ingested_chunks, tmp_path, monkeypatch
+):
+    """
+    Test that in chord mode the upload task is replaced by the chord, so its
+    completion is reported once the pages are ingested.
+    """
+    object_store = LocalObjectStore(root=str(tmp_path))
+    object_store.put("uploads/doc.pdf", io.BytesIO(pdf_bytes))
+    monkeypatch.setattr(post_tasks, "get_object_store", lambda: object_store)
+    monkeypatch.setattr(post_tasks.Config, "PDF_PARALLEL_MODE", "chord")
+    monkeypatch.setattr(post_tasks.Config, "PDF_PARALLEL_PAGE_THRESHOLD", 5)
+    monkeypatch.setattr(post_tasks.Config, "PDF_PAGES_PER_RANGE", 5)
+    replacements = []
+
+    def replace(signature):
+        replacements.append(signature)
+        raise post_tasks.Ignore()
+
+    monkeypatch.setattr(post_tasks.process_uploaded_file, "replace", replace)
+
+    with pytest.raises(post_tasks.Ignore):
+        post_tasks.process_uploaded_file(
+            None, "doc.pdf", "hub", "post", "doc", "uploads/doc.pdf"
+        )
+
+    (replacement,) = replacements
+    assert len(replacement.tasks) == 3
+    assert replacement.body.task == post_tasks.process_extracted_pdf_pages.name
+    assert not ingested_chunks
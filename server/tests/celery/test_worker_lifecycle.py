@@ -0,0 +1,67 @@
+"""
+Unit tests for the per-process lifecycle of the Celery worker clients.
+"""
+
+import fakeredis
+import pytest
+import requests
+from app.celery import worker_lifecycle
+from app.celery.worker_lifecycle import (
+    ConnectionCounter,
+    WorkerResources,
+    get_worker_connection_counts,
+    get_worker_resources,
+)
+from config.config import Config
+
+
+@pytest.fixture(scope="function")
+def connect_calls(monkeypatch):
+    """
+    Fixture replacing the MongoDB connection with a recorder and resetting the
+    clients of the process.
+    """
+    calls = []
+    monkeypatch.setattr(
+        worker_lifecycle, "connect", lambda **kwargs: calls.append(kwargs)
+    )
+    monkeypatch.setattr(worker_lifecycle, "disconnect", lambda **kwargs: None)
+    monkeypatch.setattr(worker_lifecycle, "_resources", None)
+    monkeypatch.setattr(Config, "REDIS_CLIENT", Config.REDIS_CLIENT)
+    return calls
+
+
+def test_clients_are_created_once_per_process(connect_calls):
+    """
+    Test that the clients are created on first use and reused by later tasks.
+    """
+    first = get_worker_resources()
+    second = get_worker_resources()
+
+    assert first is second
+    assert len(connect_calls) == 1
+    assert connect_calls[0]["maxPoolSize"] == Config.WORKER_MONGO_MAX_POOL_SIZE
+    assert Config.REDIS_CLIENT is first.redis_client
+
+
+def test_record_connection_counts():
+    """
+    Test that the connection counts of a process are published to Redis.
+    """
+    redis_client = fakeredis.FakeRedis()
+    counter = ConnectionCounter()
+    resources = WorkerResources(redis_client, requests.Session(), counter)
+    counter.increment("mongo_opened", 2)
+    counter.increment("tasks")
+
+    resources.record_connection_counts()
+
+    assert get_worker_connection_counts(redis_client) == {
+        resources.worker_name: {
+            "mongo_opened": 2,
+            "mongo_closed": 0,
+            "redis_opened": 0,
+            "http_opened": 0,
+            "tasks": 1,
+        }
+    }
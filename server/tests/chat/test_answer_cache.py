@@ -0,0 +1,117 @@
+"""
+Unit tests for the semantic answer cache.
+"""
+
+import fakeredis
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from app.chat import SemanticAnswerCache, answer_cache_stats, build_chat_prompt
+from app.models.embedding import Embedding
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    yield
+    disconnect(alias="default")
+
+
+def insert_chunk(text_content="chunk"):
+    """
+    Insert a chunk of an attachment and return its ID.
+    """
+    return (
+        Embedding(
+            hub_id="hub",
+            post_id="post",
+            attachment_id="attachment",
+            batch_no=0,
+            text_content=text_content,
+            embeddings=[1.0, 0.0, 0.0],
+        )
+        .save()
+        .id
+    )
+
+
+def test_similar_query_hits(setup_teardown):
+    """
+    Test that a query close enough to a cached one returns its answer.
+    """
+    redis_client = fakeredis.FakeRedis()
+    cache = SemanticAnswerCache(
+        redis_client, Embedding, "attachment", 1, threshold=0.95
+    )
+    cache.set("what is it?", [1.0, 0.0, 0.0], "an answer", [insert_chunk()], 2.0)
+
+    assert cache.get([0.99, 0.05, 0.0]) == "an answer"
+    assert cache.get([0.0, 1.0, 0.0]) is None
+
+    stats = answer_cache_stats(redis_client)
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert 0.0 < stats["seconds_saved"] <= 2.0
+
+
+def test_new_embeddings_start_an_empty_scope(setup_teardown):
+    """
+    Test that answers are not reused once the corpus of the attachment changed.
+    """
+    redis_client = fakeredis.FakeRedis()
+    cache = SemanticAnswerCache(redis_client, Embedding, "attachment", 1)
+    cache.set("what is it?", [1.0, 0.0, 0.0], "an answer", [insert_chunk()], 1.0)
+
+    grown = SemanticAnswerCache(redis_client, Embedding, "attachment", 2)
+
+    assert grown.get([1.0, 0.0, 0.0]) is None
+    assert redis_client.ttl(cache.answers_key) > 0
+
+
+def test_deleted_source_invalidates_answer(setup_teardown):
+    """
+    Test that an answer is dropped when one of its source chunks was deleted.
+    """
+    redis_client = fakeredis.FakeRedis()
+    chunk_id = insert_chunk()
+    cache = SemanticAnswerCache(redis_client, Embedding, "attachment", 1)
+    cache.set("what is it?", [1.0, 0.0, 0.0], "an answer", [chunk_id], 1.0)
+
+    Embedding.objects(id=chunk_id).delete()
+
+    assert cache.get([1.0, 0.0, 0.0]) is None
+    assert redis_client.hlen(cache.answers_key) == 0
+
+
+def test_oldest_entries_are_evicted(setup_teardown):
+    """
+    Test that a scope keeps at most `max_entries` answers, dropping the oldest.
+    """
+    redis_client = fakeredis.FakeRedis()
+    cache = SemanticAnswerCache(redis_client, Embedding, "attachment", 1, max_entries=2)
+    for index, vector in enumerate(([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0])):
+        cache.set(f"query {index}", vector, f"answer {index}", [], 1.0)
+
+    assert redis_client.hlen(cache.vectors_key) == 2
+    assert cache.get([1.0, 0.0, 0.0]) is None
+    assert cache.get([0.0, 0.0, 1.0]) == "answer 2"
+
+
+def test_prompt_is_truncated():
+    """
+    Test that the chat prompt holds the question and is capped in length.
+    """
+    prompt = build_chat_prompt("why?", "x" * 30000, "none")
+
+    assert "Question: why?" in prompt
+    assert len(prompt) == 25000
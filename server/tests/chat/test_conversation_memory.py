@@ -0,0 +1,119 @@
+"""
+Unit tests for the per-user conversation memory.
+"""
+
+import fakeredis
+from flask import Flask, request
+from app.chat import conversation_memory
+from app.chat.conversation_memory import (
+    NO_CONVERSATION,
+    ConversationMemory,
+    conversation_user,
+    delete_conversations,
+)
+
+
+def test_turns_are_kept_per_user():
+    """
+    Test that the users of an attachment do not share their conversations.
+    """
+    redis_client = fakeredis.FakeRedis()
+    alice = ConversationMemory(redis_client, "attachment_id_1", "alice@example.com")
+    bob = ConversationMemory(redis_client, "attachment_id_1", "bob@example.com")
+
+    alice.append("first?", "one")
+    alice.append("second?", "two")
+
+    assert alice.render() == "user: first?\nmodel: one\nuser: second?\nmodel: two\n"
+    assert bob.render() == NO_CONVERSATION
+    assert redis_client.ttl(alice.turns_key) > 0
+
+
+def test_append_schedules_one_compaction(monkeypatch):
+    """
+    Test that exceeding the maximum number of turns schedules a single compaction.
+    """
+    scheduled = []
+    monkeypatch.setattr(
+        "app.celery.tasks.chat_tasks.compact_conversation.delay",
+        lambda scope, user: scheduled.append((scope, user)),
+    )
+    memory = ConversationMemory(
+        fakeredis.FakeRedis(), "room_id_1", "alice", max_turns=2, keep_turns=1
+    )
+
+    for index in range(4):
+        memory.append(f"question {index}", f"answer {index}")
+
+    assert scheduled == [("room_id_1", "alice")]
+
+
+def test_compact_folds_old_turns_into_summary():
+    """
+    Test that compaction summarizes all but the recent turns and releases its lock.
+    """
+    redis_client = fakeredis.FakeRedis()
+    memory = ConversationMemory(
+        redis_client, "room_id_1", "alice", max_turns=10, keep_turns=1
+    )
+    for index in range(3):
+        memory.append(f"question {index}", f"answer {index}")
+    redis_client.set(memory.compaction_key, 1)
+    folded = []
+
+    def summarize(summary, turns):
+        folded.append((summary, turns))
+        return "asked two questions"
+
+    memory.compact(summarize)
+
+    assert folded == [
+        ("", "user: question 0\nmodel: answer 0\nuser: question 1\nmodel: answer 1\n")
+    ]
+    assert memory.render() == (
+        "Summary of the earlier conversation: asked two questions\n"
+        "user: question 2\nmodel: answer 2\n"
+    )
+    assert not redis_client.exists(memory.compaction_key)
+
+
+def test_render_is_bounded(monkeypatch):
+    """
+    Test that the rendered conversation keeps only its most recent characters.
+    """
+    monkeypatch.setattr(conversation_memory, "MAX_CONVERSATION_LENGTH", 20)
+    memory = ConversationMemory(fakeredis.FakeRedis(), "room_id_1", "alice")
+    memory.append("a long question", "a long answer")
+
+    assert memory.render() == "model: a long answer\n"[-20:]
+
+
+def test_delete_conversations_of_a_scope():
+    """
+    Test that deleting an attachment's conversations keeps those of other scopes.
+    """
+    redis_client = fakeredis.FakeRedis()
+    ConversationMemory(redis_client, "attachment_id_1", "alice").append("q", "a")
+    ConversationMemory(redis_client, "attachment_id_1", "bob").append("q", "a")
+    other = ConversationMemory(redis_client, "attachment_id_2", "alice")
+    other.append("q", "a")
+
+    delete_conversations(redis_client, "attachment_id_1")
+
+    assert redis_client.keys("conversation:*") == [other.turns_key.encode("utf-8")]
+
+
+def test_conversation_user_is_the_verified_user():
+    """
+    Test that only a verified Firebase token identifies the user, never an email
+    sent by the client.
+    """
+    app = Flask(__name__)
+
+    with app.test_request_context("/?email=query@example.com"):
+        assert conversation_user() is None
+        assert conversation_user({"uid": "socket-uid"}) == "socket-uid"
+
+    with app.test_request_context("/?email=query@example.com"):
+        request.current_user = {"email": "token@example.com", "uid": "uid"}
+        assert conversation_user() == "uid"
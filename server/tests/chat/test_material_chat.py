@@ -0,0 +1,119 @@
+"""
+Unit tests for the shared flow of chat with material.
+"""
+
+from types import SimpleNamespace
+import fakeredis
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from app.chat import material_chat
+from app.chat.material_chat import (
+    AttachmentNotProcessedError,
+    MaterialChat,
+    stream_answer,
+)
+from app.models.embedding import Embedding
+from app.vector_search.backend import get_vector_search_backend
+
+
+@pytest.fixture(scope="function")
+def setup_teardown(monkeypatch, tmp_path):
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    monkeypatch.setattr(
+        get_vector_search_backend("exact"), "root", str(tmp_path / "vector_cache")
+    )
+    monkeypatch.setattr(
+        material_chat, "extract_text_embedding", lambda query: [1.0, 0.0, 0.0]
+    )
+    yield
+    disconnect(alias="default")
+
+
+class FakeModel:
+    """
+    A generative model answering with fixed parts.
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False):
+        """
+        Return the parts as stream chunks, or as a single response.
+        """
+        self.prompts.append(prompt)
+        if not stream:
+            return SimpleNamespace(text="".join(self.parts))
+        return iter(SimpleNamespace(parts=[part], text=part) for part in self.parts)
+
+
+def test_stream_answer_yields_parts_and_logs_first_token(monkeypatch, capsys):
+    """
+    Test that the streamed answer is yielded part by part and its time to first
+    token is logged once.
+    """
+    model = FakeModel(["Hello", ", ", "world"])
+    monkeypatch.setattr(material_chat.genai, "GenerativeModel", lambda name: model)
+
+    assert list(stream_answer("prompt", label="test")) == ["Hello", ", ", "world"]
+    assert capsys.readouterr().out.count("test: time to first token") == 1
+
+
+def test_remember_appends_turn_and_caches_answer(setup_teardown):
+    """
+    Test that a generated answer is appended to the conversation and cached.
+    """
+    redis_client = fakeredis.FakeRedis()
+    Embedding(
+        hub_id="hub",
+        post_id="post",
+        attachment_id="attachment",
+        batch_no=0,
+        text_content="the material",
+        embeddings=[1.0, 0.0, 0.0],
+    ).save()
+    redis_client.set("attachment_id_attachment_number_of_embeddings", 1)
+
+    chat = MaterialChat(redis_client, "attachment", "what is it?", "a@b.c")
+    assert chat.cached_answer() is None
+    assert "Retrieved Context: the material" in chat.build_prompt()
+    chat.remember("an answer")
+
+    assert chat.memory.render() == "user: what is it?\nmodel: an answer\n"
+    assert MaterialChat(
+        redis_client, "attachment", "what is it?", "a@b.c"
+    ).cached_answer() == ("an answer")
+
+
+def test_unverified_user_is_not_remembered(setup_teardown):
+    """
+    Test that the conversation of a question without a verified user is not kept.
+    """
+    redis_client = fakeredis.FakeRedis()
+    redis_client.set("attachment_id_attachment_number_of_embeddings", 1)
+
+    chat = MaterialChat(redis_client, "attachment", "what is it?", None)
+    chat.remember("an answer")
+
+    assert chat.memory is None
+    assert not redis_client.keys("conversation:*")
+
+
+def test_unprocessed_attachment_raises(setup_teardown):
+    """
+    Test that a question about an attachment without embeddings yet raises a
+    dedicated error rather than failing on the missing counter.
+    """
+    with pytest.raises(AttachmentNotProcessedError):
+        MaterialChat(fakeredis.FakeRedis(), "attachment", "what is it?", "uid")
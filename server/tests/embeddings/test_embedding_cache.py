@@ -0,0 +1,87 @@
+"""
+Unit tests for the content-addressed embedding cache.
+"""
+
+import fakeredis
+import pytest
+from app.embeddings import embedding_client
+from app.embeddings.embedding_cache import EmbeddingCache
+from app.embeddings.embedding_client import EmbeddingClient
+
+
+@pytest.fixture(scope="function")
+def redis_client():
+    """
+    Fixture providing an in-memory Redis client.
+    """
+    return fakeredis.FakeRedis()
+
+
+def test_make_hash_depends_on_model_task_type_and_text():
+    """
+    Test that the content hash changes with each of its inputs.
+    """
+    base = EmbeddingCache.make_hash("model", "task", "text")
+
+    assert base == EmbeddingCache.make_hash("model", "task", "text")
+    assert base != EmbeddingCache.make_hash("other", "task", "text")
+    assert base != EmbeddingCache.make_hash("model", "other", "text")
+    assert base != EmbeddingCache.make_hash("model", "task", "other")
+
+
+def test_get_many_returns_hits_and_counts_misses(redis_client):
+    """
+    Test that cached vectors are returned and the counters are updated.
+    """
+    cache = EmbeddingCache(redis_client, local_max_entries=0)
+    cache.set_many({"a": [0.5, 0.25]})
+
+    assert cache.get_many(["a", "b"]) == [[0.5, 0.25], None]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(redis_client):
+    """
+    Test that the Redis tier keeps at most `max_entries` entries.
+    """
+    cache = EmbeddingCache(redis_client, max_entries=2, local_max_entries=0)
+    cache.set_many({"a": [1.0]})
+    cache.set_many({"b": [2.0]})
+    cache.get_many(["a"])
+    cache.set_many({"c": [3.0]})
+
+    assert cache.get_many(["a", "b", "c"]) == [[1.0], None, [3.0]]
+
+
+def test_local_tier_serves_repeated_lookups(redis_client):
+    """
+    Test that the in-process tier answers lookups without Redis entries.
+    """
+    cache = EmbeddingCache(redis_client, local_max_entries=8)
+    cache.set_many({"a": [1.0]})
+    redis_client.delete(cache.entry_key("a"))
+
+    assert cache.get_many(["a"]) == [[1.0]]
+    assert cache.stats()["local_hits"] == 1
+
+
+def test_client_only_embeds_cache_misses(redis_client, monkeypatch):
+    """
+    Test that the embedding client skips chunks already present in the cache.
+    """
+    requested = []
+
+    def fake_embed_content(model, content, task_type):
+        requested.extend(content)
+        return {"embedding": [[float(len(text))] for text in content]}
+
+    monkeypatch.setattr(embedding_client.genai, "embed_content", fake_embed_content)
+    client = EmbeddingClient(cache=EmbeddingCache(redis_client), batch_size=10)
+
+    assert client.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+    assert client.embed_documents(["bb", "ccc"]) == [[2.0], [3.0]]
+    assert requested == ["a", "bb", "ccc"]
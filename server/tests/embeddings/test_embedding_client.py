@@ -0,0 +1,92 @@
+"""
+Unit tests for the batched embedding client.
+"""
+
+import threading
+import pytest
+from app.embeddings import embedding_client
+from app.embeddings.embedding_client import EmbeddingClient
+
+
+class FakeEmbedContent:
+    """
+    Stand-in for `genai.embed_content` that records every batch request.
+    """
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, model, content, task_type):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.batches.append(list(content))
+            should_fail = self.failures > 0
+            if should_fail:
+                self.failures -= 1
+
+        try:
+            if should_fail:
+                raise RuntimeError("transient error")
+            return {"embedding": [[float(len(text))] for text in content]}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture(scope="function")
+def fake_embed_content(monkeypatch):
+    """
+    Fixture replacing the Gemini embedding call with a recording fake.
+    """
+    fake = FakeEmbedContent()
+    monkeypatch.setattr(embedding_client.genai, "embed_content", fake)
+    return fake
+
+
+def test_embed_documents_batches_and_preserves_order(fake_embed_content):
+    """
+    Test that chunks are grouped into batches and results keep the input order.
+    """
+    client = EmbeddingClient(batch_size=3, max_concurrency=2)
+    chunks = ["a" * length for length in range(1, 8)]
+
+    embeddings = client.embed_documents(chunks)
+
+    assert embeddings == [[float(length)] for length in range(1, 8)]
+    assert sorted(len(batch) for batch in fake_embed_content.batches) == [1, 3, 3]
+    assert fake_embed_content.max_in_flight <= 2
+
+
+def test_embed_batch_retries_transient_failures(fake_embed_content):
+    """
+    Test that a failed batch is retried before succeeding.
+    """
+    fake_embed_content.failures = 2
+    client = EmbeddingClient(batch_size=10, max_retries=2, retry_backoff=0)
+
+    assert client.embed_documents(["abc"]) == [[3.0]]
+    assert len(fake_embed_content.batches) == 3
+
+
+def test_embed_batch_raises_after_retries(fake_embed_content):
+    """
+    Test that the error is propagated once all retries are exhausted.
+    """
+    fake_embed_content.failures = 5
+    client = EmbeddingClient(batch_size=10, max_retries=1, retry_backoff=0)
+
+    with pytest.raises(RuntimeError):
+        client.embed_query("abc")
+
+
+def test_invalid_batch_size():
+    """
+    Test that a batch size below one is rejected.
+    """
+    with pytest.raises(ValueError):
+        EmbeddingClient(batch_size=0)
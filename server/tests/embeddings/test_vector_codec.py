@@ -0,0 +1,104 @@
+"""
+Unit tests for the compact binary vector representation.
+"""
+
+import mongomock
+import numpy as np
+import pytest
+from mongoengine import connect, disconnect
+from app.commands import migrate_collection_embeddings
+from app.embeddings.vector_codec import decode_vector, encode_vector, vector_fields
+from app.models.embedding import Embedding
+
+
+@pytest.fixture(scope="function")
+def setup_teardown(request):
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+
+    def teardown():
+        disconnect(alias="default")
+
+    request.addfinalizer(teardown)
+
+
+def test_float32_round_trip_is_zero_copy():
+    """
+    Test that float32 vectors decode to a view over the stored bytes.
+    """
+    packed = encode_vector([0.5, -0.25, 1.0], "float32")
+
+    assert packed.subtype == 9
+    assert len(packed) == 2 + 3 * 4
+
+    vector = decode_vector(packed)
+    assert vector.dtype == np.float32
+    assert vector.tolist() == [0.5, -0.25, 1.0]
+    assert not vector.flags.owndata
+
+
+def test_int8_round_trip_is_close():
+    """
+    Test that int8 vectors are quantized to within one step.
+    """
+    original = np.array([0.1, -0.7, 0.33, 1.0])
+    vector = decode_vector(encode_vector(original, "int8"))
+
+    assert len(encode_vector(original, "int8")) == 2 + 4
+    assert np.allclose(vector, original, atol=1 / 127)
+
+
+def test_unsupported_format():
+    """
+    Test that unknown formats are rejected.
+    """
+    with pytest.raises(ValueError):
+        encode_vector([1.0], "float64")
+
+
+def test_compact_embedding_document(setup_teardown):
+    """
+    Test that an Embedding can be stored and read back in compact form.
+    """
+    Embedding(
+        hub_id="hub",
+        post_id="post",
+        attachment_id="attachment",
+        batch_no=1,
+        text_content="text",
+        **vector_fields([0.25, 0.5], "float32"),
+    ).save()
+
+    embedding = Embedding.objects(attachment_id="attachment").first()
+
+    assert not embedding.embeddings
+    assert embedding.get_vector().tolist() == [0.25, 0.5]
+
+
+def test_migrate_collection_embeddings(setup_teardown):
+    """
+    Test that the migration converts list vectors to compact vectors.
+    """
+    Embedding(
+        hub_id="hub",
+        post_id="post",
+        attachment_id="attachment",
+        batch_no=1,
+        text_content="text",
+        embeddings=[0.25, 0.5],
+    ).save()
+
+    assert migrate_collection_embeddings(Embedding, "float32", 10, False) == 1
+
+    embedding = Embedding.objects(attachment_id="attachment").first()
+    assert not embedding.embeddings
+    assert embedding.get_vector().tolist() == [0.25, 0.5]
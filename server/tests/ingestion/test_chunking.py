@@ -0,0 +1,141 @@
+"""
+Unit tests for the structured chunker.
+"""
+
+import pytest
+from app.ingestion.chunking import StructuredChunker, get_chunker
+from app.ingestion.pipeline import iter_fixed_size_chunks
+
+
+class WordEncoding:
+    """
+    Stand-in for a tiktoken encoding counting one token per word.
+    """
+
+    @staticmethod
+    def encode(text):
+        return text.split()
+
+    @staticmethod
+    def decode(tokens):
+        return " ".join(tokens)
+
+
+def make_chunker(**kwargs):
+    """
+    Build a StructuredChunker counting words as tokens.
+    """
+    return StructuredChunker(encoding=WordEncoding(), **kwargs)
+
+
+def test_chunks_end_on_sentence_boundaries():
+    """
+    Test that sentences are never cut and chunks respect the token budget.
+    """
+    chunker = make_chunker(max_tokens=8, overlap_tokens=0)
+    text = "One two three four. Five six seven. Eight nine ten eleven twelve."
+
+    assert list(chunker([text])) == [
+        "One two three four. Five six seven.",
+        "Eight nine ten eleven twelve.",
+    ]
+
+
+def test_overlap_repeats_trailing_sentences():
+    """
+    Test that the last sentences of a chunk start the next chunk.
+    """
+    chunker = make_chunker(max_tokens=6, overlap_tokens=2)
+    text = "Alpha beta gamma. Delta epsilon. Zeta eta theta."
+
+    assert list(chunker([text])) == [
+        "Alpha beta gamma. Delta epsilon.",
+        "Delta epsilon. Zeta eta theta.",
+    ]
+
+
+def test_heading_starts_new_chunk():
+    """
+    Test that a heading starts a new chunk once the current chunk is large enough.
+    """
+    chunker = make_chunker(max_tokens=20, overlap_tokens=0)
+    text = "INTRODUCTION\nFirst part of the text here.\n\n2. Methods\nSecond part."
+
+    assert list(chunker([text])) == [
+        "INTRODUCTION First part of the text here.",
+        "2. Methods Second part.",
+    ]
+
+
+def test_long_sentence_is_split_by_tokens():
+    """
+    Test that a sentence longer than the budget is split into token windows.
+    """
+    chunker = make_chunker(max_tokens=3, overlap_tokens=0)
+
+    assert list(chunker(["a b c d e f g"])) == ["a b c", "d e f", "g"]
+
+
+def test_repeated_headers_and_footers_are_dropped():
+    """
+    Test that page headers, footers and page numbers are only embedded once.
+    """
+    chunker = make_chunker(max_tokens=50, overlap_tokens=0, edge_lines=1)
+    topics = ["Vectors", "Matrices", "Tensors"]
+    pages = [
+        f"Course Notes\nContent of page {page}.\nCovers {topic}.\n{page}"
+        for page, topic in enumerate(topics, 1)
+    ]
+
+    chunk = " ".join(chunker(pages))
+
+    assert chunk.count("Course Notes") == 1
+    assert chunk.count("Content of page") == 3
+
+
+def test_near_duplicate_chunks_are_dropped():
+    """
+    Test that chunks differing only in slide numbers and punctuation are embedded once.
+    """
+    chunker = make_chunker(max_tokens=5, overlap_tokens=0)
+
+    assert list(chunker(["Slide 1 of the deck.\n\nSlide 2 of the deck."])) == [
+        "Slide 1 of the deck."
+    ]
+
+
+def test_numbered_content_is_kept():
+    """
+    Test that chunks and edge lines differing only in numbers are not duplicates.
+    """
+    chunker = make_chunker(max_tokens=6, overlap_tokens=0, edge_lines=2)
+    pages = [
+        "Question 1\nWhat is 2 + 2?\nAnswer: 4",
+        "Question 2\nWhat is 3 + 5?\nAnswer: 8",
+        "Glycolysis\nOutputs: 2 ATP",
+        "Electron transport chain\nOutputs: 36 ATP",
+    ]
+
+    chunk = " ".join(chunker(pages))
+
+    for line in ["Question 2", "What is 3 + 5?", "Answer: 8", "Outputs: 36 ATP"]:
+        assert line in chunk
+
+
+def test_edges_on_few_pages_are_kept():
+    """
+    Test that an edge line is only a header once it repeats on `edge_repeats` pages.
+    """
+    chunker = make_chunker(max_tokens=50, overlap_tokens=0, edge_lines=1)
+    pages = ["Summary\nFirst page.", "Summary\nSecond page."]
+
+    assert " ".join(chunker(pages)).count("Summary") == 2
+
+
+def test_get_chunker():
+    """
+    Test that chunkers are selected by name.
+    """
+    assert get_chunker("fixed") is iter_fixed_size_chunks
+    with pytest.raises(ValueError):
+        get_chunker("unknown")
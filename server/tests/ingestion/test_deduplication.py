@@ -0,0 +1,169 @@
+"""
+Unit tests for the deduplication of uploaded attachments.
+"""
+
+import io
+import fakeredis
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from app.ingestion.deduplication import (
+    acquire_attachment_content,
+    claim_content_ingestion,
+    hash_file_stream,
+    mark_content_status,
+    release_attachment_content,
+    replace_sole_attachment_content,
+    resolve_content_id,
+)
+from app.models.attachment_content import AttachmentContent
+from app.models.embedding import Embedding
+from app.storage.object_store import LocalObjectStore
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    yield
+    disconnect(alias="default")
+
+
+@pytest.fixture(scope="function")
+def object_store(tmp_path):
+    """
+    Fixture providing a local object store in a temporary directory.
+    """
+    return LocalObjectStore(root=str(tmp_path))
+
+
+def store_embedding(content_id):
+    """
+    Save an Embedding document under a content id.
+    """
+    Embedding(
+        hub_id="hub",
+        post_id="post",
+        attachment_id=content_id,
+        batch_no=1,
+        text_content="text",
+        embeddings=[0.1, 0.2],
+    ).save()
+
+
+def test_hash_file_stream_rewinds_stream():
+    """
+    Test that hashing a stream leaves it positioned at its start.
+    """
+    stream = io.BytesIO(b"same bytes")
+
+    assert hash_file_stream(stream, block_size=4) == hash_file_stream(
+        io.BytesIO(b"same bytes")
+    )
+    assert stream.read() == b"same bytes"
+
+
+def test_identical_uploads_share_content(setup_teardown):
+    """
+    Test that a second upload of the same bytes reuses the first content.
+    """
+    first, first_created = acquire_attachment_content("hash", "a1", "k1", "u1")
+    second, second_created = acquire_attachment_content("hash", "a2", "k2", "u2")
+
+    assert first_created and not second_created
+    assert second.content_id == "a1"
+    assert second.file_key == "k1"
+    assert second.reference_count == 2
+    assert AttachmentContent.objects.count() == 1
+
+
+def test_content_is_deleted_with_last_reference(setup_teardown, object_store):
+    """
+    Test that the object and embeddings survive until the last reference is released.
+    """
+    redis_client = fakeredis.FakeRedis()
+    object_store.put("k1", io.BytesIO(b"data"))
+    acquire_attachment_content("hash", "a1", "k1", "u1")
+    acquire_attachment_content("hash", "a2", "k2", "u2")
+    store_embedding("a1")
+
+    assert not release_attachment_content("a1", redis_client, object_store)
+    assert Embedding.objects(attachment_id="a1").count() == 1
+    assert object_store.read("k1") == b"data"
+
+    assert release_attachment_content("a2", redis_client, object_store)
+    assert Embedding.objects.count() == 0
+    assert AttachmentContent.objects.count() == 0
+    with pytest.raises(FileNotFoundError):
+        object_store.read("k1")
+
+
+def test_replace_sole_content_only_when_unshared(setup_teardown):
+    """
+    Test that a content is only updated in place while a single attachment uses it.
+    """
+    acquire_attachment_content("hash", "a1", "k1", "u1")
+    acquire_attachment_content("hash", "a2", "k2", "u2")
+
+    assert replace_sole_attachment_content("a1", "new", "k3", "u3") is None
+
+    acquire_attachment_content("other", "a3", "k4", "u4")
+    previous = replace_sole_attachment_content("a3", "new", "k5", "u5")
+
+    assert previous.file_key == "k4"
+    assert AttachmentContent.objects(content_id="a3").first().file_key == "k5"
+
+
+def test_resolve_content_id(setup_teardown):
+    """
+    Test that attachments resolve to their shared content id, or to themselves.
+    """
+    redis_client = fakeredis.FakeRedis()
+    acquire_attachment_content("hash", "a1", "k1", "u1")
+    acquire_attachment_content("hash", "a2", "k2", "u2")
+
+    assert resolve_content_id("a2", redis_client) == "a1"
+    assert redis_client.get("attachment_id_a2_content_id") == b"a1"
+    assert resolve_content_id("legacy", redis_client) == "legacy"
+
+
+def test_failed_content_is_claimed_once(setup_teardown):
+    """
+    Test that new content is pending, and that a failed ingestion is claimed by a
+    single duplicate upload.
+    """
+    content, _ = acquire_attachment_content("hash", "a1", "k1", "u1")
+    assert content.status == "pending"
+
+    mark_content_status("a1", "failed")
+    duplicate, created = acquire_attachment_content("hash", "a2", "k2", "u2")
+
+    assert not created
+    assert claim_content_ingestion(duplicate)
+    assert not claim_content_ingestion(duplicate)
+    assert AttachmentContent.objects(content_id="a1").first().status == "pending"
+
+
+def test_only_stale_pending_content_is_claimed(setup_teardown):
+    """
+    Test that pending content is only claimed once it is older than the timeout,
+    and that ready content is never claimed.
+    """
+    content, _ = acquire_attachment_content("hash", "a1", "k1", "u1")
+
+    assert not claim_content_ingestion(content, stale_after=900)
+    assert claim_content_ingestion(content, stale_after=-1)
+
+    mark_content_status("a1", "ready")
+    content.reload()
+
+    assert content.status == "ready"
+    assert not claim_content_ingestion(content, stale_after=-1)
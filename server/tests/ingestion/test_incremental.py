@@ -0,0 +1,60 @@
+"""
+Unit tests for chunk diffing during incremental re-ingestion.
+"""
+
+from app.ingestion.incremental import chunk_content_hash, diff_chunks
+
+
+def stored(*chunks):
+    """
+    Build stored document tuples for chunks numbered from 1.
+    """
+    return [
+        (f"id-{batch_no}", chunk_content_hash(chunk), batch_no)
+        for batch_no, chunk in enumerate(chunks, 1)
+    ]
+
+
+def test_unchanged_extraction_embeds_nothing():
+    """
+    Test that re-ingesting identical content keeps every stored chunk.
+    """
+    diff = diff_chunks(stored("a", "b", "c"), ["a", "b", "c"])
+
+    assert not diff.new_chunks
+    assert not diff.moved
+    assert not diff.orphaned_ids
+    assert diff.total == 3
+
+
+def test_edited_chunk_is_embedded_and_old_one_deleted():
+    """
+    Test that a changed chunk is embedded and its old version is orphaned.
+    """
+    diff = diff_chunks(stored("a", "b", "c"), ["a", "B", "c"])
+
+    assert [(batch_no, chunk) for batch_no, chunk, _ in diff.new_chunks] == [(2, "B")]
+    assert diff.orphaned_ids == ["id-2"]
+    assert not diff.moved
+
+
+def test_inserted_chunk_renumbers_following_chunks():
+    """
+    Test that chunks shifted by an insertion are kept and renumbered.
+    """
+    diff = diff_chunks(stored("a", "b"), ["new", "a", "b"])
+
+    assert [chunk for _, chunk, _ in diff.new_chunks] == ["new"]
+    assert diff.moved == [("id-1", 2), ("id-2", 3)]
+    assert not diff.orphaned_ids
+
+
+def test_duplicate_chunks_are_matched_once():
+    """
+    Test that each stored copy of a repeated chunk is matched at most once.
+    """
+    diff = diff_chunks(stored("x", "x", "x"), ["x", "x"])
+
+    assert not diff.new_chunks
+    assert diff.orphaned_ids == ["id-3"]
+    assert diff.total == 2
@@ -0,0 +1,86 @@
+"""
+Unit tests for the streaming ingestion pipeline.
+"""
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from app.ingestion.pipeline import ingest_chunks, iter_batches, iter_fixed_size_chunks
+from app.models.recording_embedding import RecordingEmbedding
+
+
+class FakeEmbeddingClient:
+    """
+    Embedding client returning the chunk length as a one-dimensional vector.
+    """
+
+    def embed_stream(self, chunks):
+        for chunk in chunks:
+            yield chunk, [float(len(chunk))]
+
+
+@pytest.fixture(scope="function")
+def setup_teardown(request):
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+
+    def teardown():
+        disconnect(alias="default")
+
+    request.addfinalizer(teardown)
+
+
+def test_fixed_size_chunks_match_slicing_of_the_full_text():
+    """
+    Test that streamed chunks equal slicing the concatenated text.
+    """
+    segments = ["a" * 7, "", "b" * 3, "c" * 11]
+    text = "".join(segments)
+
+    assert list(iter_fixed_size_chunks(segments, chunk_size=4)) == [
+        text[i : i + 4] for i in range(0, len(text), 4)
+    ]
+
+
+def test_iter_batches():
+    """
+    Test that items are grouped into batches of the requested size.
+    """
+    assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_ingest_chunks_inserts_in_batches(setup_teardown):
+    """
+    Test that documents are inserted batch by batch and progress is reported.
+    """
+    progress = []
+
+    total = ingest_chunks(
+        chunks=iter(["one", "two", "three", "four", "five"]),
+        make_document=lambda sequence, chunk, embedding: RecordingEmbedding(
+            room_id="room", text_content=f"{sequence}:{chunk}", embeddings=embedding
+        ),
+        document_class=RecordingEmbedding,
+        insert_batch_size=2,
+        on_batch_inserted=progress.append,
+        embedding_client=FakeEmbeddingClient(),
+    )
+
+    assert total == 5
+    assert progress == [2, 4, 5]
+    assert [doc.text_content for doc in RecordingEmbedding.objects(room_id="room")] == [
+        "1:one",
+        "2:two",
+        "3:three",
+        "4:four",
+        "5:five",
+    ]
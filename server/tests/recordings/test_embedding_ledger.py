@@ -0,0 +1,116 @@
+"""
+Unit tests for the idempotent storage of recording embeddings.
+"""
+
+import fakeredis
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from app.models.recording_embedding import RecordingEmbedding
+from app.recordings.embedding_ledger import (
+    EmbeddingLedger,
+    frame_reservation_id,
+    recording_chunk_id,
+)
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    yield
+    disconnect(alias="default")
+
+
+def transcript_chunks(room_id, sequences):
+    """
+    Build the transcript embeddings with the given sequence numbers.
+    """
+    return [
+        RecordingEmbedding(
+            room_id=room_id,
+            text_content=f"chunk {sequence}",
+            modality="transcript",
+            sequence=sequence,
+            chunk_id=recording_chunk_id(room_id, "transcript", sequence),
+            embeddings=[float(sequence)],
+        )
+        for sequence in sequences
+    ]
+
+
+def test_chunk_ids_are_deterministic():
+    """
+    Test that a chunk ID depends only on the room, source and sequence number.
+    """
+    assert recording_chunk_id("room", "frame", 1) == recording_chunk_id(
+        "room", "frame", 1
+    )
+    assert (
+        len(
+            {
+                recording_chunk_id("room", "frame", 1),
+                recording_chunk_id("room", "transcript", 1),
+                recording_chunk_id("room", "frame", 2),
+                recording_chunk_id("other", "frame", 1),
+            }
+        )
+        == 4
+    )
+
+
+def test_repeated_batches_are_stored_and_counted_once(setup_teardown):
+    """
+    Test that storing overlapping batches again neither duplicates documents nor
+    doubles the counter.
+    """
+    redis_client = fakeredis.FakeRedis()
+    ledger = EmbeddingLedger(redis_client, "room")
+
+    assert ledger.store(transcript_chunks("room", [1, 2, 3])) == 3
+    assert ledger.store(transcript_chunks("room", [2, 3, 4])) == 1
+    assert ledger.store(transcript_chunks("room", [1, 2, 3, 4])) == 0
+
+    assert RecordingEmbedding.objects(room_id="room").count() == 4
+    assert int(redis_client.get(ledger.counter_key)) == 4
+
+
+def test_batch_stored_but_not_counted_is_counted_on_retry(setup_teardown):
+    """
+    Test that a batch whose task died after storing it is counted when it is stored
+    again.
+    """
+    redis_client = fakeredis.FakeRedis()
+    ledger = EmbeddingLedger(redis_client, "room")
+    RecordingEmbedding.objects.insert(transcript_chunks("room", [1, 2]))
+
+    assert ledger.store(transcript_chunks("room", [1, 2])) == 2
+    assert RecordingEmbedding.objects(room_id="room").count() == 2
+    assert ledger.record([recording_chunk_id("room", "transcript", 1)] * 2) == 0
+
+
+def test_frame_reservation_id_depends_on_frames_and_spans():
+    """
+    Test that the same frames at the same times share a reservation ID, so frames
+    uploaded again reuse their sequence numbers.
+    """
+    frames = [b"frame one", b"frame two"]
+    spans = [(0.0, 4.0), (4.0, 9.5)]
+
+    assert frame_reservation_id(frames, spans) == frame_reservation_id(
+        list(frames), list(spans)
+    )
+    assert frame_reservation_id(frames, spans) != frame_reservation_id(
+        frames[::-1], spans
+    )
+    assert frame_reservation_id(frames, spans) != frame_reservation_id(
+        frames, [(0.0, 4.0), (4.0, 10.0)]
+    )
@@ -0,0 +1,60 @@
+"""
+Unit tests for the detection of changed recording frames.
+"""
+
+import cv2
+import numpy as np
+import pytest
+from app.recordings.frame_analysis import (
+    decode_thumbnail,
+    decode_thumbnails,
+    frame_differences,
+    select_changed_frames,
+)
+
+
+def encode_frame(value):
+    """
+    Encode a uniform 320x180 frame of the given gray level as PNG bytes.
+    """
+    frame = np.full((180, 320, 3), value, dtype=np.uint8)
+    return cv2.imencode(".png", frame)[1].tobytes()
+
+
+def test_decode_thumbnail_size():
+    """
+    Test that frames are decoded into grayscale thumbnails of the requested size.
+    """
+    thumbnail = decode_thumbnail(encode_frame(128), size=(32, 18))
+
+    assert thumbnail.shape == (18, 32)
+    assert thumbnail.dtype == np.uint8
+
+
+def test_decode_thumbnail_rejects_invalid_bytes():
+    """
+    Test that undecodable frames raise a ValueError.
+    """
+    with pytest.raises(ValueError):
+        decode_thumbnail(b"not an image")
+
+
+def test_frame_differences_of_sequence():
+    """
+    Test that adjacent differences are computed for the whole sequence at once.
+    """
+    frames = [encode_frame(value) for value in (0, 0, 255, 255)]
+
+    differences = frame_differences(decode_thumbnails(frames, size=(16, 9)))
+
+    assert differences == pytest.approx([0.0, 1.0, 0.0])
+
+
+def test_select_changed_frames_matches_pairwise_rule():
+    """
+    Test that a frame is kept when it differs from the next one, and the last
+    frame when it differs from the previous one.
+    """
+    assert select_changed_frames(np.array([0.0, 0.5, 0.0])) == [1]
+    assert select_changed_frames(np.array([0.1, 0.0, 0.2])) == [0, 2, 3]
+    assert select_changed_frames(np.empty(0)) == [0]
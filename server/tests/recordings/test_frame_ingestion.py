@@ -0,0 +1,138 @@
+"""
+Unit tests for the concurrent describe -> embed -> insert pipeline of recording frames.
+"""
+
+import threading
+import time
+import fakeredis
+import mongomock
+import numpy as np
+import pytest
+from mongoengine import connect, disconnect
+from app.models.recording_embedding import RecordingEmbedding
+from app.recordings import frame_ingestion
+from app.recordings.embedding_ledger import EmbeddingLedger
+from app.recordings.frame_ingestion import describe_stream, ingest_frames
+from app.recordings.image_context_cache import ImageContextCache
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    yield
+    disconnect(alias="default")
+
+
+class FakeEmbeddingClient:
+    """
+    Embedding client returning the length of each text as its embedding.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def embed_documents(self, chunks):
+        """
+        Record the requested chunks and embed them.
+        """
+        self.requests.append(list(chunks))
+        return [[float(len(chunk)), 0.0] for chunk in chunks]
+
+
+def test_describe_stream_keeps_order_under_concurrency_cap():
+    """
+    Test that descriptions are yielded in frame order with at most the cap in flight.
+    """
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def describe(image):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.01 * (5 - image[0] % 5))
+        with lock:
+            active["now"] -= 1
+        return f"frame {image[0]}"
+
+    images = [bytes([index]) for index in range(10)]
+
+    descriptions = list(describe_stream(images, describe, max_concurrency=3))
+
+    assert descriptions == [f"frame {index}" for index in range(10)]
+    assert active["peak"] <= 3
+
+
+def test_describe_stream_retries_failed_requests():
+    """
+    Test that a failing request is retried and a persistent failure is raised.
+    """
+    attempts = {}
+
+    def describe(image):
+        attempts[image] = attempts.get(image, 0) + 1
+        if image == b"flaky" and attempts[image] < 2:
+            raise TimeoutError("timed out")
+        if image == b"broken":
+            raise TimeoutError("timed out")
+        return image.decode("utf-8")
+
+    assert list(describe_stream([b"flaky"], describe, retry_backoff=0)) == ["flaky"]
+
+    with pytest.raises(TimeoutError):
+        list(describe_stream([b"broken"], describe, max_retries=2, retry_backoff=0))
+    assert attempts[b"broken"] == 3
+
+
+def test_ingest_frames_batches_and_skips_cached_frames(setup_teardown, monkeypatch):
+    """
+    Test that cached frames skip the vision model and frames are inserted in batches.
+    """
+    client = FakeEmbeddingClient()
+    monkeypatch.setattr(frame_ingestion, "get_embedding_client", lambda: client)
+    cache = ImageContextCache(fakeredis.FakeRedis(), tolerance=0, ttl=60, model="m")
+
+    thumbnails = np.stack(
+        [
+            np.random.default_rng(seed).integers(0, 256, (36, 64), dtype=np.uint8)
+            for seed in range(3)
+        ]
+    )
+    known_hash = int(frame_ingestion.frame_hashes(thumbnails[1:2], "dhash")[0])
+    cache.set_many({known_hash: ("cached slide", [7.0, 7.0])})
+    described = []
+
+    def describe(image):
+        described.append(image)
+        return f"slide {image.decode('utf-8')}"
+
+    ledger = EmbeddingLedger(fakeredis.FakeRedis(), "room")
+
+    total = ingest_frames(
+        [b"a", b"b", b"c"],
+        thumbnails,
+        "room",
+        describe,
+        ledger,
+        batch_size=2,
+        cache=cache,
+    )
+
+    assert total == 3
+    assert sorted(described) == [b"a", b"c"]
+    assert client.requests == [["slide a"], ["slide c"]]
+    assert [doc.text_content for doc in RecordingEmbedding.objects(room_id="room")] == [
+        "slide a",
+        "cached slide",
+        "slide c",
+    ]
+    assert cache.get_many([known_hash])[0] == ("cached slide", [7.0, 7.0])
@@ -0,0 +1,88 @@
+"""
+Unit tests for the shrinking of recording frames before vision inference.
+"""
+
+import cv2
+import fakeredis
+import numpy as np
+import pytest
+from app.recordings.frame_preprocessing import (
+    detect_static_chrome,
+    payload_stats,
+    prepare_frame,
+    record_payload_sizes,
+)
+
+
+def screenshot(seed, width=1920, height=1080):
+    """
+    Build a PNG screenshot with a static toolbar above changing content.
+    """
+    image = np.full((height, width, 3), 240, dtype=np.uint8)
+    blocks = np.random.default_rng(seed).integers(0, 256, (9, 16, 3), dtype=np.uint8)
+    content = np.kron(blocks, np.ones((100, 120, 1), dtype=np.uint8))
+    image[180:, :] = content[: height - 180, :width]
+    return image
+
+
+def thumbnail(image):
+    """
+    Reduce a screenshot to the 64x36 grayscale thumbnail used for analysis.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (64, 36), interpolation=cv2.INTER_AREA)
+
+
+def test_static_toolbar_is_detected():
+    """
+    Test that the unchanging rows at the top of the screen are cropped.
+    """
+    thumbnails = np.stack([thumbnail(screenshot(seed)) for seed in range(4)])
+
+    top, bottom, left, right = detect_static_chrome(thumbnails, max_fraction=0.25)
+
+    assert 0.1 < top <= 1 / 6
+    assert (bottom, left, right) == (1.0, 0.0, 1.0)
+
+
+def test_no_chrome_detected_from_too_few_frames():
+    """
+    Test that chrome is not guessed from fewer than `min_frames` frames.
+    """
+    thumbnails = np.stack([thumbnail(screenshot(seed)) for seed in range(2)])
+
+    assert detect_static_chrome(thumbnails) is None
+
+
+@pytest.mark.parametrize("image_format", ["jpeg", "webp"])
+def test_prepare_frame_shrinks_screenshot(image_format):
+    """
+    Test that a full-HD PNG is cropped, downscaled and re-encoded.
+    """
+    _, png = cv2.imencode(".png", screenshot(1))
+    png = png.tobytes()
+
+    payload = prepare_frame(
+        png, crop=(0.15, 1.0, 0.0, 1.0), max_size=640, image_format=image_format
+    )
+    image = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+
+    assert len(payload) < len(png)
+    assert image.shape[1] == 640
+    assert image.shape[0] == round(1080 * 0.85 * 640 / 1920)
+
+
+def test_payload_sizes_are_aggregated():
+    """
+    Test that frame sizes before and after shrinking are counted.
+    """
+    redis_client = fakeredis.FakeRedis()
+    record_payload_sizes(redis_client, 1000, 200)
+    record_payload_sizes(redis_client, 3000, 600)
+
+    assert payload_stats(redis_client) == {
+        "frames": 2,
+        "bytes_in": 4000,
+        "bytes_out": 800,
+        "ratio": 0.2,
+    }
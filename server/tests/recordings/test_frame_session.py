@@ -0,0 +1,176 @@
+"""
+Unit tests for incremental frame ingestion sessions.
+"""
+
+import fakeredis
+import numpy as np
+import pytest
+from app.recordings.frame_session import FrameSession, FrameSessionState, Keyframe
+
+
+@pytest.fixture(scope="function")
+def session():
+    """
+    Fixture providing a FrameSession on a fake Redis server.
+    """
+    return FrameSession(fakeredis.FakeRedis(), "room", ttl=60)
+
+
+def hashes(*values):
+    """
+    Build a uint64 hash array.
+    """
+    return np.array(values, dtype=np.uint64)
+
+
+def test_scenes_continue_across_batches():
+    """
+    Test that a scene spanning two batches is described once, from its last frame.
+    """
+    state = FrameSessionState()
+
+    assert state.advance(["a1", "a2"], hashes(0x0, 0x1), threshold=2) == ([], ["a1"])
+    assert state.advance(["a3", "b1"], hashes(0x3, 0xFFFF), threshold=2) == (
+        [Keyframe("a3", None, None)],
+        ["a2"],
+    )
+    assert state.pending_key == "b1"
+    assert state.flush() == ([Keyframe("b1", None, None)], [])
+    assert state.frames == 4
+    assert state.keyframes == 2
+
+
+def test_returning_slide_is_not_described_again():
+    """
+    Test that a slide shown again in a later batch is not described twice.
+    """
+    state = FrameSessionState()
+    state.advance(["a1", "b1"], hashes(0x0, 0xFFFF), threshold=2)
+
+    keyframes, discarded = state.advance(["a2", "c1"], hashes(0x1, 0xFF00FF00))
+
+    assert [keyframe.key for keyframe in keyframes] == ["b1"]
+    assert discarded == ["a2"]
+
+
+def test_keyframes_span_their_scene():
+    """
+    Test that a keyframe spans from the first to the last frame of its scene,
+    across batches.
+    """
+    state = FrameSessionState()
+    state.advance(["a1", "a2"], hashes(0x0, 0x1), threshold=2, timestamps=[0, 5])
+
+    keyframes, _ = state.advance(
+        ["a3", "b1"], hashes(0x3, 0xFFFF), threshold=2, timestamps=[10, 15]
+    )
+
+    assert keyframes == [Keyframe("a3", 0.0, 10.0)]
+    assert state.flush() == ([Keyframe("b1", 15.0, 15.0)], [])
+
+
+def test_state_round_trips_through_redis(session):
+    """
+    Test that the scene state survives between batches.
+    """
+    session.start()
+    state = session.load_state()
+    state.advance(["a1", "b1"], hashes(0x0, 0xFFFF), threshold=2, timestamps=[0, 4])
+    state.next_batch += 1
+    session.save_state(state)
+
+    loaded = session.load_state()
+
+    assert loaded.next_batch == 1
+    assert loaded.anchors.tolist() == [0x0, 0xFFFF]
+    assert loaded.described == [True, False]
+    assert loaded.open_scene == 1
+    assert loaded.pending_key == "b1"
+    assert (loaded.open_since, loaded.pending_time) == (4.0, 4.0)
+
+
+def test_batches_are_numbered_until_closed(session):
+    """
+    Test that batches get consecutive sequence numbers and a closed session refuses
+    new batches.
+    """
+    assert session.append_batch() is None
+
+    session.start()
+    assert [session.append_batch(), session.append_batch()] == [0, 1]
+    assert session.close() == 2
+    assert session.append_batch() is None
+    assert session.close() is None
+    assert session.status()["status"] == FrameSession.CLOSED
+    assert session.status()["batches_received"] == 3
+
+
+def test_batch_outcome_is_kept_until_finished(session):
+    """
+    Test that the keyframes of a batch are saved with the state, so a retried task
+    finds them, and that a skipped batch is counted.
+    """
+    session.start()
+    state = session.load_state()
+    state.next_batch += 1
+    session.save_state(state, 0, [Keyframe("a1", 0.0, 5.0)], ["a0"])
+
+    assert session.load_batch(0) == ([Keyframe("a1", 0.0, 5.0)], ["a0"])
+    assert session.load_batch(1) is None
+
+    assert [session.count_failure(0), session.count_failure(0)] == [1, 2]
+    session.finish_batch(0)
+    assert session.load_batch(0) is None
+    assert session.count_failure(0) == 1
+
+    session.fail_batch(0)
+    assert session.status()["batches_failed"] == 1
+    assert session.count_failure(0) == 1
+
+
+def test_chrome_is_estimated_across_batches(session):
+    """
+    Test that the chrome is detected from the frames of all batches, and only once
+    enough distinct scenes were seen.
+    """
+    rng = np.random.default_rng(0)
+
+    def batch():
+        thumbnails = np.full((2, 36, 64), 240, dtype=np.uint8)
+        thumbnails[:, 6:, :] = rng.integers(0, 256, (2, 30, 64), dtype=np.uint8)
+        return thumbnails
+
+    session.start()
+    state = session.load_state()
+    state.advance(["a1", "b1"], hashes(0x0, 0xFFFF), threshold=2)
+    state.observe(batch())
+    session.save_state(state)
+
+    state = session.load_state()
+    assert state.chrome(min_scenes=4) is None
+
+    state.advance(["c1", "d1"], hashes(0xFFFF0000, 0xFFFF00000000), threshold=2)
+    state.observe(batch())
+    session.save_state(state)
+
+    top, bottom, left, right = session.load_state().chrome(min_scenes=4)
+
+    assert 0 < top <= 6 / 36
+    assert (bottom, left, right) == (1.0, 0.0, 1.0)
+
+
+def test_skipped_batches_are_marked_once(session):
+    """
+    Test that a batch that will never be processed is marked and counted once,
+    and that nothing is recorded for a session that no longer exists.
+    """
+    session.skip_batch(0)
+    assert not session.redis_client.exists(session.key)
+
+    session.start()
+    session.skip_batch(1)
+    session.skip_batch(1)
+
+    assert session.is_skipped(1)
+    assert not session.is_skipped(0)
+    assert session.status()["batches_failed"] == 1
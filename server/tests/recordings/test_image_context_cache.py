@@ -0,0 +1,53 @@
+"""
+Unit tests for the perceptual-hash image context cache.
+"""
+
+import fakeredis
+import pytest
+from app.recordings.image_context_cache import ImageContextCache
+
+
+@pytest.fixture(scope="function")
+def cache():
+    """
+    Fixture providing an ImageContextCache on a fake Redis server.
+    """
+    return ImageContextCache(fakeredis.FakeRedis(), tolerance=4, ttl=60, model="m")
+
+
+def test_near_hash_matches_cached_entry(cache):
+    """
+    Test that a hash within the tolerance hits the cached description.
+    """
+    frame_hash = 0x0123456789ABCDEF
+    cache.set_many({frame_hash: ("A slide about vectors", [0.5, 0.25])})
+
+    near = frame_hash ^ 0b1011
+    far = frame_hash ^ 0xFF00FF
+
+    assert cache.get_many([near, far]) == [
+        ("A slide about vectors", [0.5, 0.25]),
+        None,
+    ]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_embedding_of_other_model_is_not_reused(cache):
+    """
+    Test that only the description is reused when the embedding model changed.
+    """
+    cache.set_many({42: ("Diagram", [1.0])})
+    cache.model = "other"
+
+    assert cache.get_many([42]) == [("Diagram", None)]
+
+
+def test_band_layout_covers_all_bits():
+    """
+    Test that the bands partition the 64 bits of the hash.
+    """
+    layout = ImageContextCache._band_layout(5)  # pylint: disable=protected-access
+
+    assert sum(mask.bit_length() for _, mask in layout) == 64
+    assert [shift for shift, _ in layout] == [0, 13, 26, 39, 52]
@@ -0,0 +1,73 @@
+"""
+Unit tests for perceptual frame hashes and scene clustering.
+"""
+
+import numpy as np
+import pytest
+from app.recordings.frame_analysis import select_keyframes
+from app.recordings.perceptual_hash import (
+    cluster_scenes,
+    frame_hashes,
+    hamming_distances,
+    select_scene_representatives,
+)
+
+
+def slide(seed, noise=0):
+    """
+    Build a 36x64 grayscale slide of random blocks, optionally with pixel noise.
+    """
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, size=(6, 8), dtype=np.uint8)
+    image = np.kron(blocks, np.ones((6, 8), dtype=np.uint8))
+    if noise:
+        jitter = np.random.default_rng(seed + 100).integers(
+            -noise, noise + 1, image.shape
+        )
+        image = np.clip(image.astype(np.int16) + jitter, 0, 255).astype(np.uint8)
+    return image
+
+
+@pytest.mark.parametrize("algorithm", ["dhash", "phash"])
+def test_noise_keeps_hashes_close(algorithm):
+    """
+    Test that compression-like noise flips far fewer bits than a slide change.
+    """
+    hashes = frame_hashes(np.stack([slide(1), slide(1, noise=3), slide(2)]), algorithm)
+
+    distances = hamming_distances(hashes[0], hashes[1:])
+
+    assert distances[0] <= 8 < distances[1]
+
+
+def test_cluster_scenes_groups_returning_slides():
+    """
+    Test that a slide shown again later joins its earlier scene.
+    """
+    hashes = np.array([0b0000, 0b0001, 0xFFFF, 0b0011], dtype=np.uint64)
+
+    scenes = cluster_scenes(hashes, threshold=2)
+
+    assert scenes == [[0, 1, 3], [2]]
+    assert select_scene_representatives(scenes) == [2, 3]
+
+
+def test_select_keyframes_sends_one_frame_per_scene():
+    """
+    Test that noisy repeats of the same slides only produce one keyframe each.
+    """
+    frames = [slide(1), slide(1, noise=2), slide(2), slide(2, noise=2), slide(3)]
+
+    assert select_keyframes(np.stack(frames), algorithm="dhash", threshold=8) == [
+        1,
+        3,
+        4,
+    ]
+
+
+def test_unsupported_algorithm():
+    """
+    Test that an unknown hash algorithm is rejected.
+    """
+    with pytest.raises(ValueError):
+        frame_hashes(np.stack([slide(1)]), "ahash")
@@ -0,0 +1,148 @@
+"""
+Unit tests for the resumable, streaming ingestion of recording transcripts.
+"""
+
+import io
+from functools import partial
+import fakeredis
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from app.ingestion import pipeline
+from app.ingestion.pipeline import iter_fixed_size_chunks
+from app.models.recording_embedding import RecordingEmbedding
+from app.recordings import transcript_ingestion
+from app.recordings.transcript_ingestion import (
+    TranscriptCheckpoint,
+    ingest_transcript,
+    iter_text_blocks,
+    iter_time_spans,
+    transcript_id,
+)
+
+
+class FakeEmbeddingClient:
+    """
+    Embedding client failing after `fail_after` chunks, if set.
+    """
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.embedded = 0
+
+    def embed_stream(self, chunks):
+        for chunk in chunks:
+            if self.fail_after is not None and self.embedded == self.fail_after:
+                raise TimeoutError("embedding request timed out")
+            self.embedded += 1
+            yield chunk, [float(len(chunk))]
+
+
+@pytest.fixture(scope="function")
+def setup_teardown(monkeypatch):
+    """
+    Fixture to set up and tear down the test environment, with a fixed-size
+    chunker of 10 characters.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    monkeypatch.setattr(
+        transcript_ingestion,
+        "get_chunker",
+        lambda paged: partial(iter_fixed_size_chunks, chunk_size=10),
+    )
+    yield
+    disconnect(alias="default")
+
+
+def test_blocks_keep_whole_lines():
+    """
+    Test that lines are grouped into blocks without being split.
+    """
+    stream = io.BytesIO("first line\nsecond\nthird line\nlast".encode("utf-8"))
+
+    assert list(iter_text_blocks(stream, block_size=12)) == [
+        "first line\nsecond\n",
+        "third line\nlast",
+    ]
+
+
+def test_chunks_span_their_timestamps():
+    """
+    Test that chunks span their first to last timestamp, and that a chunk without
+    timestamps is placed at the end of the previous one.
+    """
+    chunks = [
+        "[00:05] Hello [01:10] class",
+        "no timestamp here",
+        "01:02:03 Questions",
+    ]
+
+    assert list(iter_time_spans(chunks)) == [
+        (chunks[0], (5.0, 70.0)),
+        (chunks[1], (70.0, 70.0)),
+        (chunks[2], (3723.0, 3723.0)),
+    ]
+
+
+def test_retry_resumes_after_last_stored_batch(setup_teardown, monkeypatch):
+    """
+    Test that a retried ingestion continues after the checkpoint without duplicates,
+    and that a completed transcript is not ingested again.
+    """
+    transcript = "".join(f"{index:09d}\n" for index in range(450)).encode("utf-8")
+    redis_client = fakeredis.FakeRedis()
+    checkpoint = TranscriptCheckpoint(redis_client, "room", "recording-1", ttl=60)
+
+    monkeypatch.setattr(
+        pipeline, "get_embedding_client", lambda: FakeEmbeddingClient(fail_after=250)
+    )
+    with pytest.raises(TimeoutError):
+        ingest_transcript(io.BytesIO(transcript), "room", checkpoint)
+    assert checkpoint.load() == (200, False)
+
+    monkeypatch.setattr(pipeline, "get_embedding_client", FakeEmbeddingClient)
+    assert ingest_transcript(io.BytesIO(transcript), "room", checkpoint) == 250
+    assert ingest_transcript(io.BytesIO(transcript), "room", checkpoint) == 0
+
+    texts = [document.text_content for document in RecordingEmbedding.objects]
+    assert len(texts) == len(set(texts)) == 450
+    assert checkpoint.load() == (450, True)
+    sequences = sorted(document.sequence for document in RecordingEmbedding.objects)
+    assert sequences == list(range(1, 451))
+    assert int(redis_client.get("room_id_room_number_of_recording_embeddings")) == 450
+
+
+def test_transcripts_of_a_room_are_checkpointed_apart(setup_teardown, monkeypatch):
+    """
+    Test that completing one transcript of a room does not skip the next one.
+    """
+    redis_client = fakeredis.FakeRedis()
+    monkeypatch.setattr(pipeline, "get_embedding_client", FakeEmbeddingClient)
+    first = TranscriptCheckpoint(redis_client, "room", "recording-1", ttl=60)
+    second = TranscriptCheckpoint(redis_client, "room", "recording-2", ttl=60)
+
+    assert ingest_transcript(io.BytesIO(b"first lecture\n"), "room", first) == 2
+    assert ingest_transcript(io.BytesIO(b"second lecture\n"), "room", second) == 2
+    assert first.load() == (2, True)
+    assert second.load() == (2, True)
+    assert RecordingEmbedding.objects.count() == 4
+    assert int(redis_client.get("room_id_room_number_of_recording_embeddings")) == 4
+
+
+def test_transcript_id():
+    """
+    Test that transcripts are identified by recording, otherwise by URL path.
+    """
+    url = "https://bucket.s3.amazonaws.com/recordings/beam/room/1/transcript.txt"
+
+    assert transcript_id(url, "recording-1") == "recording-1"
+    assert transcript_id(f"{url}?X-Amz-Signature=a") == transcript_id(
+        f"{url}?X-Amz-Signature=b"
+    )
+    assert transcript_id(url) != transcript_id(url.replace("/1/", "/2/"))
@@ -0,0 +1,65 @@
+"""
+Unit tests for the extraction of keyframes from recording videos.
+"""
+
+import cv2
+import numpy as np
+import pytest
+from app.recordings.video_frames import iter_video_frames, iter_video_keyframes
+
+
+def slide(seed):
+    """
+    Build a 144x256 BGR slide of random blocks.
+    """
+    blocks = np.random.default_rng(seed).integers(0, 256, (6, 8), dtype=np.uint8)
+    gray = np.kron(blocks, np.ones((24, 32), dtype=np.uint8))
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+@pytest.fixture(scope="function")
+def video_path(tmp_path):
+    """
+    Fixture writing a 10 fps video showing slides 1, 2, 1 and 3 for a second each.
+    """
+    path = str(tmp_path / "recording.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (256, 144))
+    for seed in [1, 2, 1, 3]:
+        for _ in range(10):
+            writer.write(slide(seed))
+    writer.release()
+    return path
+
+
+def test_frames_are_sampled_at_the_requested_rate(video_path):
+    """
+    Test that one frame is sampled every 1 / sample_fps seconds.
+    """
+    timestamps = [timestamp for timestamp, _ in iter_video_frames(video_path, 2.0)]
+
+    assert timestamps == pytest.approx([0.5 * index for index in range(8)])
+
+
+def test_one_keyframe_per_scene(video_path):
+    """
+    Test that each slide is yielded once, from its last sampled frame, with the
+    time span it was first shown.
+    """
+    keyframes = list(iter_video_keyframes(video_path, sample_fps=2.0))
+
+    assert [(start, end) for start, end, _, _ in keyframes] == pytest.approx(
+        [(0.0, 0.5), (1.0, 1.5), (3.0, 3.5)]
+    )
+    assert all(image[:2] == b"\xff\xd8" for _, _, image, _ in keyframes)
+    assert keyframes[0][3].shape == (36, 64)
+
+
+def test_unreadable_video(tmp_path):
+    """
+    Test that a file that is not a video is rejected.
+    """
+    path = tmp_path / "recording.avi"
+    path.write_bytes(b"not a video")
+
+    with pytest.raises(ValueError):
+        list(iter_video_frames(str(path)))
@@ -0,0 +1,72 @@
+"""
+Unit tests for the claim-check object store backends.
+"""
+
+import io
+import os
+import boto3
+import pytest
+from moto import mock_aws
+from app.storage.object_store import LocalObjectStore, S3ObjectStore
+
+
+@pytest.fixture(scope="function")
+def local_store(tmp_path):
+    """
+    Fixture providing an object store rooted in a temporary directory.
+    """
+    return LocalObjectStore(root=str(tmp_path))
+
+
+@pytest.fixture(scope="function")
+def s3_store():
+    """
+    Fixture providing an object store backed by a mocked S3 bucket.
+    """
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="eduhub-ai-test")
+        yield S3ObjectStore(s3_client=s3_client, bucket="eduhub-ai-test")
+
+
+@pytest.mark.parametrize("store_fixture", ["local_store", "s3_store"])
+def test_put_read_and_delete(store_fixture, request):
+    """
+    Test that an object can be stored, read back, streamed to a file and deleted.
+    """
+    store = request.getfixturevalue(store_fixture)
+    key = "posts/hub/attachment.pdf"
+
+    store.put(key, io.BytesIO(b"%PDF-1.4 content"), "application/pdf")
+
+    assert store.read(key) == b"%PDF-1.4 content"
+
+    with store.local_path(key) as path:
+        assert path.endswith(".pdf")
+        with open(path, "rb") as local_file:
+            assert local_file.read() == b"%PDF-1.4 content"
+
+    store.delete(key)
+
+    with pytest.raises(Exception):
+        store.read(key)
+
+
+def test_temporary_file_is_removed(s3_store):
+    """
+    Test that the temporary copy of an S3 object is removed after use.
+    """
+    s3_store.put("frames/1.png", io.BytesIO(b"png"))
+
+    with s3_store.local_path("frames/1.png") as path:
+        assert os.path.exists(path)
+
+    assert not os.path.exists(path)
+
+
+def test_local_store_rejects_keys_outside_root(local_store):
+    """
+    Test that keys escaping the root directory are rejected.
+    """
+    with pytest.raises(ValueError):
+        local_store.put("../escape.txt", io.BytesIO(b"data"))
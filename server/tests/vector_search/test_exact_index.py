@@ -0,0 +1,124 @@
+"""
+Unit tests for the exact brute-force vector search.
+"""
+
+import mongomock
+import numpy as np
+import pytest
+from bson import ObjectId
+from mongoengine import connect, disconnect
+from app.models.embedding import Embedding
+from app.vector_search.backend import select_vector_search_backend
+from app.vector_search.exact_index import ExactIndex, ExactVectorSearch
+from config.config import Config
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    yield
+    disconnect(alias="default")
+
+
+def insert_chunks(attachment_id, vectors, first=0):
+    """
+    Insert the chunks of an attachment with the given vectors.
+    """
+    return Embedding.objects.insert(
+        [
+            Embedding(
+                hub_id="hub",
+                post_id="post",
+                attachment_id=attachment_id,
+                batch_no=first + index,
+                text_content=f"chunk {first + index}",
+                embeddings=list(vector),
+            )
+            for index, vector in enumerate(vectors)
+        ]
+    )
+
+
+def test_query_ranks_by_cosine_similarity(tmp_path):
+    """
+    Test that the memory-mapped matrix ranks rows exactly by cosine similarity.
+    """
+    vectors = np.random.default_rng(0).normal(size=(200, 8)) * 3
+    document_ids = [ObjectId() for _ in range(200)]
+    path = str(tmp_path / "attachment.vectors")
+    ExactIndex.save(path, document_ids, vectors)
+    query = np.random.default_rng(1).normal(size=8)
+
+    index = ExactIndex.load(path)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ query))[:5]
+
+    assert isinstance(index.matrix, np.memmap)
+    assert index.query(query, 5) == [document_ids[row] for row in expected]
+
+
+def test_cache_is_built_and_rebuilt_for_the_corpus_size(setup_teardown, tmp_path):
+    """
+    Test that the cache is filled from MongoDB and rebuilt when the corpus grows.
+    """
+    search = ExactVectorSearch(root=str(tmp_path))
+    vectors = np.eye(4)
+    insert_chunks("attachment", vectors[:3])
+
+    results = search.search(Embedding, "attachment", vectors[1], 1, num_candidates=3)
+    assert results == [{"text_content": "chunk 1"}]
+
+    insert_chunks("attachment", vectors[3:], first=3)
+    results = search.search(Embedding, "attachment", vectors[3], 1, num_candidates=4)
+
+    assert results == [{"text_content": "chunk 3"}]
+    assert len(search.load(Embedding, "attachment")) == 4
+
+
+def test_inserted_documents_drop_the_cache(setup_teardown, tmp_path):
+    """
+    Test that adding documents to a partition drops its cached matrix.
+    """
+    search = ExactVectorSearch(root=str(tmp_path))
+    documents = insert_chunks("attachment", np.eye(2))
+    path = tmp_path / "embedding" / "attachment.vectors"
+
+    assert len(search.load(Embedding, "attachment")) == 2
+    assert path.exists()
+
+    search.add(Embedding, documents, [document.id for document in documents])
+    assert not path.exists()
+
+
+def test_small_corpora_use_exact_search(monkeypatch):
+    """
+    Test that exact search is picked up to EXACT_SEARCH_MAX_VECTORS vectors.
+    """
+    monkeypatch.setattr(Config, "EXACT_SEARCH_MAX_VECTORS", 100)
+    monkeypatch.setattr(Config, "VECTOR_SEARCH_BACKEND", "atlas")
+
+    assert isinstance(select_vector_search_backend(100), ExactVectorSearch)
+    assert not isinstance(select_vector_search_backend(101), ExactVectorSearch)
+
+
+def test_removed_documents_drop_the_cache(setup_teardown, tmp_path):
+    """
+    Test that removing documents from a partition drops its cached matrix.
+    """
+    search = ExactVectorSearch(root=str(tmp_path))
+    documents = insert_chunks("attachment", np.eye(2))
+    path = tmp_path / "embedding" / "attachment.vectors"
+
+    assert len(search.load(Embedding, "attachment")) == 2
+
+    search.remove(Embedding, "attachment", [documents[0].id])
+    assert not path.exists()
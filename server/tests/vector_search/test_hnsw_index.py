@@ -0,0 +1,167 @@
+"""
+Unit tests for the local HNSW vector search backend.
+"""
+
+import mongomock
+import numpy as np
+import pytest
+from mongoengine import connect, disconnect
+from app.models.recording_embedding import RecordingEmbedding
+from app.vector_search.hnsw_index import LocalVectorSearch
+
+
+@pytest.fixture(scope="function")
+def setup_teardown():
+    """
+    Fixture to set up and tear down the test environment.
+    """
+    disconnect(alias="default")
+    connect(
+        "mongoenginetest",
+        host="mongodb://localhost",
+        alias="default",
+        mongo_client_class=mongomock.MongoClient,
+    )
+    yield
+    disconnect(alias="default")
+
+
+def store(backend, room_id, vectors, modality="transcript"):
+    """
+    Insert recording embeddings and add them to the backend, like ingestion does.
+    """
+    documents = [
+        RecordingEmbedding(
+            room_id=room_id,
+            text_content=f"{room_id} {index}",
+            modality=modality,
+            embeddings=list(vector),
+        )
+        for index, vector in enumerate(vectors)
+    ]
+    document_ids = RecordingEmbedding.objects.insert(documents, load_bulk=False)
+    backend.add(RecordingEmbedding, documents, document_ids)
+
+
+def unit_vectors(count, dim=16, seed=0):
+    """
+    Build random unit vectors.
+    """
+    vectors = np.random.default_rng(seed).normal(size=(count, dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_search_returns_nearest_documents_of_the_room(setup_teardown, tmp_path):
+    """
+    Test that a query returns the closest chunks of its own room, closest first.
+    """
+    backend = LocalVectorSearch(root=str(tmp_path))
+    vectors = unit_vectors(40)
+    store(backend, "room", vectors)
+    store(backend, "other", vectors)
+
+    results = backend.search(
+        RecordingEmbedding, "room", vectors[7], limit=3, num_candidates=40
+    )
+
+    assert len(results) == 3
+    assert results[0] == {"text_content": "room 7"}
+    assert all(result["text_content"].startswith("room ") for result in results)
+
+
+def test_index_is_persisted_and_extended_incrementally(setup_teardown, tmp_path):
+    """
+    Test that another backend instance loads the saved index and sees later inserts.
+    """
+    vectors = unit_vectors(30)
+    store(LocalVectorSearch(root=str(tmp_path)), "room", vectors[:20])
+
+    reader = LocalVectorSearch(root=str(tmp_path))
+    assert len(reader.load(RecordingEmbedding, "room")) == 20
+
+    store(LocalVectorSearch(root=str(tmp_path)), "room", vectors[20:])
+
+    results = reader.search(
+        RecordingEmbedding, "room", vectors[25], limit=1, num_candidates=30
+    )
+    assert results == [{"text_content": "room 5"}]
+    assert len(reader.load(RecordingEmbedding, "room")) == 30
+
+
+def test_filter_and_deleted_documents_are_applied(setup_teardown, tmp_path):
+    """
+    Test that the query filter and deletions are applied to the ranked candidates.
+    """
+    backend = LocalVectorSearch(root=str(tmp_path))
+    vectors = unit_vectors(10)
+    store(backend, "room", vectors[:5], modality="transcript")
+    store(backend, "room", vectors[5:], modality="frame")
+    RecordingEmbedding.objects(text_content="room 1", modality="frame").delete()
+
+    results = backend.search(
+        RecordingEmbedding,
+        "room",
+        vectors[7],
+        limit=10,
+        num_candidates=10,
+        search_filter={"modality": "frame"},
+        fields=("text_content", "modality"),
+    )
+
+    assert results[0]["text_content"] == "room 2"
+    assert len(results) == 4
+    assert {result["modality"] for result in results} == {"frame"}
+
+
+def test_missing_or_short_index_is_built_from_mongodb(setup_teardown, tmp_path):
+    """
+    Test that a host without the index of a partition, or with an index missing
+    later inserts, builds it from MongoDB instead of returning nothing.
+    """
+    vectors = unit_vectors(30)
+    store(LocalVectorSearch(root=str(tmp_path / "writer")), "room", vectors[:20])
+
+    reader = LocalVectorSearch(root=str(tmp_path / "reader"))
+    results = reader.search(
+        RecordingEmbedding, "room", vectors[7], limit=1, num_candidates=20
+    )
+    assert results == [{"text_content": "room 7"}]
+
+    store(LocalVectorSearch(root=str(tmp_path / "writer")), "room", vectors[20:])
+
+    results = reader.search(
+        RecordingEmbedding, "room", vectors[25], limit=1, num_candidates=30
+    )
+    assert results == [{"text_content": "room 5"}]
+    assert len(reader.load(RecordingEmbedding, "room")) == 30
+
+
+def test_removed_documents_are_skipped_and_dropped_partitions_deleted(
+    setup_teardown, tmp_path
+):
+    """
+    Test that removed documents no longer take the place of live neighbours, and
+    that dropping a partition deletes its files.
+    """
+    backend = LocalVectorSearch(root=str(tmp_path))
+    vectors = unit_vectors(20)
+    store(backend, "room", vectors)
+    removed = [
+        document.id
+        for document in RecordingEmbedding.objects(
+            text_content__in=["room 3", "room 4"]
+        )
+    ]
+    RecordingEmbedding.objects(id__in=removed).delete()
+
+    backend.remove(RecordingEmbedding, "room", removed)
+
+    reader = LocalVectorSearch(root=str(tmp_path))
+    index = reader.load(RecordingEmbedding, "room", corpus_size=18)
+    assert len(index) == 18
+    assert not set(removed) & set(index.query(vectors[3], 18))
+
+    backend.drop(RecordingEmbedding, "room")
+
+    assert not (tmp_path / "recording_embedding" / "room.hnsw").exists()
+    assert not (tmp_path / "recording_embedding" / "room.hnsw.ids").exists()